@@ -1,5 +1,7 @@
+import io
+import json
 from operator import attrgetter
-from typing import List
+from typing import List, Literal, Optional
 
 import discord
 from discord.ext import commands
@@ -7,6 +9,8 @@ from discord.ext import commands
 from pie import check, i18n, logger, utils
 
 import pie.acl
+from pie.acl import index as acl_index
+from pie.acl import transfer as acl_transfer
 from pie.acl.database import ACDefault, ACLevel, ACLevelMappping
 from pie.acl.database import UserOverwrite, ChannelOverwrite, RoleOverwrite
 
@@ -150,8 +154,7 @@ class ACL(commands.Cog):
             def __init__(self, bot: commands.Bot, default: ACDefault):
                 self.command = default.command
                 self.level = default.level.name
-                command_fn = bot.get_command(self.command).callback
-                level = pie.acl.get_hardcoded_ACLevel(command_fn)
+                level = pie.acl.get_hardcoded_ACLevel(bot.get_command(self.command))
                 self.default: str = getattr(level, "name", "?")
 
         defaults = ACDefault.get_all(ctx.guild.id)
@@ -288,8 +291,7 @@ class ACL(commands.Cog):
         class Item:
             def __init__(self, bot: commands.Bot, command: commands.Command):
                 self.command = command.qualified_name
-                command_fn = bot.get_command(self.command).callback
-                level = pie.acl.get_hardcoded_ACLevel(command_fn)
+                level = pie.acl.get_hardcoded_ACLevel(command)
                 self.level: str = getattr(level, "name", "?")
                 try:
                     self.db_level = default_overwrites[self.command].name
@@ -743,6 +745,115 @@ class ACL(commands.Cog):
         for page in table:
             await ctx.send("```" + page + "```")
 
+    @check.acl2(check.ACLevel.GUILD_OWNER)
+    @acl_.command(name="export")
+    async def acl_export(self, ctx):
+        """Export defaults, mappings and overwrites of this server."""
+        data = acl_transfer.export_guild(ctx.guild.id)
+        content: str = json.dumps(data, indent=4)
+        await ctx.reply(
+            _(ctx, "Exported {count} ACL entries.").format(
+                count=sum(len(rows) for rows in data.values())
+            ),
+            file=discord.File(
+                io.BytesIO(content.encode("utf-8")), filename=f"acl-{ctx.guild.id}.json"
+            ),
+        )
+
+    @check.acl2(check.ACLevel.GUILD_OWNER)
+    @acl_.command(name="import")
+    async def acl_import(self, ctx, dry_run: Optional[Literal["dry-run"]] = None):
+        """Replace defaults, mappings and overwrites by the attached export.
+
+        Add 'dry-run' to only display the changes.
+        """
+        if not ctx.message.attachments:
+            await ctx.reply(_(ctx, "You have to attach the exported file."))
+            return
+
+        try:
+            data = json.loads(await ctx.message.attachments[0].read())
+            changes = acl_transfer.diff(
+                ctx.guild.id, data, bot_commands=set(self._all_bot_commands)
+            )
+            acl_transfer.verify(self.bot, ctx, changes)
+        except ValueError as exc:
+            await ctx.reply(
+                _(ctx, "The file can't be imported: {error}").format(error=str(exc))
+            )
+            return
+
+        if not changes:
+            await ctx.reply(_(ctx, "The file matches the current settings."))
+            return
+
+        class Item:
+            def __init__(self, change: acl_transfer.Change):
+                self.action = {"add": "+", "remove": "-", "change": "~"}[change.action]
+                self.section = change.section
+                self.key = " ".join(str(k) for k in change.key)
+                self.old = self._format(change.old)
+                self.new = self._format(change.new)
+
+            @staticmethod
+            def _format(value) -> str:
+                if value is None:
+                    return ""
+                return getattr(value, "name", str(value))
+
+        table: List[str] = utils.text.create_table(
+            [Item(change) for change in changes],
+            header={
+                "action": "",
+                "section": _(ctx, "Section"),
+                "key": _(ctx, "Entry"),
+                "old": _(ctx, "Current value"),
+                "new": _(ctx, "New value"),
+            },
+        )
+        for page in table:
+            await ctx.send("```" + page + "```")
+
+        if dry_run:
+            await ctx.reply(
+                _(ctx, "The import would make {count} changes.").format(
+                    count=len(changes)
+                )
+            )
+            return
+
+        acl_transfer.apply(ctx.guild.id, changes)
+        await ctx.reply(
+            _(ctx, "The import made {count} changes.").format(count=len(changes))
+        )
+        await guild_log.warning(
+            ctx.author,
+            ctx.channel,
+            f"ACL settings imported with {len(changes)} changes.",
+        )
+
+    @check.acl2(check.ACLevel.BOT_OWNER)
+    @acl_.command(name="cache")
+    async def acl_cache(self, ctx):
+        """Display statistics of the ACL verdict cache."""
+        stats = acl_index.verdict_stats
+        lookups: int = stats.hits + stats.misses
+        await ctx.reply(
+            _(
+                ctx,
+                "Verdicts were served from the cache **{hits}** times "
+                "out of **{lookups}** (**{rate} %**). "
+                "They have been invalidated **{invalidations}** times, "
+                "**{evictions}** were evicted because of the limit.",
+            ).format(
+                hits=stats.hits,
+                lookups=lookups,
+                rate=round(stats.hits / lookups * 100) if lookups else 0,
+                invalidations=stats.invalidations,
+                evictions=stats.evictions,
+            )
+        )
+
     #
 
     @property
@@ -1,13 +1,18 @@
+import asyncio
 import shutil
 import tempfile
 from pathlib import Path
-from typing import List, Optional, Set
+from typing import Dict, List, Optional, Set
 
 import discord
 from discord.ext import commands, tasks
 
+import pie._tracing
+import pie.database
 import pie.database.config
 from pie import check, i18n, logger, utils
+from pie.database import transfer
+from pie.database.stats import QueryStats
 from pie.repository import RepositoryManager, Repository
 from pie.spamchannel.database import SpamChannel
 from .database import BaseAdminModule as Module
@@ -45,13 +50,16 @@ class Admin(commands.Cog):
         if not manager.log:
             return
 
-        manager_log: str = "\n".join(manager.log)
-        await bot_log.warning(
-            None,
-            None,
-            f"Replaying {manager.__class__.__name__} log." + "\n" + manager_log,
-        )
-        manager.flush_log()
+        # The loop task runs until the module is unloaded, every iteration
+        # has to end its own unit of work
+        with pie.database.unit_of_work():
+            manager_log: str = "\n".join(manager.log)
+            await bot_log.warning(
+                None,
+                None,
+                f"Replaying {manager.__class__.__name__} log." + "\n" + manager_log,
+            )
+            manager.flush_log()
 
     @send_manager_log.before_loop
     async def before_send_manager_log(self):
@@ -75,12 +83,13 @@ class Admin(commands.Cog):
 
         if self.status != status:
             self.status = status
-            await bot_log.debug(
-                None,
-                None,
-                f"Latency is {self.bot.latency:.2f}, setting status to {status}.",
-            )
-            await utils.discord.update_presence(self.bot, status=status)
+            with pie.database.unit_of_work():
+                await bot_log.debug(
+                    None,
+                    None,
+                    f"Latency is {self.bot.latency:.2f}, setting status to {status}.",
+                )
+                await utils.discord.update_presence(self.bot, status=status)
 
     @status_loop.before_loop
     async def before_status_loop(self):
@@ -388,6 +397,8 @@ class Admin(commands.Cog):
     @module_.command(name="load")
     async def module_load(self, ctx, name: str):
         """Load module. Use format <repository>.<module>."""
+        # The translations may have been updated together with the module
+        i18n.catalogs.forget("modules/" + name.split(".")[0])
         await self.bot.load_extension("modules." + name + ".module")
         await self.bot.tree.sync()
         await ctx.send(_(ctx, "Module **{name}** has been loaded.").format(name=name))
@@ -413,6 +424,7 @@ class Admin(commands.Cog):
     @module_.command(name="reload")
     async def module_reload(self, ctx, name: str):
         """Reload bot module. Use format <repository>.<module>."""
+        i18n.catalogs.forget("modules/" + name.split(".")[0])
         await self.bot.reload_extension("modules." + name + ".module")
         await self.bot.tree.sync()
         await ctx.send(_(ctx, "Module **{name}** has been reloaded.").format(name=name))
@@ -481,15 +493,14 @@ class Admin(commands.Cog):
         config.save()
         await self.config_get(ctx)
 
+        # The prefix and presence are updated by the Config subscriber
         if key == "status":
             if value == "auto":
+                self.status = ""
                 self.status_loop.start()
                 return
             self.status_loop.cancel()
 
-        if key in ("prefix", "status"):
-            await utils.discord.update_presence(self.bot)
-
     @commands.guild_only()
     @check.acl2(check.ACLevel.BOT_OWNER)
     @commands.group(name="pumpkin")
@@ -515,6 +526,7 @@ class Admin(commands.Cog):
     async def pumpkin_restart(self, ctx):
         """Restart bot instance with the help of host system."""
         await bot_log.critical(ctx.author, ctx.channel, "Restarting.")
+        await logger.flush()
         exit(1)
 
     @check.acl2(check.ACLevel.BOT_OWNER)
@@ -522,8 +534,226 @@ class Admin(commands.Cog):
     async def pumpkin_shutdown(self, ctx):
         """Shutdown bot instance."""
         await bot_log.critical(ctx.author, ctx.channel, "Shutting down.")
+        await logger.flush()
         exit(0)
 
+    @check.acl2(check.ACLevel.BOT_OWNER)
+    @pumpkin_.command(name="export")
+    async def pumpkin_export(self, ctx):
+        """Export database settings of this server."""
+        # The queue belongs to the event loop, not to the worker thread
+        pie.database.write_behind.flush()
+        loop = asyncio.get_running_loop()
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / f"{ctx.guild.id}.jsonl"
+            async with ctx.typing():
+                counts = await loop.run_in_executor(
+                    None, self._export_guild, ctx.guild.id, path
+                )
+            await ctx.reply(
+                _(ctx, "Exported {count} rows.").format(count=sum(counts.values())),
+                file=discord.File(path),
+            )
+        await bot_log.info(ctx.author, ctx.channel, "Guild settings exported.")
+
+    @staticmethod
+    def _export_guild(guild_id: int, path: Path) -> Dict[str, int]:
+        with open(path, "w") as handle:
+            return transfer.export_guild(guild_id, handle, flush=False)
+
+    @check.acl2(check.ACLevel.BOT_OWNER)
+    @pumpkin_.command(name="import")
+    async def pumpkin_import(self, ctx):
+        """Replace database settings of this server by the attached export."""
+        if not ctx.message.attachments:
+            await ctx.reply(_(ctx, "You have to attach the exported file."))
+            return
+
+        # The queue belongs to the event loop, not to the worker thread
+        pie.database.write_behind.flush()
+        loop = asyncio.get_running_loop()
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "import.jsonl"
+            async with ctx.typing():
+                await ctx.message.attachments[0].save(path)
+                try:
+                    counts = await loop.run_in_executor(
+                        None, self._import_guild, ctx.guild.id, path
+                    )
+                except ValueError as exc:
+                    await ctx.reply(
+                        _(
+                            ctx, "The file is not valid, nothing was imported: {error}"
+                        ).format(error=exc)
+                    )
+                    return
+        transfer.forget_guild(ctx.guild.id)
+        await ctx.reply(
+            _(ctx, "Imported {count} rows.").format(count=sum(counts.values()))
+        )
+        await bot_log.warning(
+            ctx.author,
+            ctx.channel,
+            "Guild settings imported: "
+            + ", ".join(f"{name} ({count})" for name, count in counts.items())
+            + ".",
+        )
+
+    @staticmethod
+    def _import_guild(guild_id: int, path: Path) -> Dict[str, int]:
+        with open(path, "r") as handle:
+            return transfer.import_guild(guild_id, handle, flush=False)
+
+    @check.acl2(check.ACLevel.BOT_OWNER)
+    @pumpkin_.command(name="queries")
+    async def pumpkin_queries(self, ctx, limit: int = 10):
+        """Show commands, events and statements that spent the most time in the
+        database."""
+        # Two tables of 25 rows still fit into a few messages
+        limit = max(1, min(limit, 25))
+        instrumentation = pie.database.instrumentation
+        if not instrumentation.sources:
+            await ctx.reply(_(ctx, "No database queries have been recorded."))
+            return
+
+        class Item:
+            def __init__(self, stats: QueryStats):
+                self.name = " ".join(stats.name.split())[:80]
+                self.invocations = stats.invocations
+                self.count = stats.count
+                self.total = f"{stats.total * 1000:.0f}"
+                self.slowest = f"{stats.slowest * 1000:.1f}"
+
+        sources: List[str] = utils.text.create_table(
+            [Item(s) for s in instrumentation.top_sources(limit)],
+            header={
+                "name": _(ctx, "Source"),
+                "invocations": _(ctx, "Invocations"),
+                "count": _(ctx, "Queries"),
+                "total": _(ctx, "Total (ms)"),
+                "slowest": _(ctx, "Slowest (ms)"),
+            },
+        )
+        statements: List[str] = utils.text.create_table(
+            [Item(s) for s in instrumentation.top_statements(limit)],
+            header={
+                "name": _(ctx, "Statement"),
+                "count": _(ctx, "Queries"),
+                "total": _(ctx, "Total (ms)"),
+                "slowest": _(ctx, "Slowest (ms)"),
+            },
+        )
+
+        for page in sources + statements:
+            await ctx.send("```" + page + "```")
+
+    @check.acl2(check.ACLevel.BOT_OWNER)
+    @pumpkin_.command(name="logs")
+    async def pumpkin_logs(self, ctx):
+        """Show the state of the log queue."""
+        stats = logger.pipeline.stats
+        await ctx.reply(
+            _(
+                ctx,
+                "**{depth}** log entries are waiting, the queue holds up to "
+                "**{maxsize}** (the most was **{high_water}**). "
+                "**{written}** entries were written in **{batches}** batches, "
+                "**{dropped}** were dropped and **{unsent}** were not sent to "
+                "Discord because it was too slow.",
+            ).format(
+                depth=logger.pipeline.depth,
+                maxsize=logger.pipeline.maxsize,
+                high_water=stats.high_water,
+                written=stats.written,
+                batches=stats.batches,
+                dropped=stats.dropped,
+                unsent=stats.unsent,
+            )
+            + " "
+            + _(
+                ctx,
+                "**{entries}** entries were sent to Discord in **{messages}** "
+                "messages, **{suppressed}** were suppressed because too many "
+                "messages were waiting for their channel.",
+            ).format(
+                entries=logger.sink.stats.entries,
+                messages=logger.sink.stats.messages,
+                suppressed=logger.sink.stats.suppressed,
+            )
+        )
+
+    @check.acl2(check.ACLevel.BOT_OWNER)
+    @pumpkin_.group(name="trace")
+    async def pumpkin_trace_(self, ctx):
+        """Manage tracing of bot internals."""
+        await utils.discord.send_help(ctx)
+
+    @check.acl2(check.ACLevel.BOT_OWNER)
+    @pumpkin_trace_.command(name="list")
+    async def pumpkin_trace_list(self, ctx):
+        """List tracing functions."""
+
+        class Item:
+            def __init__(self, tracer: pie._tracing.Tracer):
+                self.name = tracer.name
+                self.enabled = _(ctx, "yes") if tracer.enabled else _(ctx, "no")
+
+        table: List[str] = utils.text.create_table(
+            [Item(tracer) for tracer in pie._tracing.get_tracers()],
+            header={
+                "name": _(ctx, "Name"),
+                "enabled": _(ctx, "Enabled"),
+            },
+        )
+        for page in table:
+            await ctx.send("```" + page + "```")
+
+    @check.acl2(check.ACLevel.BOT_OWNER)
+    @pumpkin_trace_.command(name="enable")
+    async def pumpkin_trace_enable(self, ctx, name: str):
+        """Start tracing the feature."""
+        await self._set_tracing(ctx, name, True)
+
+    @check.acl2(check.ACLevel.BOT_OWNER)
+    @pumpkin_trace_.command(name="disable")
+    async def pumpkin_trace_disable(self, ctx, name: str):
+        """Stop tracing the feature."""
+        await self._set_tracing(ctx, name, False)
+
+    async def _set_tracing(self, ctx, name: str, enabled: bool):
+        try:
+            pie._tracing.set_enabled(name, enabled)
+        except ValueError:
+            await ctx.reply(
+                _(ctx, "Tracing function **{name}** does not exist.").format(name=name)
+            )
+            return
+
+        if enabled:
+            await ctx.reply(_(ctx, "Tracing of **{name}** enabled.").format(name=name))
+        else:
+            await ctx.reply(_(ctx, "Tracing of **{name}** disabled.").format(name=name))
+        await bot_log.info(
+            ctx.author,
+            ctx.channel,
+            f"Tracing of '{name}' {'enabled' if enabled else 'disabled'}.",
+        )
+
+    @check.acl2(check.ACLevel.BOT_OWNER)
+    @pumpkin_trace_.command(name="dump")
+    async def pumpkin_trace_dump(self, ctx, name: Optional[str] = None):
+        """Send recent trace messages."""
+        records = pie._tracing.get_records(name)
+        if not records:
+            await ctx.reply(_(ctx, "No trace messages have been recorded."))
+            return
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "trace.log"
+            with open(path, "w") as handle:
+                handle.writelines(f"{record}\n" for record in records)
+            await ctx.reply(file=discord.File(path))
+
     @commands.guild_only()
     @check.acl2(check.ACLevel.SUBMOD)
     @commands.group(name="spamchannel")
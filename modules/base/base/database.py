@@ -1,54 +1,37 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Optional
 
-from sqlalchemy import BigInteger, Boolean, Column, Integer
+from sqlalchemy import BigInteger, Boolean, Column, Index, Integer
 
-from pie.database import database, session
+from pie.database import database, migrations, session, transfer
+from pie.database.cache import GuildSettings
 
 
-class UserPin(database.base):
+class UserPin(GuildSettings, database.base):
     __tablename__ = "base_base_userpin"
+    __cache_key__ = ("channel_id",)
 
     idx = Column(Integer, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger)
     channel_id = Column(BigInteger, default=None)
     limit = Column(Integer, default=0)
 
-    @staticmethod
-    def add(guild_id: int, channel_id: Optional[int], limit: int = 0) -> UserPin:
+    __table_args__ = (
+        Index("ix_base_base_userpin_guild_id_channel_id", guild_id, channel_id),
+    )
+
+    @classmethod
+    def add(cls, guild_id: int, channel_id: Optional[int], limit: int = 0) -> UserPin:
         """Add userpin preference."""
-        if UserPin.get(guild_id, channel_id) is not None:
-            UserPin.remove(guild_id, channel_id)
-        query = UserPin(guild_id=guild_id, channel_id=channel_id, limit=limit)
+        if cls.get(guild_id, channel_id) is not None:
+            cls.remove(guild_id, channel_id)
+        query = cls(guild_id=guild_id, channel_id=channel_id, limit=limit)
         session.add(query)
+        cls.invalidate(guild_id)
         session.commit()
         return query
 
-    @staticmethod
-    def get(guild_id: int, channel_id: Optional[int]) -> Optional[UserPin]:
-        """Get userpin preferences for the guild."""
-        query = (
-            session.query(UserPin)
-            .filter_by(guild_id=guild_id, channel_id=channel_id)
-            .one_or_none()
-        )
-        return query
-
-    @staticmethod
-    def get_all(guild_id: int) -> List[UserPin]:
-        query = session.query(UserPin).filter_by(guild_id=guild_id).all()
-        return query
-
-    @staticmethod
-    def remove(guild_id: int, channel_id: Optional[int]) -> int:
-        query = (
-            session.query(UserPin)
-            .filter_by(guild_id=guild_id, channel_id=channel_id)
-            .delete()
-        )
-        return query
-
     def __repr__(self) -> str:
         return (
             f"<UserPin idx='{self.idx}' guild_id='{self.guild_id}' "
@@ -63,48 +46,32 @@ class UserPin(database.base):
         }
 
 
-class UserThread(database.base):
+class UserThread(GuildSettings, database.base):
     __tablename__ = "base_base_userthread"
+    __cache_key__ = ("channel_id",)
 
     idx = Column(Integer, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger)
     channel_id = Column(BigInteger, default=None)
     limit = Column(Integer, default=0)
 
-    @staticmethod
-    def add(guild_id: int, channel_id: Optional[int], limit: int = 0) -> UserThread:
+    __table_args__ = (
+        Index("ix_base_base_userthread_guild_id_channel_id", guild_id, channel_id),
+    )
+
+    @classmethod
+    def add(
+        cls, guild_id: int, channel_id: Optional[int], limit: int = 0
+    ) -> UserThread:
         """Add userthread preference."""
-        if UserThread.get(guild_id, channel_id) is not None:
-            UserThread.remove(guild_id, channel_id)
-        query = UserThread(guild_id=guild_id, channel_id=channel_id, limit=limit)
+        if cls.get(guild_id, channel_id) is not None:
+            cls.remove(guild_id, channel_id)
+        query = cls(guild_id=guild_id, channel_id=channel_id, limit=limit)
         session.add(query)
+        cls.invalidate(guild_id)
         session.commit()
         return query
 
-    @staticmethod
-    def get(guild_id: int, channel_id: Optional[int]) -> Optional[UserThread]:
-        """Get userthread preference for the guild."""
-        query = (
-            session.query(UserThread)
-            .filter_by(guild_id=guild_id, channel_id=channel_id)
-            .one_or_none()
-        )
-        return query
-
-    @staticmethod
-    def get_all(guild_id: int) -> List[UserThread]:
-        query = session.query(UserThread).filter_by(guild_id=guild_id).all()
-        return query
-
-    @staticmethod
-    def remove(guild_id: int, channel_id: Optional[int]) -> int:
-        query = (
-            session.query(UserThread)
-            .filter_by(guild_id=guild_id, channel_id=channel_id)
-            .delete()
-        )
-        return query
-
     def __repr__(self) -> str:
         return (
             f"<UserThread idx='{self.idx}' guild_id='{self.guild_id}' "
@@ -119,48 +86,31 @@ class UserThread(database.base):
         }
 
 
-class Bookmark(database.base):
+class Bookmark(GuildSettings, database.base):
     __tablename__ = "base_base_bookmarks"
+    __cache_key__ = ("channel_id",)
 
     idx = Column(Integer, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger)
     channel_id = Column(BigInteger, default=None)
     enabled = Column(Boolean, default=False)
 
-    @staticmethod
+    __table_args__ = (
+        Index("ix_base_base_bookmarks_guild_id_channel_id", guild_id, channel_id),
+    )
+
+    @classmethod
     def add(
-        guild_id: int, channel_id: Optional[int], enabled: bool = False
+        cls, guild_id: int, channel_id: Optional[int], enabled: bool = False
     ) -> Bookmark:
-        if Bookmark.get(guild_id, channel_id) is not None:
-            Bookmark.remove(guild_id, channel_id)
-        query = Bookmark(guild_id=guild_id, channel_id=channel_id, enabled=enabled)
+        if cls.get(guild_id, channel_id) is not None:
+            cls.remove(guild_id, channel_id)
+        query = cls(guild_id=guild_id, channel_id=channel_id, enabled=enabled)
         session.add(query)
+        cls.invalidate(guild_id)
         session.commit()
         return query
 
-    @staticmethod
-    def get(guild_id: int, channel_id: Optional[int]) -> Optional[Bookmark]:
-        query = (
-            session.query(Bookmark)
-            .filter_by(guild_id=guild_id, channel_id=channel_id)
-            .one_or_none()
-        )
-        return query
-
-    @staticmethod
-    def get_all(guild_id: int) -> List[Bookmark]:
-        query = session.query(Bookmark).filter_by(guild_id=guild_id).all()
-        return query
-
-    @staticmethod
-    def remove(guild_id: int, channel_id: Optional[int]) -> int:
-        query = (
-            session.query(Bookmark)
-            .filter_by(guild_id=guild_id, channel_id=channel_id)
-            .delete()
-        )
-        return query
-
     def __repr__(self) -> str:
         return (
             f"<Bookmark idx='{self.idx}' guild_id='{self.guild_id}' "
@@ -175,48 +125,34 @@ class Bookmark(database.base):
         }
 
 
-class AutoThread(database.base):
+class AutoThread(GuildSettings, database.base):
     __tablename__ = "base_base_autothread"
+    __cache_key__ = ("channel_id",)
 
     idx = Column(Integer, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger)
     channel_id = Column(BigInteger)
     duration = Column(Integer)
 
-    @staticmethod
-    def add(guild_id: int, channel_id: int, duration: int) -> AutoThread:
-        query = AutoThread.get(guild_id, channel_id)
-        if query:
-            query.duration = duration
-        else:
-            query = AutoThread(
-                guild_id=guild_id, channel_id=channel_id, duration=duration
-            )
-        session.add(query)
-        session.commit()
-        return query
+    __table_args__ = (
+        Index("ix_base_base_autothread_guild_id_channel_id", guild_id, channel_id),
+    )
 
-    @staticmethod
-    def get(guild_id: int, channel_id: int) -> Optional[AutoThread]:
+    @classmethod
+    def add(cls, guild_id: int, channel_id: int, duration: int) -> AutoThread:
+        # The object is modified, it can't be loaded from the cache
         query = (
-            session.query(AutoThread)
+            session.query(cls)
             .filter_by(guild_id=guild_id, channel_id=channel_id)
             .one_or_none()
         )
-        return query
-
-    @staticmethod
-    def get_all(guild_id: int) -> List[AutoThread]:
-        query = session.query(AutoThread).filter_by(guild_id=guild_id).all()
-        return query
-
-    @staticmethod
-    def remove(guild_id: int, channel_id: int) -> int:
-        query = (
-            session.query(AutoThread)
-            .filter_by(guild_id=guild_id, channel_id=channel_id)
-            .delete()
-        )
+        if query:
+            query.duration = duration
+        else:
+            query = cls(guild_id=guild_id, channel_id=channel_id, duration=duration)
+        session.add(query)
+        cls.invalidate(guild_id)
+        session.commit()
         return query
 
     def __repr__(self) -> str:
@@ -224,3 +160,8 @@ class AutoThread(database.base):
             f"<{self.__class__.__name__} "
             f"guild_id='{self.guild_id} channel_id='{self.channel_id} duration='{self.duration}'>"
         )
+
+
+migrations.create_indexes("base.base", 1, UserPin, UserThread, Bookmark, AutoThread)
+
+transfer.register(UserPin, UserThread, Bookmark, AutoThread)
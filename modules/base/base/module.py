@@ -396,7 +396,9 @@ class Base(commands.Cog):
             return
         if isinstance(message.channel, discord.abc.PrivateChannel):
             return
-        thread_settings = AutoThread.get(message.guild.id, message.channel.id)
+        thread_settings = await AutoThread.get_async(
+            message.guild.id, message.channel.id
+        )
         if thread_settings is None:
             return
 
@@ -431,7 +433,7 @@ class Base(commands.Cog):
         """Handle thread deletion if parental message is deleted."""
         if payload.guild_id is None:
             return
-        if AutoThread.get(payload.guild_id, payload.channel_id) is None:
+        if await AutoThread.get_async(payload.guild_id, payload.channel_id) is None:
             # only handle channels where the threads are created automatically
             return
         channel = self.bot.get_guild(payload.guild_id).get_channel(payload.channel_id)
@@ -4,12 +4,16 @@ import datetime
 from typing import List, Optional
 
 from sqlalchemy import BigInteger, Column, Date, Integer, UniqueConstraint
+from sqlalchemy.orm import Session
 
-from pie.database import database, session
+from pie.database import database, session, transfer, write_behind
+from pie.database.cache import GuildSettings
+from pie.database.write_behind import MISSING
 
 
-class Subscription(database.base):
+class Subscription(GuildSettings, database.base):
     __tablename__ = "base_errors_meme_subscriptions"
+    __cache_key__ = ("channel_id",)
 
     idx = Column(Integer, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger)
@@ -23,32 +27,19 @@ class Subscription(database.base):
             return None
         query = cls(guild_id=guild_id, channel_id=channel_id)
         session.add(query)
+        cls.invalidate(guild_id)
         session.commit()
         return query
 
-    @classmethod
-    def get(cls, guild_id: int, channel_id: int) -> Optional[Subscription]:
-        return (
-            session.query(cls)
-            .filter_by(guild_id=guild_id, channel_id=channel_id)
-            .one_or_none()
-        )
-
     @classmethod
     def get_all(cls, guild_id: Optional[int]) -> List[Subscription]:
-        query = session.query(cls)
         if guild_id:
-            query = query.filter_by(guild_id=guild_id)
-        return query.all()
+            return super().get_all(guild_id)
+        return session.query(cls).all()
 
     @classmethod
     def remove(cls, guild_id: int, channel_id: int) -> bool:
-        query = (
-            session.query(cls)
-            .filter_by(guild_id=guild_id, channel_id=channel_id)
-            .delete()
-        )
-        return query > 0
+        return super().remove(guild_id, channel_id) > 0
 
     def __repr__(self) -> str:
         return (
@@ -80,15 +71,24 @@ class LastError(database.base):
         if getattr(query, "date", None) == today:
             return False
 
-        if query is None:
-            query = cls()
-            session.add(query)
-        query.date = today
-        session.commit()
+        last_error = cls(date=today)
+
+        def write(session: Session):
+            query = session.query(cls).one_or_none()
+            if query is None:
+                session.add(last_error)
+                return last_error
+            query.date = today
+            return query
+
+        write_behind.write((cls.__tablename__,), write, last_error)
         return True
 
     @classmethod
     def get(cls) -> Optional[LastError]:
+        pending = write_behind.lookup((cls.__tablename__,))
+        if pending is not MISSING:
+            return pending
         return session.query(cls).one_or_none()
 
     def __repr__(self) -> str:
@@ -96,3 +96,6 @@ class LastError(database.base):
 
     def dump(self) -> dict:
         return {"date": self.date}
+
+
+transfer.register(Subscription)
@@ -1,8 +1,66 @@
+import collections
+import datetime
 import os
-from typing import Callable
+from typing import Deque, Dict, List, Optional
 
 
-def register(name: str) -> Callable:
+class TraceRecord:
+    """One message of the tracing function."""
+
+    __slots__ = ("timestamp", "name", "message")
+
+    def __init__(self, name: str, message: str):
+        self.timestamp = datetime.datetime.now()
+        self.name = name
+        self.message = message
+
+    def __str__(self) -> str:
+        return f"{self.timestamp.isoformat()} [trace:{self.name}] {self.message}"
+
+
+# Recent messages of all tracing functions
+records: Deque[TraceRecord] = collections.deque(
+    maxlen=int(os.getenv("TRACE_BUFFER") or 1000)
+)
+
+
+class Tracer:
+    """Tracing function of one feature.
+
+    The message is formatted only when the tracing is enabled, so the
+    arguments should be passed separately instead of using f-strings:
+
+    .. code-block:: python3
+
+        _trace("Role overwrite for '{}' exists: '{}'.", role.name, allow)
+
+    Enabled tracer prints the message to the standard output and stores it
+    in :data:`records`.
+    """
+
+    __slots__ = ("name", "enabled")
+
+    def __init__(self, name: str, enabled: bool = False):
+        self.name = name
+        self.enabled = enabled
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} name='{self.name}' enabled={self.enabled}>"
+
+    def __call__(self, message: str, *args) -> None:
+        if not self.enabled:
+            return
+        if args:
+            message = message.format(*args)
+        record = TraceRecord(self.name, message)
+        records.append(record)
+        print(f"[trace:{self.name}] {message}")  # noqa: T001
+
+
+_tracers: Dict[str, Tracer] = {}
+
+
+def register(name: str) -> Tracer:
     """Register pumpkin.py tracing function.
 
     This is 'the last resort' option when debugging entangled code.
@@ -15,20 +73,18 @@ def register(name: str) -> Callable:
 
     .. code-block:
 
-        _trace: Callable = pie._tracing.register_trace_function("feature")
+        _trace: Tracer = pie._tracing.register("feature")
 
-    The 'feature' must be registered in 'pie._tracing', otherwise 'ValueError'
-    is raised.
+    The registration name MUST follow the directory structure:
+    'pie_spamchannel', 'modules_base_errors', ...
 
-    This feature may be enabled by altering environment variables:
+    Tracing can be enabled at runtime with the ``pumpkin trace`` command, or
+    on startup by altering environment variables:
 
     .. code-block:
 
         trace_pie_spamchannel=1 python3 pumpkin.py
 
-    The registration name MUST follow the directory structure:
-    'pie_spamchannel', 'modules_base_errors', ...
-
     When everything goes well, you'll see debug logs printed to the stdout:
 
     .. code-block:
@@ -40,13 +96,36 @@ def register(name: str) -> Callable:
         Imported database models in 'pie.spamchannel.database'.
         ...
     """
-    prefix: str = f"[trace:{name}]"
+    tracer: Optional[Tracer] = _tracers.get(name)
+    if tracer is not None:
+        return tracer
 
-    if not os.getenv(f"trace_{name}"):
-        return lambda *args, **kwargs: None
+    tracer = _tracers[name] = Tracer(name, enabled=bool(os.getenv(f"trace_{name}")))
+    tracer("Function registered.")
+    return tracer
 
-    def _trace(message: str) -> None:
-        print("{prefix} {message}".format(prefix=prefix, message=message))
 
-    _trace("Function registered.")
-    return _trace
+def get_tracers() -> List[Tracer]:
+    """Get all registered tracing functions, sorted by their name."""
+    return sorted(_tracers.values(), key=lambda tracer: tracer.name)
+
+
+def set_enabled(name: str, enabled: bool) -> Tracer:
+    """Enable or disable the tracing function.
+
+    :raises ValueError: No function is registered under the name.
+    """
+    tracer: Optional[Tracer] = _tracers.get(name)
+    if tracer is None:
+        raise ValueError(f"Tracing function '{name}' is not registered.")
+    tracer.enabled = enabled
+    return tracer
+
+
+def get_records(name: Optional[str] = None) -> List[TraceRecord]:
+    """Get the recent messages, oldest first.
+
+    :param name: Name of the tracing function. If ``None``, messages of all
+        functions are returned.
+    """
+    return [r for r in records if name is None or r.name == name]
@@ -1,10 +1,6 @@
 from __future__ import annotations
 
-import inspect
-import re
-from typing import Callable, Optional, Set, TypeVar, Union
-
-import ring
+from typing import Callable, Dict, Iterable, Optional, Set, TypeVar, Union
 
 import discord
 from discord.ext import commands
@@ -12,67 +8,65 @@ from discord.ext import commands
 import pie._tracing
 from pie import i18n
 
-from pie.acl.database import ACDefault, ACLevel, ACLevelMappping
+from pie.acl import index as acl_index
+from pie.acl.database import ACLevel
 from pie.exceptions import (
-    ACLFailure,
     NegativeUserOverwrite,
     NegativeChannelOverwrite,
     NegativeRoleOverwrite,
     InsufficientACLevel,
 )
-from pie.acl.database import UserOverwrite, ChannelOverwrite, RoleOverwrite
 
-_trace: Callable = pie._tracing.register("pie_acl")
+_trace: pie._tracing.Tracer = pie._tracing.register("pie_acl")
 
 _ = i18n.Translator(__file__).translate
 T = TypeVar("T")
 
 
-@ring.lru(expire=10)
 def map_member_to_ACLevel(
     *,
     bot: commands.Bot,
     member: discord.Member,
 ):
-    """Map member to their ACLevel."""
+    """Map member to their ACLevel.
 
-    _acl_trace = lambda message: _trace(f"[acl(mapping)] {message}")  # noqa: E731
+    The level is stored in the ACL index of the guild until the member's
+    roles, the mappings or the guild ownership change.
+    """
+    index = acl_index.get(member.guild.id)
+    member_level: Optional[ACLevel] = index.levels.get(member.id)
+    if member_level is None:
+        member_level = _map_member(bot, member, index.mappings)
+        index.levels[member.id] = member_level
+    return member_level
 
-    # Gather information
 
+def _map_member(
+    bot: commands.Bot, member: discord.Member, mappings: Dict[int, ACLevel]
+) -> ACLevel:
     # NOTE This relies on pumpkin.py:update_app_info()
     bot_owner_ids: Set = getattr(bot, "owner_ids", {*()})
-    guild_owner_id: int = member.guild.owner.id
-
-    is_bot_owner: bool = False
-    is_guild_owner: bool = False
 
     if member.id in bot_owner_ids:
-        _acl_trace(f"'{member}' is bot owner.")
-        is_bot_owner = True
-
-    elif member.id == guild_owner_id:
-        _acl_trace(f"'{member}' is guild owner.")
-        is_guild_owner = True
-
-    # Perform the mapping
-
-    if is_bot_owner:
-        member_level = ACLevel.BOT_OWNER
-    elif is_guild_owner:
-        member_level = ACLevel.GUILD_OWNER
-    else:
-        member_level = ACLevel.EVERYONE
-        for role in member.roles[::-1]:
-            mapping = ACLevelMappping.get(member.guild.id, role.id)
-            if mapping is not None:
-                _acl_trace(
-                    f"'{member}' is mapped via '{role.name}' to '{mapping.level.name}'."
-                )
-                member_level = mapping.level
-                break
+        _trace("[acl(mapping)] '{}' is bot owner.", member)
+        return ACLevel.BOT_OWNER
+
+    if member.id == member.guild.owner_id:
+        _trace("[acl(mapping)] '{}' is guild owner.", member)
+        return ACLevel.GUILD_OWNER
+
+    for role in member.roles[::-1]:
+        mapping = mappings.get(role.id)
+        if mapping is not None:
+            _trace(
+                "[acl(mapping)] '{}' is mapped via '{.name}' to '{.name}'.",
+                member,
+                role,
+                mapping,
+            )
+            return mapping
 
-    return member_level
+    return ACLevel.EVERYONE
 
 
 def acl2(level: ACLevel) -> Callable[[T], T]:
@@ -124,10 +118,18 @@ def acl2(level: ACLevel) -> Callable[[T], T]:
             channel=channel,
         )
 
-    return commands.check(predicate)
+    check = commands.check(predicate)
+
+    def decorator(func: T) -> T:
+        # Remember the level, so it can be looked up without the source code
+        callback = getattr(func, "callback", func)
+        callback.__acl_level__ = level
+        return check(func)
+
+    decorator.predicate = check.predicate
+    return decorator
 
 
-# TODO Make cachable as well?
 def acl2_function(
     level: ACLevel,
     bot: Union[commands.Bot, commands.AutoShardedBot],
@@ -146,89 +148,168 @@ def acl2_function(
         guild: Guild the command was run at.
         channel: Channel the command was run in.
 
+    The verdict is stored until the ACL settings of the guild change, or
+    until an event changes the member's roles or the channel.
+
     Returns:
         True if command can be run, False otherwise.
     """
-    _acl_trace = lambda message: _trace(f"[{command}] {message}")  # noqa: E731
-
     # Allow invocations in DM.
     # Wrap the function in `@commands.guild_only()` to change this behavior.
     if guild is None:
-        _acl_trace("Non-guild context is always allowed.")
+        _trace("[{}] Non-guild context is always allowed.", command)
         return True
 
+    index = acl_index.get(guild.id)
+    verdict = _get_verdict(level, bot, invoker, command, channel, index)
+    if isinstance(verdict, acl_index.Refusal):
+        raise verdict.exception()
+    return verdict
+
+
+def _get_verdict(
+    level: ACLevel,
+    bot: Union[commands.Bot, commands.AutoShardedBot],
+    invoker: discord.Member,
+    command: str,
+    channel: discord.abc.Messageable,
+    index: acl_index.ACLIndex,
+) -> acl_index.Verdict:
+    """Get the stored verdict, or evaluate the check and store it."""
+    verdict = index.get_verdict(invoker.id, channel.id, command)
+    if verdict is not None:
+        _trace("[{}] Using stored verdict for '{}'.", command, invoker)
+        return verdict
+
+    verdict = _evaluate(level, bot, invoker, command, channel, index)
+    index.set_verdict(invoker.id, channel.id, command, verdict)
+    return verdict
+
+
+def _evaluate(
+    level: ACLevel,
+    bot: Union[commands.Bot, commands.AutoShardedBot],
+    invoker: discord.Member,
+    command: str,
+    channel: discord.abc.Messageable,
+    index: acl_index.ACLIndex,
+) -> acl_index.Verdict:
+    """Evaluate the ACL check in the guild.
+
+    See :func:`acl2_function` for the parameters.
+    """
     member_level = map_member_to_ACLevel(bot=bot, member=invoker)
     if member_level == ACLevel.BOT_OWNER:
-        _acl_trace("Bot owner is always allowed.")
+        _trace("[{}] Bot owner is always allowed.", command)
         return True
 
-    custom_level = ACDefault.get(guild.id, command)
-    if custom_level:
-        level = custom_level.level
+    level = index.defaults.get(command, level)
 
-    _acl_trace(f"Required level '{level.name}'.")
+    _trace("[{}] Required level '{.name}'.", command, level)
 
-    uo = UserOverwrite.get(guild.id, invoker.id, command)
+    uo: Optional[bool] = index.users.get((invoker.id, command))
     if uo is not None:
-        _acl_trace(f"User overwrite for '{invoker}' exists: '{uo.allow}'.")
-        if uo.allow:
+        _trace("[{}] User overwrite for '{}' exists: '{}'.", command, invoker, uo)
+        if uo:
             return True
-        raise NegativeUserOverwrite()
+        return acl_index.Refusal(NegativeUserOverwrite)
 
-    co = ChannelOverwrite.get(guild.id, channel.id, command)
+    co: Optional[bool] = index.channels.get((channel.id, command))
     if co is not None:
-        _acl_trace(f"Channel overwrite for '#{channel.name}' exists: '{co.allow}'.")
-        if co.allow:
+        _trace(
+            "[{}] Channel overwrite for '#{.name}' exists: '{}'.", command, channel, co
+        )
+        if co:
             return True
-        raise NegativeChannelOverwrite(channel=channel)
-
-    for role in invoker.roles:
-        ro = RoleOverwrite.get(guild.id, role.id, command)
-        if ro is not None:
-            _acl_trace(f"Role overwrite for '{role.name}' exists: '{ro.allow}'.")
-            if ro.allow:
-                return True
-            raise NegativeRoleOverwrite(role=role)
+        return acl_index.Refusal(NegativeChannelOverwrite, channel=channel)
+
+    role_overwrites: Dict[int, bool] = index.roles.get(command)
+    if role_overwrites:
+        for role in invoker.roles:
+            ro: Optional[bool] = role_overwrites.get(role.id)
+            if ro is not None:
+                _trace(
+                    "[{}] Role overwrite for '{.name}' exists: '{}'.", command, role, ro
+                )
+                if ro:
+                    return True
+                return acl_index.Refusal(NegativeRoleOverwrite, role=role)
 
     if member_level >= level:
-        _acl_trace(
-            f"Member's level '{member_level.name}' "
-            f"higher than required '{level.name}'."
+        _trace(
+            "[{}] Member's level '{.name}' higher than required '{.name}'.",
+            command,
+            member_level,
+            level,
         )
         return True
 
-    _acl_trace(
-        f"Member's level '{member_level.name}' lower than required '{level.name}'."
+    _trace(
+        "[{}] Member's level '{.name}' lower than required '{.name}'.",
+        command,
+        member_level,
+        level,
     )
-    raise InsufficientACLevel(required=level, actual=member_level)
+    return acl_index.Refusal(InsufficientACLevel, required=level, actual=member_level)
 
 
 # Utility functions
 
 
-def get_hardcoded_ACLevel(command: Callable) -> Optional[ACLevel]:
-    """Inspect the source code and extract ACLevel from the decorator."""
-    source = inspect.getsource(command)
-    match = re.search(r"acl2\(check\.ACLevel\.(.*)\)", source)
-    if not match:
-        return None
-    level = match.group(1)
-    return ACLevel[level]
+def get_hardcoded_ACLevel(
+    command: Union[commands.Command, Callable, None]
+) -> Optional[ACLevel]:
+    """Get ACLevel the command was decorated with.
+
+    :param command: The command or its callback.
+    :return: The level, or ``None`` if the command has no ACL check.
+    """
+    callback = getattr(command, "callback", command)
+    return getattr(callback, "__acl_level__", None)
 
 
 def get_true_ACLevel(
     bot: commands.Bot, guild_id: int, command: str
 ) -> Optional[ACLevel]:
-    """Get command's ACLevel from database or from the source code."""
-    default_overwrite = ACDefault.get(guild_id, command)
-    if default_overwrite:
-        level = default_overwrite.level
-    else:
-        command_obj = bot.get_command(command)
-        level = get_hardcoded_ACLevel(command_obj.callback)
+    """Get command's ACLevel from database or from the decorator."""
+    level = acl_index.get(guild_id).defaults.get(command)
+    if level is None:
+        level = get_hardcoded_ACLevel(bot.get_command(command))
     return level
 
 
+def get_verdicts(
+    bot: commands.Bot,
+    member: discord.Member,
+    channel: discord.abc.GuildChannel,
+    names: Iterable[str],
+) -> Dict[str, bool]:
+    """Check if the member can invoke the commands in the channel.
+
+    All commands are evaluated against the same ACL index of the guild, the
+    member is mapped to their level only once.
+
+    :param bot: Bot instance.
+    :param member: Guild member.
+    :param channel: Channel the commands would be run in.
+    :param names: Qualified names of the commands.
+    :return: Mapping of the command names to the verdicts. Commands without
+        ACLevel can't be invoked.
+    """
+    index = acl_index.get(member.guild.id)
+    verdicts: Dict[str, bool] = {}
+    for command in names:
+        level: Optional[ACLevel] = index.defaults.get(command)
+        if level is None:
+            level = get_hardcoded_ACLevel(bot.get_command(command))
+        if level is None:
+            verdicts[command] = False
+            continue
+        verdict = _get_verdict(level, bot, member, command, channel, index)
+        verdicts[command] = verdict is True
+    return verdicts
+
+
 def can_invoke_command(
     bot: commands.Bot, ctx: commands.Context, command: str
 ) -> Optional[bool]:
@@ -239,19 +320,4 @@ def can_invoke_command(
     if not ctx.guild:
         return None
 
-    command_level = get_true_ACLevel(bot, ctx.guild.id, command)
-    if command_level is None:
-        return False
-
-    try:
-        acl2_function(
-            level=command_level,
-            bot=ctx.bot,
-            invoker=ctx.author,
-            command=command,
-            guild=ctx.guild,
-            channel=ctx.channel,
-        )
-        return True
-    except ACLFailure:
-        return False
+    return get_verdicts(bot, ctx.author, ctx.channel, (command,))[command]
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import enum
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional
 
-from sqlalchemy import BigInteger, Boolean, Column, Enum, String, Integer
+from sqlalchemy import BigInteger, Boolean, Column, Enum, Index, String, Integer
 
-from pie.database import database, session
+from pie.database import database, migrations, session, transfer
+from pie.database.cache import GuildSettings
 
 
 class ACLevel(enum.IntEnum):
@@ -17,46 +18,33 @@ class ACLevel(enum.IntEnum):
     EVERYONE: int = 0
 
 
-class ACDefault(database.base):
+class ACDefault(GuildSettings, database.base):
     __tablename__ = "pie_acl_acdefault"
+    __cache_key__ = ("command",)
 
     idx = Column(Integer, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger)
     command = Column(String)
     level = Column(Enum(ACLevel))
 
-    @staticmethod
-    def add(guild_id: int, command: str, level: ACLevel) -> Optional[ACDefault]:
-        if ACDefault.get(guild_id, command):
+    __table_args__ = (
+        Index("ix_pie_acl_acdefault_guild_id_command", guild_id, command),
+    )
+
+    @classmethod
+    def add(cls, guild_id: int, command: str, level: ACLevel) -> Optional[ACDefault]:
+        if cls.get(guild_id, command):
             return None
 
-        default = ACDefault(guild_id=guild_id, command=command, level=level)
+        default = cls(guild_id=guild_id, command=command, level=level)
         session.add(default)
+        cls.invalidate(guild_id)
         session.commit()
         return default
 
-    @staticmethod
-    def get(guild_id: int, command: str) -> Optional[ACDefault]:
-        default = (
-            session.query(ACDefault)
-            .filter_by(guild_id=guild_id, command=command)
-            .one_or_none()
-        )
-        return default
-
-    @staticmethod
-    def get_all(guild_id: int) -> List[ACDefault]:
-        query = session.query(ACDefault).filter_by(guild_id=guild_id).all()
-        return query
-
-    @staticmethod
-    def remove(guild_id: int, command: str) -> bool:
-        query = (
-            session.query(ACDefault)
-            .filter_by(guild_id=guild_id, command=command)
-            .delete()
-        )
-        return query > 0
+    @classmethod
+    def remove(cls, guild_id: int, command: str) -> bool:
+        return super().remove(guild_id, command) > 0
 
     def __repr__(self) -> str:
         return (
@@ -73,8 +61,9 @@ class ACDefault(database.base):
         }
 
 
-class RoleOverwrite(database.base):
+class RoleOverwrite(GuildSettings, database.base):
     __tablename__ = "pie_acl_role_overwrite"
+    __cache_key__ = ("role_id", "command")
 
     idx = Column(Integer, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger)
@@ -82,41 +71,30 @@ class RoleOverwrite(database.base):
     command = Column(String)
     allow = Column(Boolean)
 
-    @staticmethod
+    __table_args__ = (
+        Index(
+            "ix_pie_acl_role_overwrite_guild_id_role_id_command",
+            guild_id,
+            role_id,
+            command,
+        ),
+    )
+
+    @classmethod
     def add(
-        guild_id: int, role_id: int, command: str, allow: bool
+        cls, guild_id: int, role_id: int, command: str, allow: bool
     ) -> Optional[RoleOverwrite]:
-        if RoleOverwrite.get(guild_id, role_id, command):
+        if cls.get(guild_id, role_id, command):
             return None
-        ro = RoleOverwrite(
-            guild_id=guild_id, role_id=role_id, command=command, allow=allow
-        )
+        ro = cls(guild_id=guild_id, role_id=role_id, command=command, allow=allow)
         session.add(ro)
+        cls.invalidate(guild_id)
         session.commit()
         return ro
 
-    @staticmethod
-    def get(guild_id: int, role_id: int, command: str) -> Optional[RoleOverwrite]:
-        ro = (
-            session.query(RoleOverwrite)
-            .filter_by(guild_id=guild_id, role_id=role_id, command=command)
-            .one_or_none()
-        )
-        return ro
-
-    @staticmethod
-    def get_all(guild_id: int) -> List[RoleOverwrite]:
-        query = session.query(RoleOverwrite).filter_by(guild_id=guild_id).all()
-        return query
-
-    @staticmethod
-    def remove(guild_id: int, role_id: int, command: str) -> bool:
-        query = (
-            session.query(RoleOverwrite)
-            .filter_by(guild_id=guild_id, role_id=role_id, command=command)
-            .delete()
-        )
-        return query > 0
+    @classmethod
+    def remove(cls, guild_id: int, role_id: int, command: str) -> bool:
+        return super().remove(guild_id, role_id, command) > 0
 
     def __repr__(self) -> str:
         return (
@@ -133,8 +111,9 @@ class RoleOverwrite(database.base):
         }
 
 
-class UserOverwrite(database.base):
+class UserOverwrite(GuildSettings, database.base):
     __tablename__ = "pie_acl_user_overwrite"
+    __cache_key__ = ("user_id", "command")
 
     idx = Column(Integer, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger)
@@ -142,41 +121,30 @@ class UserOverwrite(database.base):
     command = Column(String)
     allow = Column(Boolean)
 
-    @staticmethod
+    __table_args__ = (
+        Index(
+            "ix_pie_acl_user_overwrite_guild_id_user_id_command",
+            guild_id,
+            user_id,
+            command,
+        ),
+    )
+
+    @classmethod
     def add(
-        guild_id: int, user_id: int, command: str, allow: bool
+        cls, guild_id: int, user_id: int, command: str, allow: bool
     ) -> Optional[UserOverwrite]:
-        if UserOverwrite.get(guild_id, user_id, command):
+        if cls.get(guild_id, user_id, command):
             return None
-        uo = UserOverwrite(
-            guild_id=guild_id, user_id=user_id, command=command, allow=allow
-        )
+        uo = cls(guild_id=guild_id, user_id=user_id, command=command, allow=allow)
         session.add(uo)
+        cls.invalidate(guild_id)
         session.commit()
         return uo
 
-    @staticmethod
-    def get(guild_id: int, user_id: int, command: str) -> Optional[UserOverwrite]:
-        uo = (
-            session.query(UserOverwrite)
-            .filter_by(guild_id=guild_id, user_id=user_id, command=command)
-            .one_or_none()
-        )
-        return uo
-
-    @staticmethod
-    def get_all(guild_id: int) -> List[UserOverwrite]:
-        query = session.query(UserOverwrite).filter_by(guild_id=guild_id).all()
-        return query
-
-    @staticmethod
-    def remove(guild_id: int, user_id: int, command: str) -> bool:
-        query = (
-            session.query(UserOverwrite)
-            .filter_by(guild_id=guild_id, user_id=user_id, command=command)
-            .delete()
-        )
-        return query > 0
+    @classmethod
+    def remove(cls, guild_id: int, user_id: int, command: str) -> bool:
+        return super().remove(guild_id, user_id, command) > 0
 
     def __repr__(self) -> str:
         return (
@@ -193,8 +161,9 @@ class UserOverwrite(database.base):
         }
 
 
-class ChannelOverwrite(database.base):
+class ChannelOverwrite(GuildSettings, database.base):
     __tablename__ = "pie_acl_channel_overwrite"
+    __cache_key__ = ("channel_id", "command")
 
     idx = Column(Integer, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger)
@@ -202,41 +171,30 @@ class ChannelOverwrite(database.base):
     command = Column(String)
     allow = Column(Boolean)
 
-    @staticmethod
+    __table_args__ = (
+        Index(
+            "ix_pie_acl_channel_overwrite_guild_id_channel_id_command",
+            guild_id,
+            channel_id,
+            command,
+        ),
+    )
+
+    @classmethod
     def add(
-        guild_id: int, channel_id: int, command: str, allow: bool
+        cls, guild_id: int, channel_id: int, command: str, allow: bool
     ) -> Optional[ChannelOverwrite]:
-        if ChannelOverwrite.get(guild_id, channel_id, command):
+        if cls.get(guild_id, channel_id, command):
             return None
-        co = ChannelOverwrite(
-            guild_id=guild_id, channel_id=channel_id, command=command, allow=allow
-        )
+        co = cls(guild_id=guild_id, channel_id=channel_id, command=command, allow=allow)
         session.add(co)
+        cls.invalidate(guild_id)
         session.commit()
         return co
 
-    @staticmethod
-    def get(guild_id: int, channel_id: int, command: str) -> Optional[ChannelOverwrite]:
-        co = (
-            session.query(ChannelOverwrite)
-            .filter_by(guild_id=guild_id, channel_id=channel_id, command=command)
-            .one_or_none()
-        )
-        return co
-
-    @staticmethod
-    def get_all(guild_id: int) -> List[ChannelOverwrite]:
-        query = session.query(ChannelOverwrite).filter_by(guild_id=guild_id).all()
-        return query
-
-    @staticmethod
-    def remove(guild_id: int, channel_id: int, command: str) -> bool:
-        query = (
-            session.query(ChannelOverwrite)
-            .filter_by(guild_id=guild_id, channel_id=channel_id, command=command)
-            .delete()
-        )
-        return query > 0
+    @classmethod
+    def remove(cls, guild_id: int, channel_id: int, command: str) -> bool:
+        return super().remove(guild_id, channel_id, command) > 0
 
     def __repr__(self) -> str:
         return (
@@ -253,41 +211,34 @@ class ChannelOverwrite(database.base):
         }
 
 
-class ACLevelMappping(database.base):
+class ACLevelMappping(GuildSettings, database.base):
     __tablename__ = "pie_acl_aclevel_mapping"
+    __cache_key__ = ("role_id",)
 
     idx = Column(Integer, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger)
     role_id = Column(BigInteger)
     level = Column(Enum(ACLevel))
 
-    def add(guild_id: int, role_id: int, level: ACLevel) -> Optional[ACLevelMappping]:
-        if ACLevelMappping.get(guild_id, role_id):
+    __table_args__ = (
+        Index("ix_pie_acl_aclevel_mapping_guild_id_role_id", guild_id, role_id),
+    )
+
+    @classmethod
+    def add(
+        cls, guild_id: int, role_id: int, level: ACLevel
+    ) -> Optional[ACLevelMappping]:
+        if cls.get(guild_id, role_id):
             return None
-        m = ACLevelMappping(guild_id=guild_id, role_id=role_id, level=level)
+        m = cls(guild_id=guild_id, role_id=role_id, level=level)
         session.add(m)
+        cls.invalidate(guild_id)
         session.commit()
         return m
 
-    def get(guild_id: int, role_id: int) -> Optional[ACLevelMappping]:
-        m = (
-            session.query(ACLevelMappping)
-            .filter_by(guild_id=guild_id, role_id=role_id)
-            .one_or_none()
-        )
-        return m
-
-    def get_all(guild_id: int) -> List[ACLevelMappping]:
-        m = session.query(ACLevelMappping).filter_by(guild_id=guild_id).all()
-        return m
-
-    def remove(guild_id: int, role_id: int) -> bool:
-        query = (
-            session.query(ACLevelMappping)
-            .filter_by(guild_id=guild_id, role_id=role_id)
-            .delete()
-        )
-        return query > 0
+    @classmethod
+    def remove(cls, guild_id: int, role_id: int) -> bool:
+        return super().remove(guild_id, role_id) > 0
 
     def __repr__(self) -> str:
         return (
@@ -302,3 +253,18 @@ class ACLevelMappping(database.base):
             "role_id": self.role_id,
             "level": self.level,
         }
+
+
+migrations.create_indexes(
+    "pie.acl",
+    1,
+    ACDefault,
+    RoleOverwrite,
+    UserOverwrite,
+    ChannelOverwrite,
+    ACLevelMappping,
+)
+
+transfer.register(
+    ACDefault, RoleOverwrite, UserOverwrite, ChannelOverwrite, ACLevelMappping
+)
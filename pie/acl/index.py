@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import collections
+from typing import Any, Dict, Optional, OrderedDict, Tuple, Type, Union
+
+import discord
+from discord.ext import commands
+
+from pie.acl.database import (
+    ACDefault,
+    ACLevel,
+    ACLevelMappping,
+    ChannelOverwrite,
+    RoleOverwrite,
+    UserOverwrite,
+)
+from pie.database.cache import CacheStats
+from pie.exceptions import ACLFailure
+
+# Models the index is built from
+MODELS = (ACDefault, ACLevelMappping, ChannelOverwrite, RoleOverwrite, UserOverwrite)
+
+# Maximal number of verdicts stored for one guild
+MAX_VERDICTS: int = 10_000
+
+
+class VerdictStats(CacheStats):
+    """Counters of the verdict cache."""
+
+    __slots__ = ("evictions",)
+
+    def __init__(self):
+        super().__init__()
+        self.evictions: int = 0
+
+    def __repr__(self) -> str:
+        return f"{super().__repr__()[:-1]} evictions={self.evictions}>"
+
+    def dump(self) -> Dict[str, int]:
+        return {**super().dump(), "evictions": self.evictions}
+
+
+# Counters of the verdict cache of all guilds
+verdict_stats = VerdictStats()
+
+
+class Refusal:
+    """Stored refusal of the check.
+
+    The exception is not stored itself: it would be raised from several
+    tasks at once and each raise would change its traceback and context.
+    A new one is created for every check instead.
+
+    :param error: Exception explaining the refusal.
+    :param kwargs: Arguments of the exception.
+    """
+
+    __slots__ = ("error", "kwargs")
+
+    def __init__(self, error: Type[ACLFailure], **kwargs: Any):
+        self.error = error
+        self.kwargs = kwargs
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} error='{self.error.__name__}'>"
+
+    def exception(self) -> ACLFailure:
+        return self.error(**self.kwargs)
+
+
+# Result of the check: True, or the reason of the refusal
+Verdict = Union[bool, Refusal]
+
+
+class ACLIndex:
+    """ACL settings of one guild, prepared for the permission checks.
+
+    :param guild_id: Guild ID.
+    """
+
+    __slots__ = (
+        "guild_id",
+        "defaults",
+        "mappings",
+        "users",
+        "channels",
+        "roles",
+        "levels",
+        "verdicts",
+        "size",
+    )
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        # Command name to its level
+        self.defaults: Dict[str, ACLevel] = {
+            d.command: d.level for d in ACDefault.get_all(guild_id)
+        }
+        # Role ID to its level
+        self.mappings: Dict[int, ACLevel] = {
+            m.role_id: m.level for m in ACLevelMappping.get_all(guild_id)
+        }
+        # (user ID, command name) to the overwrite
+        self.users: Dict[Tuple[int, str], bool] = {
+            (o.user_id, o.command): o.allow for o in UserOverwrite.get_all(guild_id)
+        }
+        # (channel ID, command name) to the overwrite
+        self.channels: Dict[Tuple[int, str], bool] = {
+            (o.channel_id, o.command): o.allow
+            for o in ChannelOverwrite.get_all(guild_id)
+        }
+        # Command name to the overwrites of its roles
+        self.roles: Dict[str, Dict[int, bool]] = {}
+        for o in RoleOverwrite.get_all(guild_id):
+            self.roles.setdefault(o.command, {})[o.role_id] = o.allow
+        # Member ID to the level given by their roles or ownership
+        self.levels: Dict[int, ACLevel] = {}
+        # Member ID to the verdicts, keyed by (channel ID, command name).
+        # Members are ordered from the least recently checked one.
+        self.verdicts: OrderedDict[int, Dict[Tuple[int, str], Verdict]] = (
+            collections.OrderedDict()
+        )
+        # Number of the stored verdicts
+        self.size: int = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} guild_id='{self.guild_id}' "
+            f"defaults='{len(self.defaults)}' mappings='{len(self.mappings)}' "
+            f"users='{len(self.users)}' channels='{len(self.channels)}' "
+            f"roles='{sum(len(r) for r in self.roles.values())}' "
+            f"levels='{len(self.levels)}' "
+            f"verdicts='{self.size}'>"
+        )
+
+    def get_verdict(
+        self, member_id: int, channel_id: int, command: str
+    ) -> Optional[Verdict]:
+        """Get the stored result of the check."""
+        verdicts = self.verdicts.get(member_id)
+        verdict = None if verdicts is None else verdicts.get((channel_id, command))
+        if verdict is None:
+            verdict_stats.misses += 1
+        else:
+            verdict_stats.hits += 1
+            self.verdicts.move_to_end(member_id)
+        return verdict
+
+    def set_verdict(
+        self, member_id: int, channel_id: int, command: str, verdict: Verdict
+    ) -> None:
+        """Store the result of the check.
+
+        When the guild has more than :data:`MAX_VERDICTS` verdicts, the ones
+        of the least recently checked members are dropped.
+        """
+        verdicts = self.verdicts.get(member_id)
+        if verdicts is None:
+            verdicts = self.verdicts[member_id] = {}
+        else:
+            self.verdicts.move_to_end(member_id)
+        key = (channel_id, command)
+        if key not in verdicts:
+            self.size += 1
+        verdicts[key] = verdict
+
+        while self.size > MAX_VERDICTS and len(self.verdicts) > 1:
+            _, evicted = self.verdicts.popitem(last=False)
+            self.size -= len(evicted)
+            verdict_stats.evictions += 1
+
+    def forget_verdicts(self, member_id: Optional[int] = None) -> bool:
+        """Drop the verdicts of the member, or of all members.
+
+        :return: Whether some verdicts were dropped.
+        """
+        if member_id is None:
+            dropped: bool = bool(self.verdicts)
+            self.verdicts.clear()
+            self.size = 0
+            return dropped
+        verdicts = self.verdicts.pop(member_id, None)
+        if verdicts is None:
+            return False
+        self.size -= len(verdicts)
+        return True
+
+
+_indexes: Dict[int, ACLIndex] = {}
+
+
+def get(guild_id: int) -> ACLIndex:
+    """Get the ACL index of the guild, building it on first use.
+
+    The index is dropped when any of the ACL tables of the guild changes.
+    """
+    index: Optional[ACLIndex] = _indexes.get(guild_id)
+    if index is not None:
+        return index
+
+    index = ACLIndex(guild_id)
+    # Changes of the current session are not visible to other tasks yet
+    if not any(model.is_uncommitted(guild_id) for model in MODELS):
+        _indexes[guild_id] = index
+    return index
+
+
+def invalidate(guild_id: int) -> None:
+    """Drop the ACL index of the guild, including its verdicts."""
+    index: Optional[ACLIndex] = _indexes.pop(guild_id, None)
+    if index is not None and index.verdicts:
+        verdict_stats.invalidations += 1
+
+
+def forget_members(guild_id: Optional[int] = None) -> None:
+    """Drop the levels and verdicts of all members of the guild.
+
+    Use this when the levels of the members could have changed, e.g. after
+    the guild ownership was transferred or the roles were reordered.
+
+    :param guild_id: Guild ID. If ``None``, members of all guilds are dropped.
+    """
+    indexes = _indexes.values() if guild_id is None else [_indexes.get(guild_id)]
+    for index in indexes:
+        if index is None:
+            continue
+        index.levels.clear()
+        if index.forget_verdicts():
+            verdict_stats.invalidations += 1
+
+
+def forget_member(guild_id: int, member_id: int) -> None:
+    """Drop the level and verdicts of the member, e.g. after their roles
+    changed."""
+    index: Optional[ACLIndex] = _indexes.get(guild_id)
+    if index is None:
+        return
+    index.levels.pop(member_id, None)
+    if index.forget_verdicts(member_id):
+        verdict_stats.invalidations += 1
+
+
+def forget_channel(guild_id: int, channel_id: int) -> None:
+    """Drop the verdicts of the channel, e.g. after it was deleted."""
+    index: Optional[ACLIndex] = _indexes.get(guild_id)
+    if index is None:
+        return
+    for verdicts in index.verdicts.values():
+        for key in [key for key in verdicts.keys() if key[0] == channel_id]:
+            del verdicts[key]
+            index.size -= 1
+            verdict_stats.invalidations += 1
+
+
+for _model in MODELS:
+    _model.on_forget(invalidate)
+
+
+# The verdicts depend on the members, roles and channels. The listeners are
+# part of the core, the cache must not depend on the loaded modules.
+
+
+async def on_member_update(before: discord.Member, after: discord.Member):
+    if before.roles != after.roles:
+        forget_member(after.guild.id, after.id)
+
+
+async def on_member_remove(member: discord.Member):
+    forget_member(member.guild.id, member.id)
+
+
+async def on_guild_update(before: discord.Guild, after: discord.Guild):
+    if before.owner_id != after.owner_id:
+        forget_members(after.id)
+
+
+async def on_guild_role_update(before: discord.Role, after: discord.Role):
+    # The highest mapped role decides the level
+    if before.position != after.position:
+        forget_members(after.guild.id)
+
+
+async def on_guild_role_delete(role: discord.Role):
+    forget_members(role.guild.id)
+
+
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    forget_channel(channel.guild.id, channel.id)
+
+
+async def on_thread_delete(thread: discord.Thread):
+    forget_channel(thread.guild.id, thread.id)
+
+
+def add_listeners(bot: commands.Bot) -> None:
+    """Keep the ACL indexes of the bot up to date with the Discord events."""
+    for listener in (
+        on_member_update,
+        on_member_remove,
+        on_guild_update,
+        on_guild_role_update,
+        on_guild_role_delete,
+        on_guild_channel_delete,
+        on_thread_delete,
+    ):
+        bot.add_listener(listener)
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+from typing import Any, Collection, Dict, Hashable, List, Optional, Tuple, Type
+
+from discord.ext import commands
+
+from pie import acl
+from pie.acl.database import (
+    ACDefault,
+    ACLevel,
+    ACLevelMappping,
+    ChannelOverwrite,
+    RoleOverwrite,
+    UserOverwrite,
+)
+from pie.database import session
+from pie.database.cache import GuildSettings
+
+# Sections of the file: name, model and the column holding the value.
+# The rows are identified by the __cache_key__ of the model.
+SECTIONS: Tuple[Tuple[str, Type[GuildSettings], str], ...] = (
+    ("defaults", ACDefault, "level"),
+    ("mappings", ACLevelMappping, "level"),
+    ("role_overwrites", RoleOverwrite, "allow"),
+    ("user_overwrites", UserOverwrite, "allow"),
+    ("channel_overwrites", ChannelOverwrite, "allow"),
+)
+
+# Current or wanted state of one section: row key to the value
+State = Dict[Tuple[Hashable, ...], Any]
+
+
+class Change:
+    """Difference of one row between the guild and the imported file.
+
+    :param section: Name of the section.
+    :param key: Values of the key columns.
+    :param old: Current value, ``None`` if the row will be added.
+    :param new: Imported value, ``None`` if the row will be removed.
+    """
+
+    __slots__ = ("section", "key", "old", "new")
+
+    def __init__(self, section: str, key: tuple, old: Any, new: Any):
+        self.section = section
+        self.key = key
+        self.old = old
+        self.new = new
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} section='{self.section}' "
+            f"key='{self.key}' old='{self.old}' new='{self.new}'>"
+        )
+
+    @property
+    def action(self) -> str:
+        if self.old is None:
+            return "add"
+        if self.new is None:
+            return "remove"
+        return "change"
+
+
+def _encode(value: Any) -> Any:
+    return value.name if isinstance(value, ACLevel) else value
+
+
+def _decode(section: str, column: str, value: Any) -> Any:
+    if column == "level":
+        try:
+            level = ACLevel[value]
+        except (KeyError, TypeError):
+            raise ValueError(f"Invalid level '{value}' in '{section}'.")
+        if section == "mappings" and level in (
+            ACLevel.BOT_OWNER,
+            ACLevel.GUILD_OWNER,
+        ):
+            raise ValueError(f"OWNER levels can't be mapped to roles ('{section}').")
+        return level
+    if not isinstance(value, bool):
+        raise ValueError(f"Invalid value '{value}' in '{section}'.")
+    return value
+
+
+def export_guild(guild_id: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Get all ACL settings of the guild.
+
+    The result can be serialized as JSON and passed to :func:`diff`.
+    """
+    data: Dict[str, List[Dict[str, Any]]] = {}
+    for section, model, column in SECTIONS:
+        data[section] = [
+            {
+                **{key: getattr(row, key) for key in model.__cache_key__},
+                column: _encode(getattr(row, column)),
+            }
+            for row in model.get_all(guild_id)
+        ]
+    return data
+
+
+def _check_key(
+    section: str,
+    name: str,
+    value: Any,
+    bot_commands: Collection[str],
+    *,
+    stored: bool,
+):
+    if name == "command":
+        if not isinstance(value, str):
+            raise ValueError(f"Invalid command '{value}' in '{section}'.")
+        # Rows of unloaded modules are exported as well, they may be kept
+        if value not in bot_commands and not stored:
+            raise ValueError(f"Unknown command '{value}' in '{section}'.")
+        return
+    # bool is a subclass of int, but it is not a valid ID
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError(f"Invalid {name} '{value}' in '{section}'.")
+
+
+def _get_state(guild_id: int, model: Type[GuildSettings], column: str) -> State:
+    return {
+        tuple(getattr(row, key) for key in model.__cache_key__): getattr(row, column)
+        for row in model.get_all(guild_id)
+    }
+
+
+def _parse_state(
+    section: str,
+    model: Type[GuildSettings],
+    column: str,
+    rows: Any,
+    bot_commands: Collection[str],
+    current: State,
+) -> State:
+    if not isinstance(rows, list):
+        raise ValueError(f"Section '{section}' has to be a list.")
+
+    state: State = {}
+    for row in rows:
+        try:
+            key = tuple(row[name] for name in model.__cache_key__)
+            value = row[column]
+        except (KeyError, TypeError):
+            raise ValueError(f"Invalid row in '{section}': {row}.")
+        for name, part in zip(model.__cache_key__, key):
+            _check_key(section, name, part, bot_commands, stored=key in current)
+        if key in state:
+            raise ValueError(f"Duplicate row in '{section}': {row}.")
+        state[key] = _decode(section, column, value)
+    return state
+
+
+def diff(
+    guild_id: int, data: Dict[str, Any], *, bot_commands: Collection[str]
+) -> List[Change]:
+    """Compare the ACL settings of the guild with the imported ones.
+
+    The file describes the complete wanted state; rows of the guild that are
+    not in the file will be removed. Sections missing from the file are left
+    untouched.
+
+    Use :func:`verify` before the changes are applied.
+
+    :param guild_id: Guild ID.
+    :param data: Parsed JSON in the format of :func:`export_guild`.
+    :param bot_commands: Qualified names of the commands of the bot. Other
+        commands are only accepted in rows the guild already has.
+    :return: Changes that make the guild match the file.
+    :raises ValueError: The data are not valid.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("The file has to contain an object.")
+    unknown = set(data.keys()) - {section for section, _, _ in SECTIONS}
+    if unknown:
+        raise ValueError(f"Unknown sections: {', '.join(sorted(unknown))}.")
+
+    changes: List[Change] = []
+    for section, model, column in SECTIONS:
+        if section not in data:
+            continue
+        current: State = _get_state(guild_id, model, column)
+        wanted: State = _parse_state(
+            section, model, column, data[section], bot_commands, current
+        )
+        for key, value in current.items():
+            new: Optional[Any] = wanted.get(key)
+            if new is None:
+                changes.append(Change(section, key, value, None))
+            elif new != value:
+                changes.append(Change(section, key, value, new))
+        for key, value in wanted.items():
+            if key not in current:
+                changes.append(Change(section, key, None, value))
+    return changes
+
+
+def verify(bot: commands.Bot, ctx: commands.Context, changes: List[Change]) -> None:
+    """Check that the invoker may make all of the changes.
+
+    These are the checks of the ``acl`` commands:
+
+    * Mappings can only be added, changed or removed below the invoker's
+      level.
+    * The commands have to be controlled by ACL and the invoker has to be
+      able to invoke them.
+    * The default level can only be set for commands whose level is not
+      higher than the invoker's level.
+
+    Rows of commands the bot does not have anymore can always be removed.
+
+    :param bot: Bot instance.
+    :param ctx: Context of the import.
+    :param changes: Changes returned by :func:`diff`.
+    :raises ValueError: Some of the changes is not allowed, the whole import
+        has to be refused.
+    """
+    models: Dict[str, Type[GuildSettings]] = {
+        section: model for section, model, _ in SECTIONS
+    }
+    level: ACLevel = acl.map_member_to_ACLevel(bot=bot, member=ctx.author)
+
+    for change in changes:
+        if change.section == "mappings":
+            for value in (change.old, change.new):
+                if value is not None and value >= level:
+                    raise ValueError(
+                        f"Your level has to be higher than '{value.name}' "
+                        f"to change '{change.section}'."
+                    )
+            continue
+
+        key = dict(zip(models[change.section].__cache_key__, change.key))
+        command: str = key["command"]
+        if change.action == "remove" and bot.get_command(command) is None:
+            continue
+
+        command_level: Optional[ACLevel] = acl.get_true_ACLevel(
+            bot, ctx.guild.id, command
+        )
+        if command_level is None:
+            raise ValueError(
+                f"Command '{command}' can't be controlled by ACL ('{change.section}')."
+            )
+        if not acl.can_invoke_command(bot, ctx, command):
+            raise ValueError(
+                f"You can't invoke '{command}', you can't alter its permissions "
+                f"('{change.section}')."
+            )
+        if (
+            change.section == "defaults"
+            and change.new is not None
+            and command_level > level
+        ):
+            raise ValueError(
+                f"Level of '{command}' is higher than your level ('{change.section}')."
+            )
+
+
+def apply(guild_id: int, changes: List[Change]) -> None:
+    """Apply the changes in one transaction.
+
+    :param guild_id: Guild ID.
+    :param changes: Changes returned by :func:`diff`.
+    """
+    models: Dict[str, Tuple[Type[GuildSettings], str]] = {
+        section: (model, column) for section, model, column in SECTIONS
+    }
+    try:
+        for change in changes:
+            model, column = models[change.section]
+            key: Dict[str, Any] = dict(zip(model.__cache_key__, change.key))
+            query = session.query(model).filter_by(guild_id=guild_id, **key)
+            if change.action == "add":
+                session.add(model(guild_id=guild_id, **key, **{column: change.new}))
+            elif change.action == "remove":
+                query.delete()
+            else:
+                query.update({column: change.new})
+            model.invalidate(guild_id)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
@@ -1,37 +1,413 @@
+import asyncio
+import contextlib
 import importlib
 import os
-from typing import List
+import time
+import weakref
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.sql import Executable
 
 from pie.cli import COLOR
+from pie.database.stats import Instrumentation
+from pie.database.write_behind import WriteBehind
+
+
+# Drivers used by the asynchronous engine, keyed by the database backend
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+
+def _get_async_url(url: URL) -> URL:
+    """Translate the synchronous connection string to asynchronous one.
+
+    :param url: Connection URL of the synchronous engine.
+    :return: The same URL with the driver replaced by its asyncio counterpart.
+    """
+    backend: str = url.get_backend_name()
+    if url.get_driver_name() in ASYNC_DRIVERS.values():
+        return url
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Database backend '{backend}' has no asynchronous driver.")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def _get_pool_options(url: URL) -> Dict[str, Any]:
+    """Read connection pool settings from the environment.
+
+    .. list-table:: Connection pool variables
+       :widths: 25 25 50
+       :header-rows: 1
+
+       * - Variable
+         - Type
+         - Meaning
+       * - ``DB_POOL_SIZE``
+         - :class:`int`
+         - Number of connections kept open.
+       * - ``DB_MAX_OVERFLOW``
+         - :class:`int`
+         - Number of connections opened above the pool size.
+       * - ``DB_POOL_RECYCLE``
+         - :class:`int`
+         - Number of seconds after which the connection is replaced.
+       * - ``DB_POOL_PRE_PING``
+         - :class:`bool`
+         - Test the connection before it is used.
+
+    Unset variables keep the SQLAlchemy defaults: five connections and ten
+    more under load. SQLite does not keep a pool of connections, the size
+    and overflow are ignored for it.
+    """
+    sqlite: bool = url.get_backend_name() == "sqlite"
+    options: Dict[str, Any] = {}
+    for variable, option, convert in (
+        ("DB_POOL_SIZE", "pool_size", int),
+        ("DB_MAX_OVERFLOW", "max_overflow", int),
+        ("DB_POOL_RECYCLE", "pool_recycle", int),
+        ("DB_POOL_PRE_PING", "pool_pre_ping", lambda v: v.lower() in ("1", "true")),
+    ):
+        if sqlite and option in ("pool_size", "max_overflow"):
+            continue
+        value: Optional[str] = os.getenv(variable)
+        if value:
+            options[option] = convert(value)
+    return options
+
+
+# Statistics of the queries of both engines, see Database.__init__()
+instrumentation = Instrumentation(
+    slow_threshold=int(os.getenv("DB_SLOW_QUERY") or 0) / 1000,
+)
 
 
 class Database:
-    """Main database connector."""
+    """Main database connector.
+
+    When ``DB_STRING_READ`` is set, read-only lookups can be routed to that
+    replica by :meth:`use_replica`. Otherwise :attr:`read_db` is the primary
+    engine.
+    """
 
     def __init__(self):
         self.base = declarative_base()
-        self.db = create_engine(
-            os.getenv("DB_STRING"),
+        url: URL = make_url(os.getenv("DB_STRING"))
+        self.pool_options: Dict[str, Any] = _get_pool_options(url)
+        self.db = self._create_engine(url)
+        self._async_db: Optional[AsyncEngine] = None
+
+        read_url: Optional[str] = os.getenv("DB_STRING_READ")
+        self.read_db = self._create_engine(make_url(read_url)) if read_url else self.db
+        self._async_read_db: Optional[AsyncEngine] = None
+        # Time the replica needs to receive writes of the primary, in seconds
+        self.read_lag: float = int(os.getenv("DB_READ_LAG") or 1000) / 1000
+        self._last_write: float = -self.read_lag
+
+    def _create_engine(self, url: URL) -> Engine:
+        engine = create_engine(
+            url,
             # This forces the SQLAlchemy 1.4 to use the 2.0 syntax
             future=True,
+            **self.pool_options,
         )
+        instrumentation.attach(engine)
+        return engine
+
+    def _create_async_engine(self, engine: Engine) -> AsyncEngine:
+        async_engine = create_async_engine(
+            _get_async_url(engine.url),
+            future=True,
+            **self.pool_options,
+        )
+        instrumentation.attach(async_engine.sync_engine)
+        return async_engine
+
+    @property
+    def async_db(self) -> AsyncEngine:
+        """Asynchronous engine connected to the same database.
+
+        The engine is created on first use, so the asynchronous driver (see
+        :data:`ASYNC_DRIVERS`) is only required when some code actually awaits
+        the database.
+        """
+        if self._async_db is None:
+            self._async_db = self._create_async_engine(self.db)
+        return self._async_db
 
+    @property
+    def async_read_db(self) -> AsyncEngine:
+        """Asynchronous engine connected to the replica."""
+        if self.read_db is self.db:
+            return self.async_db
+        if self._async_read_db is None:
+            self._async_read_db = self._create_async_engine(self.read_db)
+        return self._async_read_db
+
+    def mark_written(self) -> None:
+        """Route the reads to the primary until the replica catches up."""
+        self._last_write = time.monotonic()
+        task: Optional[asyncio.Task] = _current_task()
+        if task is not None:
+            _written_tasks.add(task)
+
+    def use_replica(self) -> bool:
+        """Whether the read-only lookups can be sent to the replica.
+
+        The reads stay on the primary in tasks that have written something,
+        and for :attr:`read_lag` after any write, so the callers always see
+        their own writes.
+        """
+        if self.read_db is self.db or _current_task() in _written_tasks:
+            return False
+        return time.monotonic() - self._last_write >= self.read_lag
+
+    def async_session(self) -> AsyncSession:
+        """Create new asynchronous session.
+
+        The session should be used as a context manager, so its connection is
+        returned to the pool as soon as the work is done:
+
+        .. code-block:: python3
+
+            async with database.async_session() as session:
+                session.add(item)
+                await session.commit()
+
+        Objects are not expired on commit, so they can be safely read after
+        the session is closed.
+        """
+        return AsyncSession(self.async_db, expire_on_commit=False, future=True)
+
+    def _async_read_session(self) -> AsyncSession:
+        engine = self.async_read_db if self.use_replica() else self.async_db
+        return AsyncSession(engine, expire_on_commit=False, future=True)
+
+    async def fetch_one(self, statement: Executable) -> Optional[Any]:
+        """Await the statement and return its only result.
+
+        The statement is sent to the replica if it is possible, see
+        :meth:`use_replica`.
+
+        :param statement: The ``select()`` statement.
+        :return: The ORM object or ``None``.
+        """
+        async with self._async_read_session() as session:
+            result = await session.execute(statement)
+            return result.scalar_one_or_none()
+
+    async def fetch_all(self, statement: Executable) -> List[Any]:
+        """Await the statement and return all its results.
+
+        :param statement: The ``select()`` statement.
+        :return: List of ORM objects.
+        """
+        async with self._async_read_session() as session:
+            result = await session.execute(statement)
+            return result.scalars().all()
+
+
+# Tasks that have flushed changes to the primary. Context variables can't be
+# used, the new tasks would inherit the value from the task creating them.
+_written_tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
 
 database = Database()
-session: Session = sessionmaker(database.db, future=True)()
+session_factory = sessionmaker(database.db, future=True)
+read_session_factory = sessionmaker(database.read_db, future=True)
+
+_global_session: Session = session_factory()
+_task_sessions: Dict[asyncio.Task, Session] = {}
+_task_read_sessions: Dict[asyncio.Task, Session] = {}
+
+
+@event.listens_for(session_factory, "after_flush")
+def _after_flush(flushed: Session, flush_context) -> None:
+    database.mark_written()
+
+
+def _current_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+def get_session() -> Session:
+    """Get the session of current unit of work.
+
+    discord.py runs every event listener in its own :class:`asyncio.Task`.
+    Each task gets its own session, so a failed transaction in one handler
+    does not affect the others. The session is committed when the unit of
+    work ends, or rolled back if it raised an exception. Then it is closed
+    and its connection is returned to the pool.
+
+    The unit of work ends with the task, or sooner by :func:`finish_session`.
+    Long-living tasks (the main task, task loops) have to call it, or wrap
+    their work in :func:`unit_of_work`, otherwise they would keep the
+    connection and the transaction open.
+
+    Code running outside of the event loop (module imports, database
+    initialization) shares one global session.
+    """
+    task: Optional[asyncio.Task] = _current_task()
+    if task is None:
+        return _global_session
+
+    task_session: Optional[Session] = _task_sessions.get(task)
+    if task_session is None:
+        # The objects may outlive the session, they must not be expired
+        task_session = session_factory(expire_on_commit=False)
+        _task_sessions[task] = task_session
+        _watch_task(task)
+    return task_session
+
+
+def get_read_session() -> Session:
+    """Get the session for read-only lookups.
+
+    The session is connected to the replica, unless :meth:`Database.use_replica`
+    says the reads have to stay on the primary; then it is the session
+    returned by :func:`get_session`. Objects loaded through it MUST NOT be
+    modified, the changes would not be written to the primary.
+    """
+    if not database.use_replica():
+        return get_session()
+
+    task: Optional[asyncio.Task] = _current_task()
+    if task is None:
+        return _global_session
+
+    task_session: Optional[Session] = _task_read_sessions.get(task)
+    if task_session is None:
+        task_session = read_session_factory(expire_on_commit=False)
+        _task_read_sessions[task] = task_session
+        _watch_task(task)
+    return task_session
+
+
+# Tasks that will finish their sessions when they are done
+_watched_tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
+
+
+def _watch_task(task: asyncio.Task) -> None:
+    # Long-living tasks open many sessions, register the callback only once
+    if task not in _watched_tasks:
+        _watched_tasks.add(task)
+        task.add_done_callback(_finish_task_sessions)
+
+
+def _finish_task_sessions(task: asyncio.Task) -> None:
+    """Finish the sessions of the task that is done."""
+    _finish_sessions(task, failed=task.cancelled() or task.exception() is not None)
+
+
+def _finish_sessions(task: asyncio.Task, *, failed: bool) -> None:
+    read_session: Optional[Session] = _task_read_sessions.pop(task, None)
+    if read_session is not None:
+        read_session.close()
+
+    task_session: Optional[Session] = _task_sessions.pop(task, None)
+    if task_session is None:
+        return
+    try:
+        if failed:
+            task_session.rollback()
+        else:
+            task_session.commit()
+    except SQLAlchemyError:
+        task_session.rollback()
+        raise
+    finally:
+        task_session.close()
+
+
+def finish_session(*, failed: bool = False) -> None:
+    """End the unit of work of the current task.
+
+    The session is committed, or rolled back if ``failed`` is set, and
+    closed. The next database access in the task opens a new session.
+
+    pumpkin.py calls this after every command invocation. Bodies of
+    :class:`discord.ext.tasks.Loop` have to use :func:`unit_of_work`, the
+    loop task keeps running between the iterations.
+
+    :param failed: Roll the session back instead of committing it.
+    """
+    task: Optional[asyncio.Task] = _current_task()
+    if task is not None:
+        _finish_sessions(task, failed=failed)
+
+
+@contextlib.contextmanager
+def unit_of_work() -> Iterator[None]:
+    """Finish the session of the current task when the block ends.
+
+    .. code-block:: python3
+
+        @tasks.loop(minutes=1)
+        async def process_queue(self):
+            with database.unit_of_work():
+                ...
+    """
+    try:
+        yield
+    except BaseException:
+        finish_session(failed=True)
+        raise
+    finish_session()
+
+
+class ScopedSession:
+    """Proxy to the session of current unit of work.
+
+    Attribute access is forwarded to the session returned by
+    :func:`get_session`, so the models can keep using the module-level
+    ``session`` object.
+
+    :param getter: Function returning the session.
+    """
+
+    def __init__(self, getter: Callable[[], Session] = get_session):
+        self._getter = getter
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._getter(), name)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} session={self._getter()!r}>"
+
+
+session: Session = ScopedSession()
+# Session for read-only lookups, see get_read_session()
+read_session: Session = ScopedSession(get_read_session)
+
+write_behind = WriteBehind(
+    session,
+    session_factory,
+    # The window is set in milliseconds
+    window=int(os.getenv("DB_WRITE_BEHIND_WINDOW") or 0) / 1000,
+    batch_size=int(os.getenv("DB_WRITE_BEHIND_BATCH") or 100),
+)
 
 
 def init_core():
     """Load core models and create their tables.
 
-    This function is responsible for creation of all core tables.
+    This function is responsible for creation of all core tables. Then it
+    applies the migrations registered by the core models, see
+    :mod:`pie.database.migrations`.
     """
     # Everything depends on config, we have to initiate it first
     importlib.import_module("pie.database.config")
-    database.base.metadata.create_all(database.db)
+    from pie.database import migrations
+
+    migrations.create_all()
 
     for module in ("acl", "i18n", "logger", "storage", "spamchannel"):
         import_stub: str = f"pie.{module}.database"
@@ -47,19 +423,24 @@ def init_core():
             )  # noqa: T001
             raise
 
-    database.base.metadata.create_all(database.db)
+    migrations.create_all()
     session.commit()
+    migrations.run()
 
 
 def init_modules():
     """Load all database models and create their tables.
 
-    This function is responsible for creation of all module tables.
+    This function is responsible for creation of all module tables and for
+    application of their migrations.
     """
+    from pie.database import migrations
+
     _import_database_tables()
 
-    database.base.metadata.create_all(database.db)
+    migrations.create_all()
     session.commit()
+    migrations.run()
 
 
 def _list_directory_directories(directory: str) -> List[str]:
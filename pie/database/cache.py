@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Optional, Set, Tuple, Type
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from pie.database import (
+    database,
+    get_session,
+    read_session_factory,
+    session,
+    session_factory,
+)
+
+
+class CacheStats:
+    """Counters of the guild cache of one model."""
+
+    __slots__ = ("hits", "misses", "invalidations")
+
+    def __init__(self):
+        self.hits: int = 0
+        self.misses: int = 0
+        self.invalidations: int = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} hits={self.hits} misses={self.misses} "
+            f"invalidations={self.invalidations}>"
+        )
+
+    def dump(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+class _GuildEntry:
+    """Rows of one guild, indexed by the cache key."""
+
+    __slots__ = ("rows", "index")
+
+    def __init__(self, model: Type[GuildSettings], rows: list):
+        self.rows = rows
+        self.index: Dict[tuple, GuildSettings] = {}
+        for row in rows:
+            key = tuple(getattr(row, column) for column in model.__cache_key__)
+            self.index.setdefault(key, row)
+
+
+# Guilds changed by the sessions, but not committed yet. The other sessions
+# can't see the changes, so the cache can't be refilled before the commit.
+_uncommitted: Dict[Session, Set[Tuple[Type[GuildSettings], int]]] = {}
+
+
+class GuildSettings:
+    """Mixin caching the rows of per-guild settings tables.
+
+    The first lookup loads all rows of the guild, the next lookups are
+    answered from memory. Models using the mixin get ``get()``, ``get_all()``
+    and ``remove()``; their own ``add()`` and other functions changing the
+    table MUST call :meth:`invalidate`.
+
+    .. code-block:: python3
+
+        from pie.database.cache import GuildSettings
+
+        class Item(GuildSettings, database.base):
+            __tablename__ = "bistro_bistro_item"
+            __cache_key__ = ("name",)
+
+            ...
+
+            @classmethod
+            def add(cls, guild_id: int, name: str, description: str) -> Item:
+                query = cls(guild_id=guild_id, name=name, description=description)
+                session.add(query)
+                cls.invalidate(guild_id)
+                session.commit()
+                return query
+
+        Item.get(guild_id, "pizza")
+
+    The cached objects are detached from any session and shared by all
+    callers. They MUST NOT be modified, changes have to be made through
+    queries.
+
+    :attr:`__cache_key__` lists the columns identifying the row inside of
+    the guild, in the order of the ``get()`` arguments.
+    """
+
+    __cache_key__: Tuple[str, ...] = ()
+
+    _MODELS: List[Type[GuildSettings]] = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._guild_cache: Dict[int, _GuildEntry] = {}
+        cls._cache_stats = CacheStats()
+        cls._cache_version: int = 0
+        cls._forget_callbacks: List[Callable[[int], None]] = []
+        GuildSettings._MODELS.append(cls)
+
+    @classmethod
+    def get(cls, guild_id: int, *key) -> Optional[GuildSettings]:
+        """Get the row of the guild.
+
+        :param guild_id: Guild ID.
+        :param key: Values of the :attr:`__cache_key__` columns.
+        """
+        return cls._get_guild(guild_id).index.get(key)
+
+    @classmethod
+    def get_all(cls, guild_id: int) -> List[GuildSettings]:
+        """Get all rows of the guild."""
+        return list(cls._get_guild(guild_id).rows)
+
+    @classmethod
+    async def get_async(cls, guild_id: int, *key) -> Optional[GuildSettings]:
+        """Get the row of the guild without blocking.
+
+        See :meth:`get` for the parameters.
+        """
+        return (await cls._get_guild_async(guild_id)).index.get(key)
+
+    @classmethod
+    async def get_all_async(cls, guild_id: int) -> List[GuildSettings]:
+        """Get all rows of the guild without blocking."""
+        return list((await cls._get_guild_async(guild_id)).rows)
+
+    @classmethod
+    def remove(cls, guild_id: int, *key) -> int:
+        """Remove the row of the guild.
+
+        See :meth:`get` for the parameters.
+
+        :return: Number of removed rows.
+        """
+        query = (
+            session.query(cls)
+            .filter_by(guild_id=guild_id, **dict(zip(cls.__cache_key__, key)))
+            .delete()
+        )
+        cls.invalidate(guild_id)
+        return query
+
+    @classmethod
+    def invalidate(cls, guild_id: int) -> None:
+        """Drop the cached rows of the guild.
+
+        Until the current session is committed, lookups of the guild are
+        sent to this session, so the caller sees its own changes.
+        """
+        cls.forget(guild_id)
+        _uncommitted.setdefault(get_session(), set()).add((cls, guild_id))
+
+    @classmethod
+    def cache_stats(cls) -> CacheStats:
+        """Get hit and miss counters of the model."""
+        return cls._cache_stats
+
+    @staticmethod
+    def get_cache_stats() -> Dict[str, CacheStats]:
+        """Get counters of all models using the mixin."""
+        return {model.__name__: model._cache_stats for model in GuildSettings._MODELS}
+
+    @classmethod
+    def forget(cls, guild_id: int) -> None:
+        """Drop the cached rows of the guild changed outside of the model.
+
+        Unlike :meth:`invalidate`, the current session is not involved; use
+        this after the table was changed through another connection.
+        """
+        cls._cache_version += 1
+        if cls._guild_cache.pop(guild_id, None) is not None:
+            cls._cache_stats.invalidations += 1
+        for callback in cls._forget_callbacks:
+            callback(guild_id)
+
+    @classmethod
+    def on_forget(cls, callback: Callable[[int], None]) -> None:
+        """Call the function with the guild ID whenever the guild is dropped.
+
+        Use this to drop data derived from the rows of the model.
+        """
+        cls._forget_callbacks.append(callback)
+
+    @classmethod
+    def is_uncommitted(cls, guild_id: int) -> bool:
+        """Whether the current session has uncommitted changes of the guild.
+
+        Data derived from the rows of such guild must not be cached.
+        """
+        if not _uncommitted:
+            return False
+        return (cls, guild_id) in _uncommitted.get(get_session(), ())
+
+    @classmethod
+    def _get_guild(cls, guild_id: int) -> _GuildEntry:
+        if cls.is_uncommitted(guild_id):
+            cls._cache_stats.misses += 1
+            return _GuildEntry(
+                cls, session.query(cls).filter_by(guild_id=guild_id).all()
+            )
+
+        entry: Optional[_GuildEntry] = cls._guild_cache.get(guild_id)
+        if entry is not None:
+            cls._cache_stats.hits += 1
+            return entry
+
+        cls._cache_stats.misses += 1
+        factory = read_session_factory if database.use_replica() else session_factory
+        with factory(expire_on_commit=False) as loader:
+            rows = loader.query(cls).filter_by(guild_id=guild_id).all()
+        entry = cls._guild_cache[guild_id] = _GuildEntry(cls, rows)
+        return entry
+
+    @classmethod
+    async def _get_guild_async(cls, guild_id: int) -> _GuildEntry:
+        if cls.is_uncommitted(guild_id):
+            return cls._get_guild(guild_id)
+
+        entry: Optional[_GuildEntry] = cls._guild_cache.get(guild_id)
+        if entry is not None:
+            cls._cache_stats.hits += 1
+            return entry
+
+        cls._cache_stats.misses += 1
+        version: int = cls._cache_version
+        rows = await database.fetch_all(select(cls).filter_by(guild_id=guild_id))
+        entry = _GuildEntry(cls, rows)
+        # The table may have been changed while the query was awaited
+        if version == cls._cache_version:
+            cls._guild_cache[guild_id] = entry
+        return entry
+
+
+@event.listens_for(session_factory, "after_commit")
+@event.listens_for(session_factory, "after_rollback")
+def _after_transaction(finished: Session) -> None:
+    """Drop the guilds changed by the session once again.
+
+    Other tasks could have loaded the rows before the changes were committed.
+    """
+    for model, guild_id in _uncommitted.pop(finished, ()):
+        model.forget(guild_id)
@@ -1,13 +1,25 @@
 from __future__ import annotations
-from typing import Dict, Union
+
+import traceback
+from typing import Callable, Dict, List, Optional, Union
 
 from sqlalchemy import Column, String, Integer
 
 from pie.database import database, session
 
 
+# The loaded configuration, shared by all callers of Config.get()
+_instance: Optional[Config] = None
+# Functions called after the configuration has been saved
+_subscribers: List[Callable[[Config], None]] = []
+
+
 class Config(database.base):
-    """Global bot configuration."""
+    """Global bot configuration.
+
+    The configuration is loaded once and kept in memory, reading its
+    attributes does not touch the database.
+    """
 
     __tablename__ = "config"
 
@@ -38,18 +50,51 @@ class Config(database.base):
            * - status
              - :class:`str`
              - ``online``
+
+        The same object is returned by every call.
         """
+        global _instance
+        if _instance is not None:
+            return _instance
+
         query = session.query(Config).one_or_none()
         if query is None:
             query = Config()
             session.add(query)
             session.commit()
+        # Detach the object, so commits of the session don't expire it
+        session.refresh(query)
+        session.expunge(query)
+        _instance = query
         return query
 
+    @staticmethod
+    def subscribe(callback: Callable[[Config], None]) -> None:
+        """Call the function every time the configuration is saved.
+
+        :param callback: Function taking the saved :class:`Config`.
+        """
+        _subscribers.append(callback)
+
+    @staticmethod
+    def forget() -> None:
+        """Load the configuration from the database on next use."""
+        global _instance
+        _instance = None
+
     def save(self) -> None:
-        """Save global settings."""
+        """Save global settings and notify the subscribers.
+
+        The settings are already committed when the subscribers are called,
+        their errors are printed and don't stop the other subscribers.
+        """
         session.merge(self)
         session.commit()
+        for callback in _subscribers:
+            try:
+                callback(self)
+            except Exception:
+                traceback.print_exc()
 
     def __repr__(self) -> str:
         return (
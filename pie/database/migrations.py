@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import Column, Index, Integer, MetaData, String, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from pie.cli import COLOR
+from pie.database import database
+
+
+class SchemaVersion(database.base):
+    """Version of the schema, as applied by the migrations.
+
+    Each scope (``pie.acl``, ``base.base``, ...) has its own version, so the
+    modules can be installed and updated independently.
+    """
+
+    __tablename__ = "pie_database_migrations"
+
+    scope = Column(String, primary_key=True)
+    version = Column(Integer, default=0)
+
+    def __repr__(self) -> str:
+        return f'<SchemaVersion scope="{self.scope}" version="{self.version}">'
+
+    def dump(self) -> Dict[str, object]:
+        return {
+            "scope": self.scope,
+            "version": self.version,
+        }
+
+
+class SchemaFingerprint(database.base):
+    """Fingerprint of the schema created by :func:`create_all`.
+
+    Delete the rows to make the next startup check all tables again.
+    """
+
+    __tablename__ = "pie_database_schema"
+
+    fingerprint = Column(String, primary_key=True)
+
+    def __repr__(self) -> str:
+        return f'<SchemaFingerprint fingerprint="{self.fingerprint}">'
+
+    def dump(self) -> Dict[str, object]:
+        return {
+            "fingerprint": self.fingerprint,
+        }
+
+
+class Migration:
+    """One step of the schema update.
+
+    :param scope: Name of the package or module owning the tables.
+    :param version: Version the schema will have after the step.
+    :param function: Function altering the schema through the connection.
+    :param transactional: Whether the step runs inside of a transaction.
+        Some operations (e.g. ``CREATE INDEX CONCURRENTLY``) are not allowed
+        there.
+    """
+
+    __slots__ = ("scope", "version", "function", "transactional")
+
+    def __init__(
+        self,
+        scope: str,
+        version: int,
+        function: Callable[[Connection], None],
+        *,
+        transactional: bool = True,
+    ):
+        self.scope = scope
+        self.version = version
+        self.function = function
+        self.transactional = transactional
+
+    def __repr__(self) -> str:
+        return (
+            f'<Migration scope="{self.scope}" version="{self.version}" '
+            f'function="{self.function.__name__}">'
+        )
+
+
+_MIGRATIONS: Dict[str, Dict[int, Migration]] = {}
+
+
+def register(
+    scope: str, version: int, *, transactional: bool = True
+) -> Callable[[Callable[[Connection], None]], Callable[[Connection], None]]:
+    """Register migration step.
+
+    The steps are run by :func:`run` after the tables are created. Because
+    the tables of new installations already have the current schema, the
+    steps MUST be idempotent.
+
+    .. code-block:: python3
+
+        from pie.database import migrations
+
+        @migrations.register("bistro.bistro", 1)
+        def add_price(connection):
+            ...
+
+    :param scope: Name of the package or module owning the tables.
+    :param version: Version the schema will have after the step. Versions
+        start at ``1`` and are applied in ascending order.
+    :param transactional: Whether the step runs inside of a transaction.
+    :raises ValueError: The version of the scope is already registered.
+    """
+
+    def decorator(function: Callable[[Connection], None]):
+        steps: Dict[int, Migration] = _MIGRATIONS.setdefault(scope, {})
+        if version in steps:
+            raise ValueError(f"Migration {scope} {version} is already registered.")
+        steps[version] = Migration(
+            scope, version, function, transactional=transactional
+        )
+        return function
+
+    return decorator
+
+
+def create_indexes(scope: str, version: int, *models: type) -> None:
+    """Register migration creating indexes declared on the models.
+
+    New tables get their indexes from ``create_all``; this step adds them to
+    tables of existing deployments. On PostgreSQL the indexes are built
+    concurrently, so the tables stay writable while the bot is starting.
+
+    :param scope: Name of the package or module owning the tables.
+    :param version: Version the schema will have after the step.
+    :param models: Models whose ``__table_args__`` contain the indexes.
+    """
+    indexes: List[Index] = []
+    for model in models:
+        indexes += sorted(model.__table__.indexes, key=lambda i: i.name)
+
+    def add_indexes(connection: Connection) -> None:
+        for index in indexes:
+            _create_index(connection, index)
+
+    register(scope, version, transactional=False)(add_indexes)
+
+
+def _create_index(connection: Connection, index: Index) -> None:
+    """Create the index, unless it already exists.
+
+    A failed ``CREATE INDEX CONCURRENTLY`` leaves an invalid index behind on
+    PostgreSQL. ``IF NOT EXISTS`` would skip it, so it is dropped and built
+    again.
+    """
+    preparer = connection.dialect.identifier_preparer
+    name: str = preparer.quote(index.name)
+    if index.table.schema:
+        name = f"{preparer.quote_schema(index.table.schema)}.{name}"
+
+    postgresql: bool = connection.dialect.name == "postgresql"
+    concurrently: str = " CONCURRENTLY" if postgresql else ""
+    if postgresql and _is_invalid_index(connection, name):
+        connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+    unique: str = " UNIQUE" if index.unique else ""
+    columns: str = ", ".join(preparer.quote(column.name) for column in index.columns)
+    connection.execute(
+        text(
+            f"CREATE{unique} INDEX{concurrently} IF NOT EXISTS {name} "
+            f"ON {preparer.format_table(index.table)} ({columns})"
+        )
+    )
+
+
+def _is_invalid_index(connection: Connection, name: str) -> bool:
+    """Whether the PostgreSQL index exists, but can't be used.
+
+    :param name: Quoted name of the index, optionally with the schema.
+    """
+    valid: Optional[bool] = connection.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": name},
+    ).scalar()
+    return valid is False
+
+
+def get_fingerprint(metadata: MetaData, engine: Engine) -> str:
+    """Hash the DDL of all tables and indexes of the metadata.
+
+    The DDL is only compiled, the database is not queried.
+    """
+    digest = hashlib.sha256()
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        digest.update(str(CreateTable(table).compile(dialect=engine.dialect)).encode())
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            digest.update(
+                str(CreateIndex(index).compile(dialect=engine.dialect)).encode()
+            )
+    return digest.hexdigest()
+
+
+def create_all() -> None:
+    """Create tables that don't exist.
+
+    ``metadata.create_all()`` inspects every table in the database, which
+    gets slow as more modules are installed. The fingerprint of the created
+    schema is stored, and the inspection is skipped when the tables of the
+    metadata have not changed since. Only the current fingerprint is kept.
+    """
+    metadata: MetaData = database.base.metadata
+    fingerprint: str = get_fingerprint(metadata, database.db)
+
+    table = SchemaFingerprint.__table__
+    try:
+        with database.db.connect() as connection:
+            known = connection.execute(
+                select(table.c.fingerprint).where(table.c.fingerprint == fingerprint)
+            ).first()
+    except SQLAlchemyError:
+        # The fingerprint table does not exist yet
+        known = None
+    if known is not None:
+        return
+
+    metadata.create_all(database.db)
+    try:
+        with database.db.begin() as connection:
+            connection.execute(table.delete().where(table.c.fingerprint != fingerprint))
+            connection.execute(table.insert().values(fingerprint=fingerprint))
+    except IntegrityError:
+        # Another instance started at the same time and stored it first
+        pass
+
+
+def run() -> None:
+    """Apply registered migrations that were not applied yet."""
+    with database.db.connect() as connection:
+        applied: Dict[str, int] = {
+            row.scope: row.version
+            for row in connection.execute(SchemaVersion.__table__.select())
+        }
+
+    for scope, steps in sorted(_MIGRATIONS.items()):
+        current: int = applied.get(scope, 0)
+        for version in sorted(v for v in steps.keys() if v > current):
+            _apply(steps[version], previous=applied.get(scope))
+            applied[scope] = version
+            print(
+                f"Database migration {COLOR.green}{scope}{COLOR.none} "
+                f"applied version {COLOR.green}{version}{COLOR.none}."
+            )  # noqa: T001
+
+
+def _apply(migration: Migration, *, previous: Optional[int]) -> None:
+    """Run the migration step and store the new version."""
+    table = SchemaVersion.__table__
+    if previous is None:
+        update = table.insert().values(scope=migration.scope, version=migration.version)
+    else:
+        update = (
+            table.update()
+            .where(table.c.scope == migration.scope)
+            .values(version=migration.version)
+        )
+
+    if migration.transactional:
+        with database.db.begin() as connection:
+            migration.function(connection)
+            connection.execute(update)
+        return
+
+    with database.db.connect() as connection:
+        autocommit = connection.execution_options(isolation_level="AUTOCOMMIT")
+        migration.function(autocommit)
+    with database.db.begin() as connection:
+        connection.execute(update)
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import sys
+import time
+import traceback
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Set in tasks logging slow queries, so their own queries are not reported
+_reporting: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "pie_database_reporting", default=False
+)
+
+# Prefix of the task names discord.py uses for event handlers
+EVENT_TASK_PREFIX: str = "discord.py: "
+
+
+class QueryStats:
+    """Aggregated timing of the queries.
+
+    :param name: Name of the command or event, or text of the statement.
+    """
+
+    __slots__ = ("name", "invocations", "count", "total", "slowest", "statement")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.invocations: int = 0
+        self.count: int = 0
+        self.total: float = 0.0
+        self.slowest: float = 0.0
+        self.statement: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return (
+            f'<{self.__class__.__name__} name="{self.name}" count="{self.count}" '
+            f'total="{self.total:.3f}" slowest="{self.slowest:.3f}">'
+        )
+
+    def add(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        if duration > self.slowest:
+            self.slowest = duration
+            self.statement = statement
+
+    def dump(self) -> dict:
+        return {
+            "name": self.name,
+            "invocations": self.invocations,
+            "count": self.count,
+            "total": self.total,
+            "slowest": self.slowest,
+            "statement": self.statement,
+        }
+
+
+class Instrumentation:
+    """Measure queries of the engines and attribute them to their callers.
+
+    The queries are attributed to the source set by :meth:`attribute` (the
+    bot sets the name of the invoked command). If the task has no source,
+    the name of the gateway event is used; discord.py runs each handler in
+    a task named after the event.
+
+    :param slow_threshold: Number of seconds after which the query is
+        reported to the bot log. ``0`` disables the reports.
+    :param max_statements: Number of distinct statements kept in the
+        statistics. Statements seen after the limit is reached are only
+        counted towards their source.
+    """
+
+    def __init__(self, *, slow_threshold: float, max_statements: int = 1000):
+        self.slow_threshold = slow_threshold
+        self.max_statements = max_statements
+
+        self.sources: Dict[str, QueryStats] = {}
+        self.statements: Dict[str, QueryStats] = {}
+
+        # Attribution of the queries made by the current task
+        self._source: contextvars.ContextVar[Optional[QueryStats]] = (
+            contextvars.ContextVar(f"pie_database_source_{id(self)}", default=None)
+        )
+        # Running reports; the loop only keeps weak references to the tasks
+        self._reports: Set[asyncio.Task] = set()
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} slow_threshold={self.slow_threshold} "
+            f"sources={len(self.sources)} statements={len(self.statements)}>"
+        )
+
+    def attach(self, engine: Engine) -> None:
+        """Start measuring queries of the engine.
+
+        For asynchronous engines, pass their ``sync_engine``.
+        """
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def attribute(self, name: str) -> contextvars.Token:
+        """Attribute the following queries of the current task to the source.
+
+        :param name: Source of the queries, e.g. ``command language set``.
+        :return: Token for :meth:`restore`.
+        """
+        stats: QueryStats = self._get_source(name)
+        stats.invocations += 1
+        return self._source.set(stats)
+
+    def restore(self, token: contextvars.Token) -> None:
+        """Attribute the following queries to the previous source again."""
+        self._source.reset(token)
+
+    def reset(self) -> None:
+        """Forget collected statistics."""
+        self.sources.clear()
+        self.statements.clear()
+
+    def top_sources(self, limit: int) -> List[QueryStats]:
+        """Get commands and events that spent the most time in the database."""
+        return sorted(self.sources.values(), key=lambda s: s.total, reverse=True)[
+            :limit
+        ]
+
+    def top_statements(self, limit: int) -> List[QueryStats]:
+        """Get statements that spent the most time in the database."""
+        return sorted(self.statements.values(), key=lambda s: s.total, reverse=True)[
+            :limit
+        ]
+
+    def _get_source(self, name: str) -> QueryStats:
+        stats: Optional[QueryStats] = self.sources.get(name)
+        if stats is None:
+            stats = self.sources[name] = QueryStats(name)
+        return stats
+
+    def _current_source(self) -> QueryStats:
+        """Get the source of the current task, resolving it on first query."""
+        stats: Optional[QueryStats] = self._source.get()
+        if stats is not None:
+            return stats
+
+        try:
+            task: Optional[asyncio.Task] = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is None:
+            return self._get_source("(no task)")
+
+        task_name: str = task.get_name()
+        if task_name.startswith(EVENT_TASK_PREFIX):
+            name = "event " + task_name[len(EVENT_TASK_PREFIX) :]
+        else:
+            name = "(background task)"
+        self.attribute(name)
+        return self._source.get()
+
+    def _before_cursor_execute(
+        self, connection, cursor, statement, parameters, context, executemany
+    ):
+        context._pie_query_start = time.perf_counter()
+
+    def _after_cursor_execute(
+        self, connection, cursor, statement, parameters, context, executemany
+    ):
+        duration: float = time.perf_counter() - context._pie_query_start
+
+        source: QueryStats = self._current_source()
+        source.add(statement, duration)
+
+        stats: Optional[QueryStats] = self.statements.get(statement)
+        if stats is None and len(self.statements) < self.max_statements:
+            stats = self.statements[statement] = QueryStats(statement)
+        if stats is not None:
+            stats.add(statement, duration)
+
+        if 0 < self.slow_threshold <= duration and not _reporting.get():
+            self._report(source.name, statement, duration)
+
+    def _report(self, source: str, statement: str, duration: float) -> None:
+        """Schedule the slow query report."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # The bot logger is only available while the bot runs
+            return
+        task = loop.create_task(self._log_slow_query(source, statement, duration))
+        self._reports.add(task)
+        task.add_done_callback(self._finish_report)
+
+    def _finish_report(self, task: asyncio.Task) -> None:
+        self._reports.discard(task)
+        # Retrieve the exception, so it is not lost
+        if not task.cancelled() and task.exception() is not None:
+            error = task.exception()
+            print("Slow query report failed:", file=sys.stderr)  # noqa: T001
+            traceback.print_exception(type(error), error, error.__traceback__)
+
+    async def _log_slow_query(
+        self, source: str, statement: str, duration: float
+    ) -> None:
+        # The logger reads its configuration from the database
+        from pie import logger
+
+        _reporting.set(True)
+        await logger.Bot.logger().warning(
+            None,
+            None,
+            f"Slow database query ({duration * 1000:.0f} ms) in {source}: "
+            + " ".join(statement.split()),
+        )
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import datetime
+import enum
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from sqlalchemy import Column, Table, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.types import Date, DateTime
+
+from pie.database import database, write_behind
+
+
+# Tables whose rows can be exported, keyed by the table name
+_TABLES: Dict[str, Table] = {}
+# Models of the tables, their caches have to be dropped after the import
+_MODELS: Dict[str, type] = {}
+
+
+def register(*models: type) -> None:
+    """Register models whose rows belong to the guild.
+
+    The table MUST have a ``guild_id`` column. Modules call this at the end
+    of their ``database.py``:
+
+    .. code-block:: python3
+
+        from pie.database import transfer
+
+        transfer.register(Item)
+
+    :param models: Database models.
+    :raises ValueError: The table has no ``guild_id`` column.
+    """
+    for model in models:
+        table: Table = model.__table__
+        if "guild_id" not in table.columns:
+            raise ValueError(f"Table {table.name} has no 'guild_id' column.")
+        _TABLES[table.name] = table
+        _MODELS[table.name] = model
+
+
+def _get_columns(table: Table) -> List[Column]:
+    """Get columns to export.
+
+    Primary keys declared with ``autoincrement=True`` are generated by the
+    database, they are left out.
+    """
+    return [c for c in table.columns if not (c.primary_key and c.autoincrement is True)]
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.name
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def _decode(column: Column, value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.datetime.fromisoformat(value)
+    if isinstance(column.type, Date):
+        return datetime.date.fromisoformat(value)
+    return value
+
+
+def _decode_row(table: Table, row: Dict[str, Any], guild_id: int) -> Dict[str, Any]:
+    """Prepare the exported row for the insert into the guild."""
+    values: Dict[str, Any] = {
+        c.name: _decode(c, row[c.name]) for c in _get_columns(table) if c.name in row
+    }
+    values["guild_id"] = guild_id
+    return values
+
+
+def export_guild(
+    guild_id: int, handle: TextIO, *, batch_size: int = 1000, flush: bool = True
+) -> Dict[str, int]:
+    """Write all registered rows of the guild as JSON lines.
+
+    Each line contains one row: ``{"table": "...", "row": {...}}``. The rows
+    are read in batches through server-side cursors, so the whole table is
+    never loaded into memory.
+
+    :param guild_id: Guild ID.
+    :param handle: Text file the lines are written to.
+    :param batch_size: Number of rows fetched at once.
+    :param flush: Whether to flush :data:`pie.database.write_behind` first,
+        so pending writes are exported too. Pass ``False`` when running in a
+        worker thread; the queue belongs to the event loop and has to be
+        flushed before the thread is started.
+    :return: Number of exported rows, keyed by the table name.
+    """
+    if flush:
+        write_behind.flush()
+
+    counts: Dict[str, int] = {}
+    with database.db.connect() as connection:
+        streaming = connection.execution_options(yield_per=batch_size)
+        for name, table in _TABLES.items():
+            columns: List[Column] = _get_columns(table)
+            result = streaming.execute(
+                select(*columns).where(table.c.guild_id == guild_id)
+            )
+            counts[name] = 0
+            for partition in result.partitions():
+                for row in partition:
+                    line = {
+                        "table": name,
+                        "row": {c.name: _encode(row._mapping[c]) for c in columns},
+                    }
+                    handle.write(json.dumps(line, ensure_ascii=False) + "\n")
+                counts[name] += len(partition)
+    return counts
+
+
+def _read_rows(handle: TextIO, guild_id: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Read and decode the lines of the export one by one.
+
+    Rows of tables that are not registered on this instance are skipped.
+
+    :raises ValueError: Some line is not a valid row.
+    :return: Table names and the decoded rows.
+    """
+    for number, line in enumerate(handle, start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            name, row = item["table"], item["row"]
+        except (ValueError, TypeError, KeyError) as exc:
+            raise ValueError(f"Line {number} is not an exported row.") from exc
+
+        table: Optional[Table] = _TABLES.get(name)
+        if table is None:
+            # The module is not installed on this instance
+            continue
+        if not isinstance(row, dict):
+            raise ValueError(f"Line {number} is not an exported row.")
+        unknown = set(row.keys()) - {c.name for c in _get_columns(table)}
+        if unknown:
+            raise ValueError(
+                f"Line {number} contains unknown columns: "
+                f"{', '.join(sorted(unknown))}."
+            )
+        exported_id = row.get("guild_id")
+        if not isinstance(exported_id, int) or isinstance(exported_id, bool):
+            raise ValueError(f"Line {number} has invalid guild_id '{exported_id}'.")
+        try:
+            values = _decode_row(table, row, guild_id)
+        except (ValueError, TypeError) as exc:
+            raise ValueError(f"Line {number} contains invalid value: {exc}") from exc
+        yield name, values
+
+
+def import_guild(
+    guild_id: int, handle: TextIO, *, batch_size: int = 5000, flush: bool = True
+) -> Dict[str, int]:
+    """Replace rows of the guild by the rows of the export.
+
+    The file is read twice and never loaded as a whole. The first pass only
+    validates it. The second one inserts the rows in batches, in the same
+    transaction that deletes the existing rows of the guild from all
+    registered tables, so a failed import does not change anything.
+
+    The guild ID of the rows is replaced by ``guild_id``, so the settings can
+    be moved to another guild as well. Tables that are not registered on
+    this instance are skipped.
+
+    Models caching their rows should provide ``forget(guild_id)``, it is
+    called by :func:`forget_guild` after the import
+    (:class:`~pie.database.cache.GuildSettings` already does).
+
+    :param guild_id: Guild ID.
+    :param handle: Seekable text file produced by :func:`export_guild`.
+    :param batch_size: Number of rows inserted at once.
+    :param flush: Whether to flush :data:`pie.database.write_behind` before
+        the import and to call :func:`forget_guild` after it. Pass ``False``
+        when running in a worker thread and do both on the event loop
+        thread.
+    :raises ValueError: The file is not valid, nothing was imported.
+    :return: Number of imported rows, keyed by the table name.
+    """
+    start: int = handle.tell()
+    for _ in _read_rows(handle, guild_id):
+        pass
+    handle.seek(start)
+
+    if flush:
+        write_behind.flush()
+
+    counts: Dict[str, int] = {}
+    with database.db.begin() as connection:
+        for table in _TABLES.values():
+            connection.execute(table.delete().where(table.c.guild_id == guild_id))
+
+        batch: Dict[str, List[Dict[str, Any]]] = {}
+        size: int = 0
+        for name, values in _read_rows(handle, guild_id):
+            batch.setdefault(name, []).append(values)
+            counts[name] = counts.get(name, 0) + 1
+            size += 1
+            if size >= batch_size:
+                _insert(connection, batch)
+                batch, size = {}, 0
+        _insert(connection, batch)
+
+    if flush:
+        forget_guild(guild_id)
+    return counts
+
+
+def _insert(connection: Connection, batch: Dict[str, List[Dict[str, Any]]]) -> None:
+    for name, rows in batch.items():
+        connection.execute(_TABLES[name].insert(), rows)
+
+
+def forget_guild(guild_id: int) -> None:
+    """Drop the cached rows of the guild after they were imported."""
+    for model in _MODELS.values():
+        forget: Optional[Callable[[int], None]] = getattr(model, "forget", None)
+        if forget is not None:
+            forget(guild_id)
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import sys
+import traceback
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, sessionmaker
+
+
+# Returned by lookup() when there is no pending write for the key
+MISSING = object()
+
+# Key of the pending write; the first item is always the table name
+WriteKey = Tuple[Hashable, ...]
+
+# Function applying the write to the session, returning the written row
+WriteFunction = Callable[[Session], Any]
+
+# Called with the key and the exception when a write can't be committed
+FailureHandler = Callable[[WriteKey, Exception], None]
+
+
+class WriteBehind:
+    """Queue grouping model writes into shared transactions.
+
+    The models pass their ``add()``/``set()``/``remove()`` calls to
+    :meth:`write`. When the queue is disabled, the write is committed
+    immediately. When it is enabled, the queue commits all of them in one
+    transaction when the window elapses or when the batch is full.
+
+    Each write has a key (table name and the identity of the row). Writes
+    with the same key replace each other, only the last one is committed.
+    Until then, :meth:`lookup` returns the written value, so the models can
+    read their own writes. Queries which can't be answered by the key (e.g.
+    listing the table) have to call :meth:`sync` first.
+
+    The queue is flushed on interpreter exit.
+
+    Writes that can't be committed are reported to :attr:`on_failure`, the
+    bot sets it to log them to the bot log. It is only called from the event
+    loop; on exit, the failures are printed to the standard error output.
+
+    :param session: Session used when the queue is disabled.
+    :param factory: Factory for the flush sessions.
+    :param window: Number of seconds the writes may wait. ``0`` disables the
+        queue and the writes are committed immediately.
+    :param batch_size: Number of writes that triggers the flush immediately.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        factory: sessionmaker,
+        *,
+        window: float,
+        batch_size: int,
+    ):
+        self.session = session
+        self.factory = factory
+        self.window = window
+        self.batch_size = batch_size
+
+        self._pending: Dict[WriteKey, Tuple[WriteFunction, Any]] = {}
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+        self.on_failure: Optional[FailureHandler] = None
+
+        self.queued: int = 0
+        self.commits: int = 0
+        self.failed: int = 0
+
+        if self.enabled:
+            atexit.register(self.flush)
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} window={self.window} "
+            f"batch_size={self.batch_size} pending={len(self._pending)}>"
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def write(self, key: WriteKey, write: WriteFunction, value: Any) -> Any:
+        """Commit the write now, or queue it if the queue is enabled.
+
+        :param key: Table name followed by the identity of the row.
+        :param write: Function applying the write to the session. It returns
+            the written row, e.g. the updated one if the row already existed.
+        :param value: The row as it will look after the write, returned by
+            :meth:`lookup`. Use ``None`` for deletions.
+        :return: The written row if the write was committed, otherwise
+            ``value``. Its primary key is filled in when the queue commits it.
+        """
+        if not self.enabled:
+            result = write(self.session)
+            self.session.commit()
+            return result
+
+        # Re-insert the key, so the writes are applied in submission order
+        self._pending.pop(key, None)
+        self._pending[key] = (write, value)
+        self.queued += 1
+
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+            return value
+        if self._handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # Nothing would ever flush the queue
+                self.flush()
+                return value
+            self._handle = loop.call_later(self.window, self.flush)
+        return value
+
+    def lookup(self, key: WriteKey) -> Any:
+        """Get the pending value of the row.
+
+        :return: The value passed to :meth:`write`, or :data:`MISSING` if
+            the row has no pending write.
+        """
+        write = self._pending.get(key)
+        if write is None:
+            return MISSING
+        return write[1]
+
+    def sync(self, table: str) -> None:
+        """Flush the queue if it contains writes to given table."""
+        if any(key[0] == table for key in self._pending.keys()):
+            self.flush()
+
+    def flush(self) -> int:
+        """Commit all pending writes.
+
+        The writes are committed in one transaction. If it fails, they are
+        retried one by one, so one broken write does not discard the others.
+        Writes that fail even then are passed to :attr:`on_failure`.
+
+        :return: Number of committed writes.
+        """
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if not self._pending:
+            return 0
+
+        writes = [(key, write, value) for key, (write, value) in self._pending.items()]
+        self._pending.clear()
+
+        try:
+            self._commit(writes)
+        except Exception:
+            return self._commit_separately(writes)
+        return len(writes)
+
+    def _commit_separately(self, writes) -> int:
+        """Commit each write in its own transaction."""
+        committed: int = 0
+        for write in writes:
+            try:
+                self._commit([write])
+                committed += 1
+            except Exception as exc:
+                self.failed += 1
+                self._report(write[0], exc)
+        return committed
+
+    def _report(self, key: WriteKey, exc: Exception) -> None:
+        try:
+            asyncio.get_running_loop()
+            running: bool = True
+        except RuntimeError:
+            running = False
+        if self.on_failure is not None and running:
+            try:
+                self.on_failure(key, exc)
+                return
+            except Exception:
+                traceback.print_exc()
+        # The bot log is not available, the console is the last resort
+        print(
+            f"Write-behind could not commit a write to {key}:", file=sys.stderr
+        )  # noqa: T001
+        traceback.print_exception(type(exc), exc, exc.__traceback__)
+
+    def _commit(self, writes) -> None:
+        # The written objects are returned to the callers, they must stay
+        # readable after the session is closed
+        results: List[Tuple[Any, Any]] = []
+        with self.factory(expire_on_commit=False) as session:
+            with session.begin():
+                for _, write, value in writes:
+                    results.append((write(session), value))
+        self.commits += 1
+        for result, value in results:
+            _copy_identity(result, value)
+
+
+def _copy_identity(result: Any, value: Any) -> None:
+    """Fill the primary key of the pending value from the written row.
+
+    The callers got the pending value from :meth:`WriteBehind.write`; when
+    the row already existed, the write updated it instead of inserting the
+    value.
+    """
+    if result is None or value is None or result is value:
+        return
+    try:
+        mapper = inspect(result).mapper
+    except Exception:
+        return
+    if mapper is not inspect(type(value), raiseerr=False):
+        return
+    for column in mapper.primary_key:
+        attribute = mapper.get_property_by_column(column).key
+        setattr(value, attribute, getattr(result, attribute))
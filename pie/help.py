@@ -1,4 +1,4 @@
-from typing import Optional, Sequence, Union, Set
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union, Set
 
 from discord.ext import commands
 
@@ -50,6 +50,43 @@ class Help(commands.MinimalHelpCommand):
             return False
         return True
 
+    async def filter_commands(
+        self,
+        cmds: Iterable[commands.Command],
+        /,
+        *,
+        sort: bool = False,
+        key: Optional[Callable[[commands.Command], object]] = None,
+    ) -> List[commands.Command]:
+        """Filter out commands the invoker can't run.
+
+        This override evaluates the ACL of all commands at once, instead of
+        mapping the invoker for each command separately. Commands refused by
+        the ACL are dropped right away; the checks of the rest, including
+        the ACL check answered from the stored verdicts, are run as usual.
+        """
+        ctx = self.context
+        # The ACL only applies in guilds
+        if self.verify_checks is False or ctx.guild is None:
+            return await super().filter_commands(cmds, sort=sort, key=key)
+
+        cmds = [c for c in cmds if self.show_hidden or not c.hidden]
+        verdicts: Dict[str, bool] = acl.get_verdicts(
+            ctx.bot,
+            ctx.author,
+            ctx.channel,
+            [
+                c.qualified_name
+                for c in cmds
+                if acl.get_hardcoded_ACLevel(c) is not None
+            ],
+        )
+        return await super().filter_commands(
+            [c for c in cmds if verdicts.get(c.qualified_name, True)],
+            sort=sort,
+            key=key,
+        )
+
     def command_not_found(self, string: str) -> str:
         """Command does not exist.
 
@@ -1,11 +1,11 @@
-import ring
 from pathlib import Path
-from typing import Dict, Optional, Union
+from typing import Dict, Mapping, Optional, Union
 
 import discord
 
 from pie.database.config import Config
-from pie.i18n.database import GuildLanguage, MemberLanguage
+from pie.i18n import catalogs
+from pie.i18n.database import store
 
 config = Config.get()
 
@@ -22,11 +22,13 @@ class TranslationContext:
     See :class:`Translator` for more details.
     """
 
-    __slots__ = ("guild_id", "user_id")
+    __slots__ = ("guild_id", "user_id", "language")
 
     def __init__(self, guild_id: Optional[int], user_id: Optional[int]):
         self.guild_id = guild_id
         self.user_id = user_id
+        # Resolved by the first translation
+        self.language: Optional[str] = None
 
     def __repr__(self) -> str:
         return (
@@ -49,27 +51,14 @@ class Translator:
     def __init__(self, dirname: str):
         self._dir = Path(dirname)
 
-        self.strings: Dict[str, Dict[str, Optional[str]]] = {}
-        for language in LANGUAGES:
-            pofile: Path = self._dir / "po" / f"{language}.popie"
-            if not pofile.exists():
-                continue
-            self.strings[language] = self.parse_po_file(pofile)
+        # Shared by all translators of the directory, read-only
+        self.strings: Mapping[str, Mapping[str, str]] = catalogs.get_catalogs(
+            dirname, LANGUAGES
+        )
 
     def parse_po_file(self, pofile: Path) -> Dict[str, str]:
         """Get translation dictionary from .po file."""
-        data: Dict[str, str] = {}
-        with open(pofile, "r") as handle:
-            for line in handle.readlines():
-                line = line.strip()
-
-                if line.startswith("msgid"):
-                    msgid: str = line[len("msgid") :].strip()
-                if line.startswith("msgstr"):
-                    msgstr: str = line[len("msgstr") :].strip()
-                    if len(msgstr):
-                        data[msgid] = msgstr
-        return data
+        return catalogs.load_po_file(pofile)
 
     def __repr__(self) -> str:
         """Return representation of the class."""
@@ -117,58 +106,43 @@ class Translator:
         * Try to get user information: if they have language preference, return it.
         * Try to get guild information: if it has language preference, return it.
         * Return the bot default.
+
+        The language is resolved once, then it is stored in the context and
+        reused by the following translations.
         """
-        guild_id: Optional[int]
-        user_id: Optional[int]
         if ctx.__class__ == TranslationContext:
-            guild_id, user_id = ctx.guild_id, ctx.user_id
-        elif ctx.__class__ == discord.ext.commands.Context and isinstance(
-            ctx.channel, discord.abc.PrivateChannel
-        ):
-            guild_id, user_id = None, ctx.author.id
-        elif ctx.__class__ == discord.ext.commands.Context and not isinstance(
-            ctx.channel, discord.abc.PrivateChannel
-        ):
-            guild_id, user_id = ctx.guild.id, ctx.author.id
-        else:
-            guild_id, user_id = None, None
-
-        if guild_id is not None and user_id is not None:
-            user_language: Optional[str] = self._get_user_language(guild_id, user_id)
+            if ctx.language is None:
+                ctx.language = self._resolve_language(ctx.guild_id, ctx.user_id)
+            return ctx.language
+
+        if ctx.__class__ != discord.ext.commands.Context:
+            return self._resolve_language(None, None)
+
+        language: Optional[str] = getattr(ctx, "_pie_language", None)
+        if language is None:
+            if isinstance(ctx.channel, discord.abc.PrivateChannel):
+                language = self._resolve_language(None, ctx.author.id)
+            else:
+                language = self._resolve_language(ctx.guild.id, ctx.author.id)
+            ctx._pie_language = language
+        return language
+
+    def _resolve_language(self, guild_id: Optional[int], user_id: Optional[int]) -> str:
+        """Look up the language preference.
+
+        All preferences are kept in memory by :data:`pie.i18n.database.store`,
+        no database query is made.
+        """
+        if guild_id is None or not store.has_preferences(guild_id):
+            return Config.get().language
+
+        if user_id is not None:
+            user_language: Optional[str] = store.get_member(guild_id, user_id)
             if user_language is not None:
                 return user_language
 
-        if guild_id is not None:
-            guild_language: Optional[str] = self._get_guild_language(guild_id)
-            if guild_language is not None:
-                return guild_language
+        guild_language: Optional[str] = store.get_guild(guild_id)
+        if guild_language is not None:
+            return guild_language
 
         return Config.get().language
-
-    # While we could be using just functools.lru_cache(), using ring
-    # is a better option, because it allows us to add automatic deletion
-    # into the mix. Because the member can change their preferred language
-    # dynamically, invalidation is a preferred behavior.
-    # In case this expiration value gets changed you should also change
-    # the text in the language module under '[caching]' section.
-    @ring.lru(expire=120)
-    def _get_user_language(self, guild_id: int, user_id: int) -> Optional[str]:
-        """Get user's language preference.
-
-        This value may be out-of-sync for two minues after change because of
-        caching.
-        """
-        user = MemberLanguage.get(guild_id, user_id)
-        if getattr(user, "language", None) is not None:
-            return user.language
-
-    @ring.lru(expire=120)
-    def _get_guild_language(self, guild_id: int) -> Optional[str]:
-        """Get guild's language preference.
-
-        This value may be out-of-sync for two minues after change because of
-        caching.
-        """
-        guild = GuildLanguage.get(guild_id)
-        if getattr(guild, "language", None) is not None:
-            return guild.language
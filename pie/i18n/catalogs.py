@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+# Modification time in nanoseconds and size of the file
+Signature = Tuple[int, int]
+
+# Parsed catalogs of the directories, keyed by the resolved path, with the
+# signatures of their files
+_catalogs: Dict[
+    Path, Tuple[Tuple[Optional[Signature], ...], Mapping[str, Mapping[str, str]]]
+] = {}
+
+
+def _get_signature(path: Path) -> Optional[Signature]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_catalogs(dirname: str, languages: tuple) -> Mapping[str, Mapping[str, str]]:
+    """Get translations of the directory.
+
+    The directory is parsed again only when some of its files changed, e.g.
+    when the module is reloaded after an update. The dictionaries are shared
+    by all translators of the directory and can't be modified.
+
+    :param dirname: Directory containing the ``po/`` subdirectory.
+    :param languages: Language codes to load.
+    :return: Mapping of the language codes to the translations.
+    """
+    directory: Path = Path(dirname).resolve()
+    pofiles: Tuple[Path, ...] = tuple(
+        directory / "po" / f"{language}.popie" for language in languages
+    )
+    signatures = tuple(_get_signature(pofile) for pofile in pofiles)
+    cached = _catalogs.get(directory)
+    if cached is not None and cached[0] == signatures:
+        return cached[1]
+
+    strings: Dict[str, Mapping[str, str]] = {}
+    for language, pofile, signature in zip(languages, pofiles, signatures):
+        if signature is not None:
+            strings[language] = MappingProxyType(load_po_file(pofile))
+    catalogs = MappingProxyType(strings)
+    _catalogs[directory] = (signatures, catalogs)
+    return catalogs
+
+
+def forget(dirname: str) -> None:
+    """Parse the translations of the directory again on next use."""
+    _catalogs.pop(Path(dirname).resolve(), None)
+
+
+def parse_po_file(content: str) -> Dict[str, str]:
+    """Get translation dictionary from the content of .po file."""
+    data: Dict[str, str] = {}
+    for line in content.splitlines():
+        line = line.strip()
+
+        if line.startswith("msgid"):
+            msgid: str = line[len("msgid") :].strip()
+        if line.startswith("msgstr"):
+            msgstr: str = line[len("msgstr") :].strip()
+            if len(msgstr):
+                data[msgid] = msgstr
+    return data
+
+
+def _get_cache_file(pofile: Path) -> Path:
+    return pofile.parent / "__pycache__" / f"{pofile.name}.json"
+
+
+def _read_cache(cache_file: Path) -> Optional[dict]:
+    try:
+        with open(cache_file, "r") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(cache_file: Path, cache: dict) -> None:
+    # The directory may be read-only, the cache is just an optimization
+    try:
+        cache_file.parent.mkdir(exist_ok=True)
+        temporary: Path = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(temporary, "w") as handle:
+            json.dump(cache, handle, ensure_ascii=False)
+        temporary.replace(cache_file)
+    except OSError:
+        pass
+
+
+def load_po_file(pofile: Path) -> Dict[str, str]:
+    """Get translation dictionary from .po file.
+
+    The parsed file is cached in the ``__pycache__`` directory next to it.
+    The cache is used when the modification time and the size of the file
+    did not change, or when its content has the same hash.
+    """
+    cache_file: Path = _get_cache_file(pofile)
+    cache: Optional[dict] = _read_cache(cache_file)
+    stat = pofile.stat()
+    mtime, size = stat.st_mtime_ns, stat.st_size
+    if cache is not None and (cache.get("mtime"), cache.get("size")) == (mtime, size):
+        return cache["strings"]
+
+    content: bytes = pofile.read_bytes()
+    digest: str = hashlib.sha256(content).hexdigest()
+    if cache is not None and cache.get("sha256") == digest:
+        strings: Dict[str, str] = cache["strings"]
+    else:
+        strings = parse_po_file(content.decode("utf-8"))
+    _write_cache(
+        cache_file,
+        {"mtime": mtime, "size": size, "sha256": digest, "strings": strings},
+    )
+    return strings
@@ -1,9 +1,117 @@
 from __future__ import annotations
-from typing import Dict, Optional, Union
+from typing import Dict, Hashable, Optional, Tuple, Union
 
-from sqlalchemy import BigInteger, Column, Integer, String
+from sqlalchemy import BigInteger, Column, Index, Integer, String, select
+from sqlalchemy.orm import Session
 
-from pie.database import database, session
+from pie.database import database, migrations, session, transfer, write_behind
+from pie.database.write_behind import MISSING
+
+
+class LanguageStore:
+    """Language preferences of all guilds and members, kept in memory.
+
+    The preferences are loaded on first use. The models update the store
+    directly, so changes apply immediately.
+    """
+
+    def __init__(self):
+        self._guilds: Optional[Dict[int, str]] = None
+        self._members: Dict[Tuple[int, int], str] = {}
+        # Number of preferences (guild and members) in each guild
+        self._counts: Dict[int, int] = {}
+
+    def __repr__(self) -> str:
+        if self._guilds is None:
+            return f"<{self.__class__.__name__} loaded=False>"
+        return (
+            f"<{self.__class__.__name__} guilds={len(self._guilds)} "
+            f"members={len(self._members)}>"
+        )
+
+    def _load(self) -> Dict[int, str]:
+        if self._guilds is not None:
+            return self._guilds
+
+        write_behind.sync(MemberLanguage.__tablename__)
+        guilds: Dict[int, str] = {}
+        for guild_id, language in session.execute(
+            select(GuildLanguage.guild_id, GuildLanguage.language)
+        ):
+            guilds[guild_id] = language
+        self._members = {
+            (guild_id, member_id): language
+            for guild_id, member_id, language in session.execute(
+                select(
+                    MemberLanguage.guild_id,
+                    MemberLanguage.member_id,
+                    MemberLanguage.language,
+                )
+            )
+        }
+        self._counts = {}
+        for guild_id in guilds:
+            self._counts[guild_id] = self._counts.get(guild_id, 0) + 1
+        for guild_id, _ in self._members:
+            self._counts[guild_id] = self._counts.get(guild_id, 0) + 1
+        self._guilds = guilds
+        return guilds
+
+    def _update(
+        self, preferences: dict, key: Hashable, guild_id: int, language: Optional[str]
+    ) -> None:
+        existed: bool = key in preferences
+        if language is not None:
+            preferences[key] = language
+            if not existed:
+                self._counts[guild_id] = self._counts.get(guild_id, 0) + 1
+        elif existed:
+            del preferences[key]
+            self._counts[guild_id] -= 1
+            if not self._counts[guild_id]:
+                del self._counts[guild_id]
+
+    def has_preferences(self, guild_id: int) -> bool:
+        """Whether the guild or any of its members has a language preference."""
+        self._load()
+        return guild_id in self._counts
+
+    def get_guild(self, guild_id: int) -> Optional[str]:
+        """Get the language preference of the guild."""
+        return self._load().get(guild_id)
+
+    def get_member(self, guild_id: int, member_id: int) -> Optional[str]:
+        """Get the language preference of the member."""
+        self._load()
+        return self._members.get((guild_id, member_id))
+
+    def set_guild(self, guild_id: int, language: Optional[str]) -> None:
+        """Update the guild preference, ``None`` removes it."""
+        if self._guilds is not None:
+            self._update(self._guilds, guild_id, guild_id, language)
+
+    def set_member(
+        self, guild_id: int, member_id: int, language: Optional[str]
+    ) -> None:
+        """Update the member preference, ``None`` removes it."""
+        if self._guilds is not None:
+            self._update(self._members, (guild_id, member_id), guild_id, language)
+
+    def forget(self) -> None:
+        """Load the preferences again on next use."""
+        self._guilds = None
+
+
+store = LanguageStore()
+
+
+def has_preferences(guild_id: int) -> bool:
+    """Whether the guild or any of its members has a language preference.
+
+    Guilds without preferences use the bot language, the translations don't
+    have to look up anything.
+    """
+    return store.has_preferences(guild_id)
 
 
 class GuildLanguage(database.base):
@@ -53,6 +161,7 @@ class GuildLanguage(database.base):
 
         session.add(preference)
         session.commit()
+        store.set_guild(guild_id, language)
         return preference
 
     @staticmethod
@@ -74,8 +183,14 @@ class GuildLanguage(database.base):
         """
         query = session.query(GuildLanguage).filter_by(guild_id=guild_id).delete()
         session.commit()
+        store.set_guild(guild_id, None)
         return query
 
+    @staticmethod
+    def forget(guild_id: int) -> None:
+        """Drop data derived from the rows changed outside of the model."""
+        store.forget()
+
 
 class MemberLanguage(database.base):
     """Language preference of the user.
@@ -93,6 +208,10 @@ class MemberLanguage(database.base):
     member_id = Column(BigInteger)
     language = Column(String)
 
+    __table_args__ = (
+        Index("ix_language_members_guild_id_member_id", guild_id, member_id),
+    )
+
     def __repr__(self) -> str:
         return (
             f'<MemberLanguage idx="{self.idx}" guild_id="{self.guild_id}" '
@@ -124,16 +243,26 @@ class MemberLanguage(database.base):
             responsibility to make sure it has correct value.
         :return: Created member language preference.
         """
-        preference = MemberLanguage.get(guild_id, member_id)
-        if preference:
-            preference.language = language
-        else:
-            preference = MemberLanguage(
-                guild_id=guild_id, member_id=member_id, language=language
+        preference = MemberLanguage(
+            guild_id=guild_id, member_id=member_id, language=language
+        )
+
+        def write(session: Session):
+            query = (
+                session.query(MemberLanguage)
+                .filter_by(guild_id=guild_id, member_id=member_id)
+                .one_or_none()
             )
+            if query:
+                query.language = language
+                return query
             session.add(preference)
+            return preference
 
-        session.commit()
+        preference = write_behind.write(
+            (MemberLanguage.__tablename__, guild_id, member_id), write, preference
+        )
+        store.set_member(guild_id, member_id, language)
         return preference
 
     @staticmethod
@@ -144,6 +273,12 @@ class MemberLanguage(database.base):
         :param member_id: Member ID.
         :return: Member language preference or ``None``.
         """
+        pending = write_behind.lookup(
+            (MemberLanguage.__tablename__, guild_id, member_id)
+        )
+        if pending is not MISSING:
+            return pending
+
         query = (
             session.query(MemberLanguage)
             .filter_by(guild_id=guild_id, member_id=member_id)
@@ -159,10 +294,25 @@ class MemberLanguage(database.base):
         :param member_id: Member ID.
         :return: Number of deleted preferences, always ``0`` or ``1``.
         """
-        query = (
-            session.query(MemberLanguage)
+        if MemberLanguage.get(guild_id, member_id) is None:
+            return 0
+
+        write_behind.write(
+            (MemberLanguage.__tablename__, guild_id, member_id),
+            lambda session: session.query(MemberLanguage)
             .filter_by(guild_id=guild_id, member_id=member_id)
-            .delete()
+            .delete(),
+            None,
         )
-        session.commit()
-        return query
+        store.set_member(guild_id, member_id, None)
+        return 1
+
+    @staticmethod
+    def forget(guild_id: int) -> None:
+        """Drop data derived from the rows changed outside of the model."""
+        store.forget()
+
+
+migrations.create_indexes("pie.i18n", 1, MemberLanguage)
+
+transfer.register(GuildLanguage, MemberLanguage)
@@ -7,12 +7,14 @@ import re
 import sys
 import traceback
 from enum import IntEnum
-from typing import Optional, List, Union
+from typing import Optional, List, Tuple, Union
 
 import discord
 
 from pie import utils
 from pie.logger.database import LogConf
+from pie.logger.pipeline import pipeline
+from pie.logger.sink import sink
 
 
 # Globals
@@ -59,23 +61,54 @@ LogSource = Optional[
 ]
 
 
+RE_MODULE = re.compile(r"modules/([a-z]+)/([a-z]+)/(.*)")
+
+# Caller of the logging function: file name, line number and function name
+LogCaller = Tuple[str, int, str]
+
+_UNSET = object()
+
+
 class LogEntry:
-    """Log entry."""
+    """Log entry.
+
+    Only the caller of the logging function is stored. The full call stack
+    is captured when it is explicitly passed, see :meth:`AbstractLogger._log`.
+    """
+
+    __slots__ = (
+        "timestamp",
+        "caller",
+        "stack",
+        "scope",
+        "level",
+        "actor",
+        "channel",
+        "guild",
+        "message",
+        "content",
+        "exception",
+        "embed",
+        "_filename",
+        "_module",
+    )
 
     def __init__(
         self,
-        stack: List[traceback.FrameSummary],
+        caller: LogCaller,
         scope: LogScope,
         level: LogLevel,
         actor: LogActor,
         source: LogSource,
         message: str,
         *,
+        stack: Optional[List[traceback.FrameSummary]] = None,
         content: Optional[str] = None,
         exception: Optional[Exception] = None,
         embed: Optional[discord.Embed] = None,
     ):
         self.timestamp = datetime.datetime.now()
+        self.caller = caller
         self.stack = stack
         self.scope = scope
         self.level = level
@@ -93,11 +126,14 @@ class LogEntry:
         self.content = content
         self.exception = exception
         self.embed = embed
+        # Computed when they are needed for the first time
+        self._filename: Optional[str] = None
+        self._module = _UNSET
 
     def __str__(self):
         return (
             f"{utils.time.format_datetime(self.timestamp)} "
-            f"{self.level.name} {self.stack[-1].name} ("
+            f"{self.level.name} {self.function} ("
             f"{getattr(self.actor, 'name', '?')} in "
             f"{getattr(self.channel, 'name', '?')}"
             f") {self.message}"
@@ -105,11 +141,11 @@ class LogEntry:
 
     @property
     def function(self) -> str:
-        return self.stack[-1].name
+        return self.caller[2]
 
     @property
-    def lineno(self):
-        return self.stack[-1].lineno
+    def lineno(self) -> int:
+        return self.caller[1]
 
     @property
     def actor_id(self) -> Optional[int]:
@@ -145,22 +181,24 @@ class LogEntry:
 
     @property
     def filename(self) -> str:
-        # Return path relative to the main script
-        filename = self.stack[-1].filename[len(MAIN_DIRECTORY) :]
-        if not len(filename):
-            filename = "__main__"
-        return filename
+        if self._filename is None:
+            # Return path relative to the main script
+            filename = self.caller[0][len(MAIN_DIRECTORY) :]
+            if not len(filename):
+                filename = "__main__"
+            self._filename = filename
+        return self._filename
 
     @property
     def module(self) -> Optional[str]:
-        RE_MODULE = r"modules/([a-z]+)/([a-z]+)/(.*)"
-        stubs = re.search(RE_MODULE, self.filename)
-        if stubs is None:
-            return None
-
-        repo = stubs.groups()[0]
-        module = stubs.groups()[1]
-        return f"{repo}.{module}"
+        if self._module is _UNSET:
+            stubs = RE_MODULE.search(self.filename)
+            if stubs is None:
+                self._module = None
+            else:
+                repo, module, _ = stubs.groups()
+                self._module = f"{repo}.{module}"
+        return self._module
 
     def dump(self):
         # The easiest way to include only one decimal is to cut the string
@@ -182,6 +220,8 @@ class LogEntry:
             result[attr] = getattr(self, attr)
         if self.content is not None:
             result["content"] = self.content
+        if self.stack is not None:
+            result["stack"] = [f"{f.filename}:{f.lineno} {f.name}" for f in self.stack]
         return result
 
     def _format_as_string(self, *, extended: bool) -> str:
@@ -227,6 +267,12 @@ class LogEntry:
         return json.dumps(self.dump(), ensure_ascii=False)
 
 
+async def flush() -> None:
+    """Wait until all log entries are written and sent to Discord."""
+    await pipeline.flush()
+    await sink.flush()
+
+
 class AbstractLogger:
     bot = None
     scope = NotImplemented
@@ -250,9 +296,29 @@ class AbstractLogger:
         content: Optional[str] = None,
         exception: Optional[Exception] = None,
         embed: Optional[discord.Embed] = None,
+        stack: bool = False,
     ):
+        """Create the entry and queue it.
+
+        The caller of the logging function is looked up directly. The full
+        call stack is only captured for errors, or when ``stack`` is set.
+        """
+        # 0 is this function, 1 is the logging method, 2 is its caller
+        frame = sys._getframe(2)
+        code = frame.f_code
+        caller: LogCaller = (code.co_filename, frame.f_lineno, code.co_name)
+
+        frames: Optional[List[traceback.FrameSummary]] = None
+        if stack or level >= LogLevel.ERROR:
+            # The source lines are read only if the stack gets printed
+            frames = traceback.StackSummary.extract(
+                traceback.walk_stack(frame), lookup_lines=False
+            )
+            frames.reverse()
+
         entry = LogEntry(
-            stack=traceback.extract_stack()[:-2],
+            caller=caller,
+            stack=frames,
             scope=self.scope,
             level=level,
             actor=actor,
@@ -263,26 +329,17 @@ class AbstractLogger:
             embed=embed,
         )
 
-        stdout: str = entry.format_to_console()
-        print(stdout, flush=True)
-
-        filename: str = f"log_{entry.timestamp.strftime('%Y-%m-%d')}.log"
-        if not os.path.isdir("logs"):
-            os.mkdir("logs")
-        with open(f"logs/{filename}", "a+") as handle:
-            handle.write(entry.format_to_file())
-            handle.write("\n")
-
-        await self._maybe_send(entry)
+        # Writing and sending is done in the background, don't wait for it
+        pipeline.submit(entry, self._maybe_send)
 
     async def _maybe_send(self, entry: LogEntry):
         """Send the event to guild channel."""
         if entry.scope == LogScope.BOT:
-            confs = LogConf.get_bot_subscriptions(
+            confs = await LogConf.get_bot_subscriptions_async(
                 level=entry.levelno, module=entry.module
             )
         elif entry.scope == LogScope.GUILD:
-            confs = LogConf.get_guild_subscriptions(
+            confs = await LogConf.get_guild_subscriptions_async(
                 level=entry.levelno, module=entry.module, guild_id=entry.guild_id
             )
         else:
@@ -291,10 +348,12 @@ class AbstractLogger:
         if not confs:
             return
 
-        output: List[str] = utils.text.split(entry.format_to_discord())
+        text: str = entry.format_to_discord()
         for conf in confs:
             try:
                 channel = self.bot.get_guild(conf.guild_id).get_channel(conf.channel_id)
+                # Messages are sent in batches by the sink
+                sink.add(channel, text)
             except AttributeError as exc:
                 message: str = "Log event target is not available"
 
@@ -310,9 +369,6 @@ class AbstractLogger:
                 )
                 continue
 
-            for stub in output:
-                await channel.send(f"```{stub}```")
-
     async def debug(
         self,
         actor: LogActor,
@@ -322,9 +378,16 @@ class AbstractLogger:
         exception: Optional[Exception] = None,
         content: Optional[str] = None,
         embed: Optional[discord.Embed] = None,
+        stack: bool = False,
     ):
         await self._log(
-            LogLevel.DEBUG, actor, source, message, exception=exception, embed=embed
+            LogLevel.DEBUG,
+            actor,
+            source,
+            message,
+            exception=exception,
+            embed=embed,
+            stack=stack,
         )
 
     async def info(
@@ -336,9 +399,16 @@ class AbstractLogger:
         exception: Optional[Exception] = None,
         content: Optional[str] = None,
         embed: Optional[discord.Embed] = None,
+        stack: bool = False,
     ):
         await self._log(
-            LogLevel.INFO, actor, source, message, exception=exception, embed=embed
+            LogLevel.INFO,
+            actor,
+            source,
+            message,
+            exception=exception,
+            embed=embed,
+            stack=stack,
         )
 
     async def warning(
@@ -350,9 +420,16 @@ class AbstractLogger:
         exception: Optional[Exception] = None,
         content: Optional[str] = None,
         embed: Optional[discord.Embed] = None,
+        stack: bool = False,
     ):
         await self._log(
-            LogLevel.WARNING, actor, source, message, exception=exception, embed=embed
+            LogLevel.WARNING,
+            actor,
+            source,
+            message,
+            exception=exception,
+            embed=embed,
+            stack=stack,
         )
 
     async def error(
@@ -364,9 +441,16 @@ class AbstractLogger:
         exception: Optional[Exception] = None,
         content: Optional[str] = None,
         embed: Optional[discord.Embed] = None,
+        stack: bool = False,
     ):
         await self._log(
-            LogLevel.ERROR, actor, source, message, exception=exception, embed=embed
+            LogLevel.ERROR,
+            actor,
+            source,
+            message,
+            exception=exception,
+            embed=embed,
+            stack=stack,
         )
 
     async def critical(
@@ -378,9 +462,16 @@ class AbstractLogger:
         exception: Optional[Exception] = None,
         content: Optional[str] = None,
         embed: Optional[discord.Embed] = None,
+        stack: bool = False,
     ):
         await self._log(
-            LogLevel.CRITICAL, actor, source, message, exception=exception, embed=embed
+            LogLevel.CRITICAL,
+            actor,
+            source,
+            message,
+            exception=exception,
+            embed=embed,
+            stack=stack,
         )
 
 
@@ -1,9 +1,17 @@
 from __future__ import annotations
-from typing import Optional, List, Dict
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import BigInteger, Column, String, Integer
+from sqlalchemy import BigInteger, Column, Index, String, Integer, select
+from sqlalchemy.orm import Session
 
-from pie.database import database, session
+from pie.database import (
+    database,
+    migrations,
+    read_session,
+    session,
+    transfer,
+    write_behind,
+)
 
 
 class LogConf(database.base):
@@ -58,63 +66,39 @@ class LogConf(database.base):
     level = Column(Integer)  # integer representation of logging levels
     module = Column(String, default=None)
 
+    __table_args__ = (
+        Index("ix_logging_scope_module", scope, module),
+        Index("ix_logging_guild_id_scope_module", guild_id, scope, module),
+    )
+
     @staticmethod
-    def _get_subscriptions(
-        scope: str,
-        *,
-        level: int,
-        module: Optional[str],
+    def get_bot_subscriptions(
+        *, level: int, module: Optional[str] = None
     ) -> List[LogConf]:
-        """Get all channels subscribed of given scope.
-
-        :param scope: ``bot`` or ``guild``.
-        :param level: Minimal logging level to be reported.
-        :param module: Try to get module-specific log config. If not found,
-        guild-global log config is returned.
-        :return: List of matching log configurations.
-        """
-        query_module = (
-            session.query(LogConf)
-            .filter(
-                LogConf.level <= level,
-                LogConf.scope == scope,
-                LogConf.module == module,
-            )
-            .all()
-        )
-        query_global = (
-            session.query(LogConf)
-            .filter(
-                LogConf.level <= level,
-                LogConf.scope == scope,
-                LogConf.module == None,  # noqa: E711
-            )
-            .all()
-        )
-        # Filter our duplicates. At first the module specific configurations
-        # are considered, so they will always come before the global ones.
-        query: Dict[int, LogConf] = {}
-        for q in query_module + query_global:
-            if q.guild_id not in query.keys():
-                query[q.guild_id] = q
-        return list(query.values())
+        query = router.get().route("bot", None, module).select(level)
+        return query
 
     @staticmethod
-    def get_bot_subscriptions(
+    async def get_bot_subscriptions_async(
         *, level: int, module: Optional[str] = None
     ) -> List[LogConf]:
-        query = LogConf._get_subscriptions("bot", level=level, module=module)
+        routes = await router.get_async()
+        query = routes.route("bot", None, module).select(level)
         return query
 
     @staticmethod
     def get_guild_subscriptions(
         *, level: int, guild_id: int, module: Optional[str] = None
     ) -> List[LogConf]:
-        query = LogConf._get_subscriptions("guild", level=level, module=module)
-        # This is not optimal concerning performance, but there will be only
-        # a few items, not milions. So it does not matter that much, and it
-        # makes the code much cleaner.
-        query = [c for c in query if c.guild_id == guild_id]
+        query = router.get().route("guild", guild_id, module).select(level)
+        return query
+
+    @staticmethod
+    async def get_guild_subscriptions_async(
+        *, level: int, guild_id: int, module: Optional[str] = None
+    ) -> List[LogConf]:
+        routes = await router.get_async()
+        query = routes.route("guild", guild_id, module).select(level)
         return query
 
     @staticmethod
@@ -124,6 +108,7 @@ class LogConf(database.base):
         :param guild_id: Guild ID of subscription channel.
         :return: All log subscriptions of given guild.
         """
+        write_behind.sync(LogConf.__tablename__)
         query = session.query(LogConf).filter_by(guild_id=guild_id).all()
         return query
 
@@ -144,29 +129,36 @@ class LogConf(database.base):
         :param level: Minimal logging level to be reported.
         :return: Created bot log subscription.
         """
-        query = (
-            session.query(LogConf)
-            .filter_by(
-                scope=scope, guild_id=guild_id, channel_id=channel_id, module=module
-            )
-            .one_or_none()
+        subscription = LogConf(
+            guild_id=guild_id,
+            channel_id=channel_id,
+            level=level,
+            scope=scope,
+            module=module,
         )
-        if query is not None:
-            # The object already exists, update it
-            query.channel_id = channel_id
-            query.level = level
-        else:
-            # Create new object
-            query = LogConf(
-                guild_id=guild_id,
-                channel_id=channel_id,
-                level=level,
-                scope=scope,
-                module=module,
+
+        def write(session: Session):
+            query = (
+                session.query(LogConf)
+                .filter_by(
+                    scope=scope, guild_id=guild_id, channel_id=channel_id, module=module
+                )
+                .one_or_none()
             )
-        session.merge(query)
-        session.commit()
-        return query
+            if query is not None:
+                # The object already exists, update it
+                query.level = level
+                return query
+            session.add(subscription)
+            return subscription
+
+        subscription = write_behind.write(
+            (LogConf.__tablename__, scope, guild_id, channel_id, module),
+            write,
+            subscription,
+        )
+        router.forget()
+        return subscription
 
     @staticmethod
     def add_bot_subscription(
@@ -198,12 +190,14 @@ class LogConf(database.base):
     def _remove_subscription(
         scope: str, *, guild_id: int, module: Optional[str]
     ) -> bool:
+        write_behind.sync(LogConf.__tablename__)
         count = (
             session.query(LogConf)
             .filter_by(scope=scope, guild_id=guild_id, module=module)
             .delete()
         )
         session.commit()
+        router.forget()
         return count > 0
 
     @staticmethod
@@ -214,6 +208,11 @@ class LogConf(database.base):
     def remove_guild_subscription(*, guild_id: int, module: Optional[str]) -> bool:
         return LogConf._remove_subscription("guild", guild_id=guild_id, module=module)
 
+    @staticmethod
+    def forget(guild_id: int) -> None:
+        """Drop data derived from the rows changed outside of the model."""
+        router.forget()
+
     def __repr__(self) -> str:
         """Get object representation."""
         return (
@@ -221,3 +220,134 @@ class LogConf(database.base):
             f'guild_id="{self.guild_id}" channel_id="{self.channel_id}" '
             f'level="{self.level}" scope="{self.scope}" module="{self.module}">'
         )
+
+
+# Key of the routing table: scope, guild ID (``None`` for the bot scope,
+# which is not limited to one guild) and module (``None`` for all modules)
+RouteKey = Tuple[str, Optional[int], Optional[str]]
+
+
+class LogRoute:
+    """Subscriptions matching one routing key.
+
+    :param confs: Subscriptions of the module, followed by the subscriptions
+        for all modules.
+    """
+
+    __slots__ = ("confs", "minimum")
+
+    # Same as LogLevel.NONE, no event has this level
+    NONE: int = 100
+
+    def __init__(self, confs: List[LogConf]):
+        self.confs = confs
+        # Events below this level are not wanted by any subscription
+        self.minimum: int = min((c.level for c in confs), default=LogRoute.NONE)
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} confs={len(self.confs)} "
+            f"minimum={self.minimum}>"
+        )
+
+    def select(self, level: int) -> List[LogConf]:
+        """Get the subscriptions that want the event, one per guild.
+
+        The module specific subscriptions take precedence over the global
+        ones.
+        """
+        if level < self.minimum:
+            return []
+        selected: Dict[int, LogConf] = {}
+        for conf in self.confs:
+            if conf.level <= level and conf.guild_id not in selected:
+                selected[conf.guild_id] = conf
+        return list(selected.values())
+
+
+class LogRoutes:
+    """Routing table of the log events.
+
+    The routes are computed on first lookup of each key, so the following
+    lookups of the same scope, guild and module are one dictionary access.
+    """
+
+    def __init__(self, confs: List[LogConf]):
+        self._confs: Dict[RouteKey, List[LogConf]] = {}
+        for conf in confs:
+            guild_id: Optional[int] = conf.guild_id if conf.scope == "guild" else None
+            self._confs.setdefault((conf.scope, guild_id, conf.module), []).append(conf)
+        self._routes: Dict[RouteKey, LogRoute] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} keys={len(self._confs)} "
+            f"routes={len(self._routes)}>"
+        )
+
+    def route(
+        self, scope: str, guild_id: Optional[int], module: Optional[str]
+    ) -> LogRoute:
+        """Get the route of the event.
+
+        :param scope: ``bot`` or ``guild``.
+        :param guild_id: Guild ID of the event, ``None`` for the bot scope.
+        :param module: Module of the event.
+        """
+        key: RouteKey = (scope, guild_id, module)
+        route: Optional[LogRoute] = self._routes.get(key)
+        if route is None:
+            specific: List[LogConf] = self._confs.get(key, []) if module else []
+            route = self._routes[key] = LogRoute(
+                specific + self._confs.get((scope, guild_id, None), [])
+            )
+        return route
+
+
+class LogRouter:
+    """Holder of the routing table.
+
+    The table is loaded on first use and built again after any subscription
+    changes.
+    """
+
+    def __init__(self):
+        self._routes: Optional[LogRoutes] = None
+        # Increased on every change, so an outdated load is not kept
+        self._generation: int = 0
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} routes={self._routes!r}>"
+
+    def get(self) -> LogRoutes:
+        if self._routes is None:
+            write_behind.sync(LogConf.__tablename__)
+            confs = read_session.execute(select(LogConf)).scalars().all()
+            self._routes = LogRoutes(confs)
+        return self._routes
+
+    async def get_async(self) -> LogRoutes:
+        """Get the routing table without blocking on the database."""
+        routes: Optional[LogRoutes] = self._routes
+        if routes is not None:
+            return routes
+
+        generation: int = self._generation
+        write_behind.sync(LogConf.__tablename__)
+        routes = LogRoutes(await database.fetch_all(select(LogConf)))
+        if generation == self._generation:
+            self._routes = routes
+        return routes
+
+    def forget(self) -> None:
+        """Build the routing table again on next use."""
+        self._generation += 1
+        self._routes = None
+
+
+router = LogRouter()
+
+
+migrations.create_indexes("pie.logger", 1, LogConf)
+
+transfer.register(LogConf)
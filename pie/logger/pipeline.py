@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import collections
+import datetime
+import json
+import os
+import sys
+import threading
+import traceback
+from typing import (
+    Awaitable,
+    Callable,
+    Deque,
+    Iterable,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    TYPE_CHECKING,
+)
+
+from pie import utils
+
+if TYPE_CHECKING:
+    from pie.logger import LogEntry
+
+# Coroutine function sending the entry to Discord channels
+Sender = Callable[["LogEntry"], Awaitable[None]]
+
+
+class LogFile:
+    """Log file kept open between writes.
+
+    A new file is opened when the date changes, the name follows the
+    ``log_<date>.log`` format.
+
+    :param directory: Directory of the log files.
+    """
+
+    def __init__(self, directory: str = "logs"):
+        self.directory = directory
+        self._date: Optional[datetime.date] = None
+        self._handle: Optional[TextIO] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} directory='{self.directory}' "
+            f"date='{self._date}'>"
+        )
+
+    def _open(self, date: datetime.date) -> TextIO:
+        if self._handle is not None and self._date == date:
+            return self._handle
+
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+        filename: str = f"log_{date.strftime('%Y-%m-%d')}.log"
+        self._handle = open(os.path.join(self.directory, filename), "a+")
+        self._date = date
+        return self._handle
+
+    def write(self, lines: Iterable[Tuple[datetime.date, str]]) -> None:
+        """Write the lines and flush the file.
+
+        :param lines: Pairs of the entry date and the formatted line.
+        """
+        for date, line in lines:
+            handle = self._open(date)
+            handle.write(line)
+            handle.write("\n")
+        if self._handle is not None:
+            self._handle.flush()
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+        self._handle = None
+        self._date = None
+
+
+class PipelineStats:
+    """Counters of the log pipeline."""
+
+    __slots__ = (
+        "submitted",
+        "written",
+        "sent",
+        "dropped",
+        "unsent",
+        "high_water",
+        "batches",
+    )
+
+    def __init__(self):
+        self.submitted: int = 0
+        self.written: int = 0
+        self.sent: int = 0
+        # Entries dropped before they were written
+        self.dropped: int = 0
+        # Entries written, but not sent to Discord because the outbox was full
+        self.unsent: int = 0
+        self.high_water: int = 0
+        self.batches: int = 0
+
+    def __repr__(self) -> str:
+        values = " ".join(f"{name}={getattr(self, name)}" for name in self.__slots__)
+        return f"<{self.__class__.__name__} {values}>"
+
+
+class LogPipeline:
+    """Queue of log entries processed in the background.
+
+    :meth:`submit` never waits. The entries are written to the console and
+    to the log file in batches by one task, and sent to Discord by another
+    one, so slow network does not delay the file.
+
+    When the queue is full, the oldest entry is dropped. The entries waiting
+    for Discord are limited the same way. The number of dropped entries is
+    kept in :attr:`stats` and reported to the console and to the file.
+
+    :param maxsize: Maximal number of waiting entries, in the queue and in
+        the Discord outbox each.
+    :param batch_size: Maximal number of entries written at once.
+    :param directory: Directory of the log files.
+    """
+
+    def __init__(self, maxsize: int, batch_size: int = 100, directory: str = "logs"):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.file = LogFile(directory)
+        self.stats = PipelineStats()
+
+        self._queue: Deque[Tuple[LogEntry, Optional[Sender]]] = collections.deque()
+        self._outbox: Deque[Tuple[LogEntry, Sender]] = collections.deque()
+        self._unreported: int = 0
+        self._unreported_unsent: int = 0
+        # The batches are written by executor threads and by close()
+        self._lock = threading.Lock()
+        self._writing: bool = False
+        self._sending: bool = False
+        self._pending: Optional[asyncio.Event] = None
+        self._sendable: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._sender: Optional[asyncio.Task] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} depth={self.depth} "
+            f"outbox={len(self._outbox)} maxsize={self.maxsize}>"
+        )
+
+    @property
+    def depth(self) -> int:
+        """Number of entries waiting for the console and the file."""
+        return len(self._queue)
+
+    def submit(self, entry: LogEntry, send: Optional[Sender] = None) -> None:
+        """Queue the entry.
+
+        :param entry: The log entry.
+        :param send: Coroutine function sending the entry to Discord, called
+            after the entry has been written.
+        """
+        if len(self._queue) >= self.maxsize:
+            self._queue.popleft()
+            self.stats.dropped += 1
+            self._unreported += 1
+        self._queue.append((entry, send))
+        self.stats.submitted += 1
+        self.stats.high_water = max(self.stats.high_water, len(self._queue))
+
+        self._start()
+        self._pending.set()
+
+    def _start(self) -> None:
+        if self._writer is not None and not self._writer.done():
+            return
+        # Events and tasks belong to the running loop
+        self._pending = asyncio.Event()
+        self._sendable = asyncio.Event()
+        self._writer = asyncio.create_task(self._write_loop())
+        self._sender = asyncio.create_task(self._send_loop())
+
+    def _take_batch(self) -> List[Tuple[LogEntry, Optional[Sender]]]:
+        count: int = min(len(self._queue), self.batch_size)
+        return [self._queue.popleft() for _ in range(count)]
+
+    def _take_reports(self) -> List[str]:
+        reports: List[str] = []
+        if self._unreported:
+            reports.append(
+                f"Log queue was full, {self._unreported} entries were dropped."
+            )
+        if self._unreported_unsent:
+            reports.append(
+                "Discord outbox was full, "
+                f"{self._unreported_unsent} entries were not sent."
+            )
+        self._unreported = self._unreported_unsent = 0
+        return reports
+
+    def _write(
+        self, batch: List[Tuple[LogEntry, Optional[Sender]]], reports: List[str]
+    ):
+        """Write the batch to the console and to the file.
+
+        This runs in a thread, it must not touch the queues.
+        """
+        lines: List[str] = [entry.format_to_console() for entry, _ in batch]
+        records: List[Tuple[datetime.date, str]] = [
+            (entry.timestamp.date(), entry.format_to_file()) for entry, _ in batch
+        ]
+
+        now = datetime.datetime.now()
+        for report in reports:
+            lines.append(f"{utils.time.format_datetime(now)} WARNING: {report}")
+            records.append(
+                (now.date(), json.dumps({"levelstr": "WARNING", "message": report}))
+            )
+
+        with self._lock:
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+            self.file.write(records)
+
+    async def _write_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._pending.wait()
+            self._pending.clear()
+            while self._queue:
+                batch = self._take_batch()
+                reports = self._take_reports()
+                self._writing = True
+                try:
+                    await loop.run_in_executor(None, self._write, batch, reports)
+                except Exception:
+                    traceback.print_exc()
+                finally:
+                    self._writing = False
+                self.stats.written += len(batch)
+                self.stats.batches += 1
+                for entry, send in batch:
+                    if send is not None:
+                        self._send_later(entry, send)
+                self._sendable.set()
+
+    def _send_later(self, entry: LogEntry, send: Sender) -> None:
+        if len(self._outbox) >= self.maxsize:
+            self._outbox.popleft()
+            self.stats.unsent += 1
+            self._unreported_unsent += 1
+        self._outbox.append((entry, send))
+
+    async def _send_loop(self) -> None:
+        while True:
+            await self._sendable.wait()
+            self._sendable.clear()
+            while self._outbox:
+                entry, send = self._outbox.popleft()
+                self._sending = True
+                try:
+                    await send(entry)
+                    self.stats.sent += 1
+                except Exception:
+                    # The log can't be logged, the console is the last resort
+                    traceback.print_exc()
+                finally:
+                    self._sending = False
+
+    async def flush(self) -> None:
+        """Wait until all queued entries are written and sent."""
+        while self._queue or self._outbox or self._writing or self._sending:
+            await asyncio.sleep(0.01)
+
+    def close(self) -> None:
+        """Write the waiting entries synchronously and close the file.
+
+        A batch being written by the executor is finished first. Entries
+        that were not sent to Discord yet are discarded.
+        """
+        for task in (self._writer, self._sender):
+            if task is not None and not task.done():
+                task.cancel()
+        self._writer = self._sender = None
+        while self._queue:
+            batch = self._take_batch()
+            self._write(batch, self._take_reports())
+            self.stats.written += len(batch)
+        self._outbox.clear()
+        with self._lock:
+            self.file.close()
+
+
+pipeline = LogPipeline(maxsize=int(os.getenv("LOG_QUEUE_SIZE") or 10_000))
+
+atexit.register(pipeline.close)
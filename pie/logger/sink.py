@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import traceback
+from typing import Deque, Dict, List, Optional
+
+import discord
+
+from pie import utils
+
+# Maximal length of the text inside of the code block
+MESSAGE_LIMIT: int = 1990
+
+
+class ChannelBuffer:
+    """Log entries waiting for one Discord channel."""
+
+    __slots__ = ("channel", "parts", "size", "suppressed")
+
+    def __init__(self, channel: discord.abc.Messageable):
+        self.channel = channel
+        self.parts: Deque[str] = collections.deque()
+        self.size: int = 0
+        # Entries dropped since the last message
+        self.suppressed: int = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} channel='{self.channel.id}' "
+            f"parts={len(self.parts)} size={self.size} suppressed={self.suppressed}>"
+        )
+
+    def pack(self, limit: Optional[int]) -> List[str]:
+        """Take the waiting parts and join them into messages.
+
+        :param limit: Maximal number of the messages, ``None`` for no limit.
+            The rest of the parts stays in the buffer.
+        :return: Text of the messages, without the code block.
+        """
+        messages: List[str] = []
+        if self.suppressed:
+            self.parts.appendleft(
+                f"... {self.suppressed} log entries were suppressed, "
+                f"too many messages were waiting for the channel."
+            )
+            self.size += len(self.parts[0])
+            self.suppressed = 0
+
+        while self.parts and (limit is None or len(messages) < limit):
+            message: str = self.parts.popleft()
+            while self.parts and len(message) + 1 + len(self.parts[0]) <= MESSAGE_LIMIT:
+                message += "\n" + self.parts.popleft()
+            messages.append(message)
+        self.size = sum(len(part) for part in self.parts)
+        return messages
+
+
+class SinkStats:
+    """Counters of the Discord sink."""
+
+    __slots__ = ("entries", "messages", "suppressed", "failed")
+
+    def __init__(self):
+        self.entries: int = 0
+        self.messages: int = 0
+        self.suppressed: int = 0
+        self.failed: int = 0
+
+    def __repr__(self) -> str:
+        values = " ".join(f"{name}={getattr(self, name)}" for name in self.__slots__)
+        return f"<{self.__class__.__name__} {values}>"
+
+
+class DiscordSink:
+    """Log entries sent to Discord channels in batches.
+
+    The entries are buffered per channel and sent as code blocks packed up
+    to the message limit, every ``interval`` seconds or sooner when some
+    channel has a full message waiting.
+
+    Each channel may get at most ``budget`` messages per ``interval``. When
+    more than ``backlog`` messages are waiting for the channel, new entries
+    are dropped and their count is reported in the next message.
+
+    :param interval: Number of seconds between the flushes.
+    :param budget: Maximal number of messages per channel and flush.
+    :param backlog: Maximal number of messages waiting for a channel.
+
+    Buffers are dropped once everything they held has been sent, so
+    deleted channels are not kept forever.
+    """
+
+    def __init__(self, interval: float = 3.0, budget: int = 3, backlog: int = 10):
+        self.interval = interval
+        self.budget = budget
+        self.backlog = backlog
+        self.stats = SinkStats()
+
+        self._buffers: Dict[int, ChannelBuffer] = {}
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._sending: bool = False
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} channels={len(self._buffers)} "
+            f"interval={self.interval} budget={self.budget}>"
+        )
+
+    @property
+    def pending(self) -> int:
+        """Number of characters waiting for all channels."""
+        return sum(buffer.size for buffer in self._buffers.values())
+
+    def add(self, channel: discord.abc.Messageable, text: str) -> bool:
+        """Queue the text for the channel.
+
+        :return: ``False`` if the channel is over its budget and the text was
+            dropped.
+        """
+        buffer: Optional[ChannelBuffer] = self._buffers.get(channel.id)
+        if buffer is None:
+            buffer = self._buffers[channel.id] = ChannelBuffer(channel)
+        # The channel object may have been replaced on reconnect
+        buffer.channel = channel
+
+        if buffer.size + len(text) > self.backlog * MESSAGE_LIMIT:
+            buffer.suppressed += 1
+            self.stats.suppressed += 1
+            return False
+
+        for part in utils.text.split(text, limit=MESSAGE_LIMIT):
+            buffer.parts.append(part)
+            buffer.size += len(part)
+        self.stats.entries += 1
+
+        self._start()
+        if buffer.size >= MESSAGE_LIMIT:
+            self._full.set()
+        return True
+
+    def _start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        # Events and tasks belong to the running loop
+        self._full = asyncio.Event()
+        self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self._send(self.budget)
+            if any(buffer.parts for buffer in self._buffers.values()):
+                # Continue with the rest right after the budget window
+                self._full.set()
+            # Keep the budget even if the flush was requested early
+            await asyncio.sleep(self.interval)
+
+    async def _send(self, limit: Optional[int]) -> None:
+        """Send the waiting messages of all channels.
+
+        :param limit: Maximal number of messages per channel, ``None`` for
+            no limit.
+        """
+        self._sending = True
+        try:
+            await asyncio.gather(
+                *(
+                    self._send_buffer(buffer, limit)
+                    for buffer in list(self._buffers.values())
+                    if buffer.parts or buffer.suppressed
+                )
+            )
+        finally:
+            self._sending = False
+            for channel_id, buffer in list(self._buffers.items()):
+                if not buffer.parts and not buffer.suppressed:
+                    del self._buffers[channel_id]
+
+    async def _send_buffer(self, buffer: ChannelBuffer, limit: Optional[int]) -> None:
+        messages: List[str] = buffer.pack(limit)
+        for message in messages:
+            try:
+                await buffer.channel.send(f"```{message}```")
+                self.stats.messages += 1
+            except Exception:
+                # The log can't be logged, the console is the last resort
+                self.stats.failed += 1
+                traceback.print_exc()
+
+    async def flush(self) -> None:
+        """Send everything that is waiting, ignoring the budget."""
+        while self._sending:
+            await asyncio.sleep(0.01)
+        await self._send(None)
+
+
+sink = DiscordSink()
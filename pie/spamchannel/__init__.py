@@ -1,6 +1,6 @@
 import contextlib
 import datetime
-from typing import Callable, Dict, Optional, List
+from typing import Dict, Optional, List
 
 import discord
 from discord.ext import commands
@@ -12,7 +12,7 @@ from pie.exceptions import SpamChannelException
 
 
 config = Config.get()
-_trace: Callable = pie._tracing.register("pie_spamchannel")
+_trace: pie._tracing.Tracer = pie._tracing.register("pie_spamchannel")
 
 
 class _SpamchannelManager:
@@ -55,7 +55,7 @@ class _SpamchannelManager:
             If the command should be run or not.
         """
         if type(message.channel) is not discord.TextChannel:
-            _trace(f"Not TextChannel, but {type(message.channel).__name__}.")
+            _trace("Not TextChannel, but {.__name__}.", type(message.channel))
             return False
 
         channel_id: int = message.channel.id
@@ -104,7 +104,7 @@ async def _run(ctx: commands.Context, hard: bool) -> bool:
         _trace("Not in guild, invocation allowed.")
         return True
 
-    spamchannels = SpamChannel.get_all(ctx.guild.id)
+    spamchannels = await SpamChannel.get_all_async(ctx.guild.id)
     if not spamchannels:
         # Allow the invocation if there are no spamchannels
         _trace("No spamchannels, invocation allowed.")
@@ -1,13 +1,15 @@
 from __future__ import annotations
-from typing import Dict, Union, List, Optional
+from typing import Dict, Union, Optional
 
 from sqlalchemy import BigInteger, Boolean, Column, Integer, UniqueConstraint
 
-from pie.database import database, session
+from pie.database import database, session, transfer
+from pie.database.cache import GuildSettings
 
 
-class SpamChannel(database.base):
+class SpamChannel(GuildSettings, database.base):
     __tablename__ = "spamchannels"
+    __cache_key__ = ("channel_id",)
 
     idx = Column(Integer, primary_key=True, autoincrement=True)
     guild_id = Column(BigInteger)
@@ -19,48 +21,40 @@ class SpamChannel(database.base):
         UniqueConstraint(channel_id, primary),
     )
 
-    def add(guild_id: int, channel_id: int) -> SpamChannel:
-        channel = SpamChannel(guild_id=guild_id, channel_id=channel_id)
+    @classmethod
+    def add(cls, guild_id: int, channel_id: int) -> SpamChannel:
+        channel = cls(guild_id=guild_id, channel_id=channel_id)
         session.add(channel)
+        cls.invalidate(guild_id)
         session.commit()
         return channel
 
-    def get(guild_id: int, channel_id: int) -> Optional[SpamChannel]:
+    @classmethod
+    def set_primary(cls, guild_id: int, channel_id: int) -> Optional[SpamChannel]:
+        # The objects are modified, they can't be loaded from the cache
         query = (
-            session.query(SpamChannel)
-            .filter_by(guild_id=guild_id, channel_id=channel_id)
-            .one_or_none()
-        )
-        return query
-
-    def get_all(guild_id: int) -> List[SpamChannel]:
-        query = session.query(SpamChannel).filter_by(guild_id=guild_id).all()
-        return query
-
-    def set_primary(guild_id: int, channel_id: int) -> Optional[SpamChannel]:
-        query = (
-            session.query(SpamChannel)
-            .filter_by(guild_id=guild_id, primary=True)
-            .one_or_none()
+            session.query(cls).filter_by(guild_id=guild_id, primary=True).one_or_none()
         )
         if query and query.channel_id == channel_id:
             return query
         if query:
             query.primary = False
 
-        query = SpamChannel.get(guild_id, channel_id)
+        query = (
+            session.query(cls)
+            .filter_by(guild_id=guild_id, channel_id=channel_id)
+            .one_or_none()
+        )
         if query:
             query.primary = True
 
+        cls.invalidate(guild_id)
         session.commit()
         return query
 
-    def remove(guild_id: int, channel_id):
-        query = (
-            session.query(SpamChannel)
-            .filter_by(guild_id=guild_id, channel_id=channel_id)
-            .delete()
-        )
+    @classmethod
+    def remove(cls, guild_id: int, channel_id: int) -> int:
+        query = super().remove(guild_id, channel_id)
         session.commit()
         return query
 
@@ -77,3 +71,6 @@ class SpamChannel(database.base):
             "channel_id": self.channel_id,
             "primary": self.primary,
         }
+
+
+transfer.register(SpamChannel)
@@ -4,7 +4,8 @@ from typing import Dict, Optional, Union
 
 from sqlalchemy import BigInteger, Column, String
 
-from pie.database import database, session
+from pie.database import database, session, transfer, write_behind
+from pie.database.write_behind import MISSING
 
 
 class StorageData(database.base):
@@ -24,29 +25,30 @@ class StorageData(database.base):
         value,
         allow_overwrite: bool = True,
     ) -> Optional[StorageData]:
-        data = (
-            session.query(StorageData)
-            .filter_by(module=module)
-            .filter_by(guild_id=guild_id)
-            .filter_by(key=key)
-            .one_or_none()
-        )
-
-        if data and not allow_overwrite:
+        if not allow_overwrite and StorageData.get(module, guild_id, key):
             return None
 
-        if not data:
-            data = StorageData(module=module, key=key, guild_id=guild_id)
-
-        data.value = value
-        data.type = type(value).__name__
-        session.merge(data)
-        session.commit()
-
-        return data
+        data = StorageData(
+            module=module,
+            guild_id=guild_id,
+            key=key,
+            value=value,
+            type=type(value).__name__,
+        )
+        return write_behind.write(
+            (StorageData.__tablename__, module, guild_id, key),
+            lambda session: session.merge(data),
+            data,
+        )
 
     @staticmethod
     def get(module: str, guild_id: int, key: str) -> Optional[StorageData]:
+        pending = write_behind.lookup(
+            (StorageData.__tablename__, module, guild_id, key)
+        )
+        if pending is not MISSING:
+            return pending
+
         data = (
             session.query(StorageData)
             .filter_by(module=module)
@@ -56,16 +58,19 @@ class StorageData(database.base):
         )
         return data
 
-    @classmethod
+    @staticmethod
     def remove(module: str, guild_id: int, key: str) -> bool:
-        count = (
-            session.get(StorageData)
+        if StorageData.get(module, guild_id, key) is None:
+            return False
+
+        write_behind.write(
+            (StorageData.__tablename__, module, guild_id, key),
+            lambda session: session.query(StorageData)
             .filter_by(module=module, guild_id=guild_id, key=key)
-            .delete()
+            .delete(),
+            None,
         )
-        session.commit()
-
-        return count == 1
+        return True
 
     def __repr__(self) -> str:
         return (
@@ -81,3 +86,6 @@ class StorageData(database.base):
             "key": self.key,
             "value": self.value,
         }
+
+
+transfer.register(StorageData)
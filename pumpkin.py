@@ -2,6 +2,7 @@ import asyncio
 import os
 import sys
 import platform
+import traceback
 from pathlib import Path
 from typing import Dict
 
@@ -131,9 +132,6 @@ bot = commands.Bot(
     help_command=Help(),
     intents=intents,
 )
-# This is required to make the 'bot' object hashable by ring's LRU cache
-# See pie/acl/__init__.py:map_member_to_ACLevel()
-bot.__ring_key__ = lambda: "bot"
 
 
 # Setup logging
@@ -143,12 +141,62 @@ from pie import logger
 bot_log = logger.Bot.logger(bot)
 guild_log = logger.Guild.logger(bot)
 
+# Tasks started from synchronous code; the loop only keeps weak references
+background_tasks: set = set()
+
+
+def create_background_task(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(_finish_background_task)
+    return task
+
+
+def _finish_background_task(task: asyncio.Task):
+    background_tasks.discard(task)
+    # Retrieve the exception, so it is not lost
+    if not task.cancelled() and task.exception() is not None:
+        error = task.exception()
+        print("Background task failed:", file=sys.stderr)  # noqa: T001
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+
+def report_failed_write(key: tuple, exc: Exception):
+    """Log the write the write-behind queue could not commit."""
+    create_background_task(
+        bot_log.error(
+            None,
+            None,
+            f"Delayed database write to '{key[0]}' could not be committed, "
+            "the change was lost.",
+            exception=exc,
+        )
+    )
+
+
+database.write_behind.on_failure = report_failed_write
+
 
 # Setup listeners
 
+from pie.acl import index as acl_index
+
+acl_index.add_listeners(bot)
+
 already_loaded: bool = False
 
 
+def apply_config(config: database.config.Config):
+    """Apply the saved configuration to the running bot."""
+    bot.command_prefix = config.prefix
+    # If the status is set to "auto", the loop in Admin module sets the presence
+    if bot.is_ready() and config.status != "auto":
+        create_background_task(utils.discord.update_presence(bot))
+
+
+config.subscribe(apply_config)
+
+
 async def update_app_info(bot: commands.Bot):
     # Update bot information
     app: discord.AppInfo = await bot.application_info()
@@ -156,6 +204,8 @@ async def update_app_info(bot: commands.Bot):
         bot.owner_ids = {m.id for m in app.team.members}
     else:
         bot.owner_ids = {app.owner.id}
+    # The owners have their own level, stored levels may be wrong now
+    acl_index.forget_members()
 
 
 @bot.event
@@ -188,10 +238,23 @@ async def on_ready():
         already_loaded = True
 
 
+@bot.before_invoke
+async def before_invoke(ctx: commands.Context):
+    # Attribute the database queries to the command instead of 'on_message'
+    database.instrumentation.attribute(f"command {ctx.command.qualified_name}")
+
+
+@bot.after_invoke
+async def after_invoke(ctx: commands.Context):
+    # Don't keep the transaction open until the whole event is processed
+    database.finish_session(failed=ctx.command_failed)
+
+
 async def on_error(event, *args, **kwargs):
     error_type, error, tb = sys.exc_info()
 
-    # Make sure we rollback the database session if we encounter an error
+    # Make sure we rollback the database session if we encounter an error.
+    # Every event has its own session, other handlers are not affected.
     if isinstance(error, sqlalchemy.exc.SQLAlchemyError):
         database.session.rollback()
         database.session.commit()
@@ -258,7 +321,13 @@ async def load_modules():
 
 async def main():
     await load_modules()
-    await bot.start(os.getenv("TOKEN"))
+    # The main task runs until the bot is stopped
+    database.finish_session()
+    try:
+        await bot.start(os.getenv("TOKEN"))
+    finally:
+        # Commit writes delayed by the write-behind queue
+        database.write_behind.flush()
 
 
 asyncio.run(main())
@@ -0,0 +1,18 @@
+import pytest
+
+from tests.benchmarks import results
+from tests.benchmarks.database import in_memory
+
+
+@pytest.fixture(scope="module")
+def memory_engine():
+    with in_memory() as engine:
+        yield engine
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not results.RESULTS:
+        return
+    terminalreporter.section("benchmarks")
+    for line in results.format_table():
+        terminalreporter.write_line(line)
@@ -0,0 +1,34 @@
+import contextlib
+from typing import Iterator
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+
+from pie.database import database, read_session_factory, session_factory
+from pie.database.stats import Instrumentation
+
+# All connections share one in-memory database
+engine: Engine = create_engine(
+    "sqlite://",
+    future=True,
+    poolclass=StaticPool,
+    connect_args={"check_same_thread": False},
+)
+
+# Queries sent to the in-memory database, keyed by the benchmark name
+instrumentation = Instrumentation(slow_threshold=0)
+instrumentation.attach(engine)
+
+
+@contextlib.contextmanager
+def in_memory() -> Iterator[Engine]:
+    """Send the sessions created by the models to the in-memory database."""
+    database.base.metadata.create_all(engine)
+    session_factory.configure(bind=engine)
+    read_session_factory.configure(bind=engine)
+    try:
+        yield engine
+    finally:
+        session_factory.configure(bind=database.db)
+        read_session_factory.configure(bind=database.read_db)
@@ -0,0 +1,66 @@
+import math
+import statistics
+import time
+from typing import Callable, List
+
+
+class Result:
+    """Latency and query count of one benchmark."""
+
+    def __init__(self, name: str, durations: List[float], queries: int):
+        self.name = name
+        self.durations = sorted(durations)
+        self.queries = queries
+
+    @property
+    def mean(self) -> float:
+        return statistics.fmean(self.durations)
+
+    @property
+    def p95(self) -> float:
+        # Nearest-rank percentile
+        return self.durations[math.ceil(len(self.durations) * 0.95) - 1]
+
+    @property
+    def queries_per_call(self) -> float:
+        return self.queries / len(self.durations)
+
+
+RESULTS: List[Result] = []
+
+
+def measure(name: str, function: Callable[[int], object], count: int) -> Result:
+    """Call the function ``count`` times and record the latency of each call.
+
+    :param function: Function taking the number of the iteration.
+    """
+    # The query counter is imported lazily, the engine is set up by fixtures
+    from tests.benchmarks.database import instrumentation
+
+    token = instrumentation.attribute(name)
+    durations: List[float] = []
+    try:
+        for i in range(count):
+            start: float = time.perf_counter()
+            function(i)
+            durations.append(time.perf_counter() - start)
+    finally:
+        instrumentation.restore(token)
+
+    result = Result(name, durations, instrumentation.sources[name].count)
+    RESULTS.append(result)
+    return result
+
+
+def format_table() -> List[str]:
+    lines: List[str] = [
+        f"{'benchmark':<40} {'calls':>7} {'mean (us)':>10} "
+        f"{'p95 (us)':>10} {'queries/call':>13}"
+    ]
+    for result in RESULTS:
+        lines.append(
+            f"{result.name:<40} {len(result.durations):>7} "
+            f"{result.mean * 1e6:>10.1f} {result.p95 * 1e6:>10.1f} "
+            f"{result.queries_per_call:>13.3f}"
+        )
+    return lines
@@ -0,0 +1,250 @@
+"""Benchmarks of the ACL checks.
+
+The synthetic guild is stored in an in-memory SQLite database. Its size can
+be multiplied by the ``BENCHMARK_SCALE`` variable:
+
+.. code-block:: bash
+
+    BENCHMARK_SCALE=10 pytest -m benchmark tests/benchmarks
+
+The latency and query counts are printed in the summary of the run.
+"""
+
+import os
+import random
+from typing import Dict, List
+
+import pytest
+
+from pie import acl
+from pie.acl import index as acl_index
+from pie.acl.database import (
+    ACDefault,
+    ACLevel,
+    ACLevelMappping,
+    ChannelOverwrite,
+    RoleOverwrite,
+    UserOverwrite,
+)
+from pie.exceptions import ACLFailure
+from tests.benchmarks.results import measure
+
+pytestmark = pytest.mark.benchmark
+
+SCALE: float = float(os.getenv("BENCHMARK_SCALE") or 1)
+
+GUILD_ID: int = -1000
+ROLES: int = int(2000 * SCALE)
+MEMBERS: int = int(1000 * SCALE)
+CHANNELS: int = int(200 * SCALE)
+COMMANDS: int = int(1000 * SCALE)
+OVERWRITES: int = int(2000 * SCALE)
+ROLES_PER_MEMBER: int = 20
+
+
+class _Object:
+    def __init__(self, id: int, **kwargs):
+        self.id = id
+        self.name = f"object-{id}"
+        self.__dict__.update(kwargs)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class _Bot(_Object):
+    def __init__(self, levels: Dict[str, ACLevel]):
+        super().__init__(0, owner_ids={1})
+        self.commands = {
+            name: _Object(0, callback=_Object(0, __acl_level__=level))
+            for name, level in levels.items()
+        }
+
+    def get_command(self, name: str):
+        return self.commands.get(name)
+
+
+class _Guild:
+    """Fake objects of the synthetic guild."""
+
+    def __init__(self):
+        rng = random.Random(0)
+        self.guild = _Object(GUILD_ID, owner_id=2)
+        self.roles = [_Object(10_000 + i) for i in range(ROLES)]
+        self.channels = [
+            _Object(100_000 + i, guild=self.guild) for i in range(CHANNELS)
+        ]
+        self.members = [
+            _Object(
+                1_000_000 + i,
+                guild=self.guild,
+                roles=sorted(
+                    rng.sample(self.roles, ROLES_PER_MEMBER), key=lambda r: r.id
+                ),
+            )
+            for i in range(MEMBERS)
+        ]
+        self.commands: List[str] = [f"module command{i}" for i in range(COMMANDS)]
+        self.bot = _Bot({c: rng.choice(list(ACLevel)) for c in self.commands})
+        self.rng = rng
+
+    def fill(self, engine) -> None:
+        rng = self.rng
+        rows = {
+            ACDefault: [
+                {
+                    "guild_id": GUILD_ID,
+                    "command": command,
+                    "level": rng.choice(list(ACLevel)),
+                }
+                for command in rng.sample(self.commands, COMMANDS // 2)
+            ],
+            ACLevelMappping: [
+                {
+                    "guild_id": GUILD_ID,
+                    "role_id": role.id,
+                    "level": rng.choice(list(ACLevel)[2:]),
+                }
+                for role in rng.sample(self.roles, ROLES // 10)
+            ],
+            RoleOverwrite: [
+                {
+                    "guild_id": GUILD_ID,
+                    "role_id": rng.choice(self.roles).id,
+                    "command": rng.choice(self.commands),
+                    "allow": rng.random() < 0.5,
+                }
+                for _ in range(OVERWRITES)
+            ],
+            UserOverwrite: [
+                {
+                    "guild_id": GUILD_ID,
+                    "user_id": rng.choice(self.members).id,
+                    "command": rng.choice(self.commands),
+                    "allow": rng.random() < 0.5,
+                }
+                for _ in range(OVERWRITES)
+            ],
+            ChannelOverwrite: [
+                {
+                    "guild_id": GUILD_ID,
+                    "channel_id": rng.choice(self.channels).id,
+                    "command": rng.choice(self.commands),
+                    "allow": rng.random() < 0.5,
+                }
+                for _ in range(OVERWRITES)
+            ],
+        }
+        with engine.begin() as connection:
+            for model, values in rows.items():
+                table = model.__table__
+                connection.execute(table.delete().where(table.c.guild_id == GUILD_ID))
+                connection.execute(table.insert(), values)
+        _forget()
+
+    def check(self, member, channel, command: str) -> bool:
+        try:
+            return acl.acl2_function(
+                level=self.bot.commands[command].callback.__acl_level__,
+                bot=self.bot,
+                invoker=member,
+                command=command,
+                guild=self.guild,
+                channel=channel,
+            )
+        except ACLFailure:
+            return False
+
+    def context(self, member, channel) -> _Object:
+        return _Object(
+            0, bot=self.bot, guild=self.guild, author=member, channel=channel
+        )
+
+
+def _forget():
+    """Drop everything the ACL keeps in memory."""
+    for model in acl_index.MODELS:
+        model.forget(GUILD_ID)
+
+
+@pytest.fixture(scope="module")
+def guild(memory_engine) -> _Guild:
+    guild = _Guild()
+    guild.fill(memory_engine)
+    yield guild
+    _forget()
+
+
+def test_benchmark_acl_cold(guild: _Guild):
+    def run(i: int):
+        _forget()
+        guild.check(guild.members[i], guild.channels[0], guild.commands[i])
+
+    result = measure("acl2_function (cold)", run, 10)
+    # One query per ACL table
+    assert result.queries_per_call == len(acl_index.MODELS)
+
+
+def test_benchmark_acl_index(guild: _Guild):
+    _forget()
+    guild.check(guild.members[0], guild.channels[0], guild.commands[0])
+
+    def run(i: int):
+        member = guild.members[i % MEMBERS]
+        channel = guild.channels[i % CHANNELS]
+        guild.check(member, channel, guild.commands[i % COMMANDS])
+
+    result = measure("acl2_function (stored index)", run, MEMBERS)
+    assert 0 == result.queries
+
+
+def test_benchmark_acl_verdict(guild: _Guild):
+    member, channel, command = guild.members[0], guild.channels[0], guild.commands[0]
+    guild.check(member, channel, command)
+
+    result = measure(
+        "acl2_function (stored verdict)",
+        lambda i: guild.check(member, channel, command),
+        MEMBERS,
+    )
+    assert 0 == result.queries
+
+
+def test_benchmark_map_member(guild: _Guild):
+    acl_index.get(GUILD_ID)
+
+    def run_cold(i: int):
+        member = guild.members[i % MEMBERS]
+        acl_index.forget_member(GUILD_ID, member.id)
+        acl.map_member_to_ACLevel(bot=guild.bot, member=member)
+
+    def run_stored(i: int):
+        acl.map_member_to_ACLevel(bot=guild.bot, member=guild.members[i % MEMBERS])
+
+    cold = measure("map_member_to_ACLevel (cold)", run_cold, MEMBERS)
+    stored = measure("map_member_to_ACLevel (stored)", run_stored, MEMBERS)
+    assert 0 == cold.queries
+    assert 0 == stored.queries
+
+
+def test_benchmark_can_invoke_command(guild: _Guild):
+    acl_index.forget_members(GUILD_ID)
+    ctx = guild.context(guild.members[0], guild.channels[0])
+
+    result = measure(
+        "can_invoke_command",
+        lambda i: acl.can_invoke_command(guild.bot, ctx, guild.commands[i]),
+        COMMANDS,
+    )
+    assert 0 == result.queries
+
+
+def test_benchmark_get_verdicts(guild: _Guild):
+    def run(i: int):
+        acl_index.forget_members(GUILD_ID)
+        acl.get_verdicts(
+            guild.bot, guild.members[i], guild.channels[i % CHANNELS], guild.commands
+        )
+
+    result = measure(f"get_verdicts ({COMMANDS} commands)", run, 20)
+    assert 0 == result.queries
@@ -0,0 +1,42 @@
+import pytest
+
+import pie._tracing
+
+
+class _Expensive:
+    formatted: int = 0
+
+    def __str__(self) -> str:
+        _Expensive.formatted += 1
+        return "expensive"
+
+
+def test_tracing_disabled():
+    trace = pie._tracing.register("tests_disabled")
+    assert trace is pie._tracing.register("tests_disabled")
+    assert not trace.enabled
+
+    trace("Value '{}'.", _Expensive())
+    assert 0 == _Expensive.formatted
+    assert [] == pie._tracing.get_records("tests_disabled")
+
+
+def test_tracing_runtime(capsys):
+    trace = pie._tracing.register("tests_runtime")
+    pie._tracing.set_enabled("tests_runtime", True)
+    try:
+        trace("Value '{}'.", _Expensive())
+        trace("Plain {braces}.")
+    finally:
+        pie._tracing.set_enabled("tests_runtime", False)
+    trace("Not recorded.")
+
+    records = pie._tracing.get_records("tests_runtime")
+    assert ["Value 'expensive'.", "Plain {braces}."] == [r.message for r in records]
+    assert "[trace:tests_runtime] Value 'expensive'." in capsys.readouterr().out
+    assert "tests_runtime" in [t.name for t in pie._tracing.get_tracers()]
+
+
+def test_tracing_unknown():
+    with pytest.raises(ValueError):
+        pie._tracing.set_enabled("tests_unknown", True)
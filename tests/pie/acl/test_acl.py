@@ -0,0 +1,33 @@
+from discord.ext import commands
+
+from pie import acl, check
+
+
+@check.acl2(check.ACLevel.SUBMOD)
+@commands.command()
+async def decorated(ctx):
+    pass
+
+
+@commands.command()
+async def undecorated(ctx):
+    pass
+
+
+@commands.command()
+@check.acl2(check.ACLevel.MOD)
+async def inner(ctx):
+    pass
+
+
+def test_hardcoded_level():
+    assert check.ACLevel.SUBMOD == acl.get_hardcoded_ACLevel(decorated)
+    assert check.ACLevel.SUBMOD == acl.get_hardcoded_ACLevel(decorated.callback)
+    assert check.ACLevel.MOD == acl.get_hardcoded_ACLevel(inner)
+    assert acl.get_hardcoded_ACLevel(undecorated) is None
+    assert acl.get_hardcoded_ACLevel(None) is None
+
+
+def test_hardcoded_level_check():
+    assert 1 == len(decorated.checks)
+    assert 1 == len(inner.checks)
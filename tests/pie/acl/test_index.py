@@ -0,0 +1,279 @@
+import asyncio
+
+import pytest
+
+from pie import acl
+from pie.acl import index
+from pie.acl.index import verdict_stats
+from pie.acl.database import (
+    ACDefault,
+    ACLevel,
+    ACLevelMappping,
+    ChannelOverwrite,
+    RoleOverwrite,
+    UserOverwrite,
+)
+from pie.database import session
+from pie.exceptions import (
+    InsufficientACLevel,
+    NegativeChannelOverwrite,
+    NegativeRoleOverwrite,
+    NegativeUserOverwrite,
+)
+
+
+class _Object:
+    def __init__(self, id: int, **kwargs):
+        self.id = id
+        self.name = str(id)
+        self.__dict__.update(kwargs)
+
+
+GUILD = _Object(-5, owner_id=1)
+CHANNEL = _Object(10)
+BOT = _Object(0, owner_ids={2})
+
+
+def _member(*role_ids: int) -> _Object:
+    return _Object(3, guild=GUILD, roles=[_Object(r) for r in role_ids])
+
+
+def _check(member: _Object, command: str = "test", level=ACLevel.MOD) -> bool:
+    return acl.acl2_function(
+        level=level,
+        bot=BOT,
+        invoker=member,
+        command=command,
+        guild=GUILD,
+        channel=CHANNEL,
+    )
+
+
+def _cleanup():
+    for model in index.MODELS:
+        session.query(model).filter_by(guild_id=GUILD.id).delete()
+        model.invalidate(GUILD.id)
+    session.commit()
+
+
+def test_index_build():
+    _cleanup()
+    try:
+        ACDefault.add(GUILD.id, "test", ACLevel.SUBMOD)
+        ACLevelMappping.add(GUILD.id, 20, ACLevel.MOD)
+        RoleOverwrite.add(GUILD.id, 20, "test", False)
+        UserOverwrite.add(GUILD.id, 3, "test", True)
+        ChannelOverwrite.add(GUILD.id, 10, "other", False)
+
+        built = index.get(GUILD.id)
+        assert built is index.get(GUILD.id)
+        assert {"test": ACLevel.SUBMOD} == built.defaults
+        assert {20: ACLevel.MOD} == built.mappings
+        assert {"test": {20: False}} == built.roles
+        assert {(3, "test"): True} == built.users
+        assert {(10, "other"): False} == built.channels
+    finally:
+        _cleanup()
+
+
+def test_index_invalidation():
+    _cleanup()
+    try:
+        built = index.get(GUILD.id)
+        assert {} == built.defaults
+
+        ACDefault.add(GUILD.id, "test", ACLevel.SUBMOD)
+        assert {"test": ACLevel.SUBMOD} == index.get(GUILD.id).defaults
+        assert built is not index.get(GUILD.id)
+
+        assert ACDefault.remove(GUILD.id, "test")
+        assert {} == index.get(GUILD.id).defaults
+    finally:
+        _cleanup()
+
+
+def test_index_check():
+    _cleanup()
+    try:
+        with pytest.raises(InsufficientACLevel):
+            _check(_member())
+        assert _check(_member(), command="other", level=ACLevel.EVERYONE)
+
+        ACLevelMappping.add(GUILD.id, 20, ACLevel.MOD)
+        assert _check(_member(20))
+
+        RoleOverwrite.add(GUILD.id, 20, "test", False)
+        with pytest.raises(NegativeRoleOverwrite):
+            _check(_member(20))
+
+        ChannelOverwrite.add(GUILD.id, CHANNEL.id, "test", False)
+        with pytest.raises(NegativeChannelOverwrite):
+            _check(_member(20))
+
+        UserOverwrite.add(GUILD.id, 3, "test", True)
+        assert _check(_member(20))
+    finally:
+        _cleanup()
+
+
+def test_index_verdicts():
+    _cleanup()
+    try:
+        ACLevelMappping.add(GUILD.id, 20, ACLevel.MOD)
+        hits, misses = verdict_stats.hits, verdict_stats.misses
+
+        assert _check(_member(20))
+        assert _check(_member(20))
+        assert (hits + 1, misses + 1) == (verdict_stats.hits, verdict_stats.misses)
+
+        # The roles were changed, but no event was received
+        assert _check(_member(), command="other")
+        assert _check(_member())
+
+        index.forget_member(GUILD.id, 3)
+        with pytest.raises(InsufficientACLevel):
+            _check(_member())
+        with pytest.raises(InsufficientACLevel):
+            _check(_member())
+
+        invalidations = verdict_stats.invalidations
+        index.forget_channel(GUILD.id, CHANNEL.id)
+        assert invalidations + 1 == verdict_stats.invalidations
+        misses = verdict_stats.misses
+        with pytest.raises(InsufficientACLevel):
+            _check(_member())
+        assert misses + 1 == verdict_stats.misses
+
+        UserOverwrite.add(GUILD.id, 3, "test", False)
+        with pytest.raises(NegativeUserOverwrite):
+            _check(_member(20))
+    finally:
+        _cleanup()
+
+
+def test_index_levels():
+    _cleanup()
+    try:
+        ACLevelMappping.add(GUILD.id, 20, ACLevel.MOD)
+        ACLevelMappping.add(GUILD.id, 21, ACLevel.SUBMOD)
+
+        # The highest role decides
+        assert ACLevel.SUBMOD == acl.map_member_to_ACLevel(
+            bot=BOT, member=_member(20, 21)
+        )
+        assert {3: ACLevel.SUBMOD} == index.get(GUILD.id).levels
+        assert ACLevel.SUBMOD == acl.map_member_to_ACLevel(bot=BOT, member=_member())
+
+        index.forget_member(GUILD.id, 3)
+        assert ACLevel.EVERYONE == acl.map_member_to_ACLevel(bot=BOT, member=_member())
+
+        owner = _Object(1, guild=GUILD, roles=[])
+        bot_owner = _Object(2, guild=GUILD, roles=[])
+        assert ACLevel.GUILD_OWNER == acl.map_member_to_ACLevel(bot=BOT, member=owner)
+        assert ACLevel.BOT_OWNER == acl.map_member_to_ACLevel(bot=BOT, member=bot_owner)
+
+        # New mapping drops the stored levels
+        ACLevelMappping.remove(GUILD.id, 21)
+        ACLevelMappping.add(GUILD.id, 21, ACLevel.MEMBER)
+        assert {} == index.get(GUILD.id).levels
+        index.forget_members(GUILD.id)
+    finally:
+        _cleanup()
+
+
+class _Bot(_Object):
+    def __init__(self, levels: dict):
+        super().__init__(0, owner_ids=set())
+        self.levels = levels
+
+    def get_command(self, name: str):
+        if name not in self.levels:
+            return None
+
+        async def callback(ctx):
+            pass
+
+        callback.__acl_level__ = self.levels[name]
+        return _Object(0, callback=callback)
+
+
+def test_index_get_verdicts():
+    _cleanup()
+    bot = _Bot(
+        {"member": ACLevel.MEMBER, "mod": ACLevel.MOD, "everyone": ACLevel.EVERYONE}
+    )
+    try:
+        ACLevelMappping.add(GUILD.id, 20, ACLevel.MEMBER)
+        ACDefault.add(GUILD.id, "mod", ACLevel.EVERYONE)
+        UserOverwrite.add(GUILD.id, 3, "member", False)
+
+        verdicts = acl.get_verdicts(
+            bot, _member(20), CHANNEL, ["member", "mod", "everyone", "unknown"]
+        )
+        assert {
+            "member": False,
+            "mod": True,
+            "everyone": True,
+            "unknown": False,
+        } == verdicts
+    finally:
+        _cleanup()
+
+
+def test_index_refusal_not_shared():
+    _cleanup()
+    try:
+        errors = []
+        for _ in range(2):
+            with pytest.raises(InsufficientACLevel) as info:
+                _check(_member())
+            errors.append(info.value)
+        # Each check raises its own exception
+        assert errors[0] is not errors[1]
+        assert ACLevel.MOD == errors[1].required
+    finally:
+        _cleanup()
+
+
+def test_index_verdict_limit(monkeypatch):
+    _cleanup()
+    monkeypatch.setattr(index, "MAX_VERDICTS", 3)
+    try:
+        evictions = verdict_stats.evictions
+        _check(_Object(4, guild=GUILD, roles=[]), level=ACLevel.EVERYONE)
+        _check(_Object(5, guild=GUILD, roles=[]), level=ACLevel.EVERYONE)
+        _check(_Object(4, guild=GUILD, roles=[]), level=ACLevel.EVERYONE)
+        _check(_Object(6, guild=GUILD, roles=[]), level=ACLevel.EVERYONE)
+        assert 3 == index.get(GUILD.id).size
+
+        # The least recently checked member is dropped
+        _check(_Object(7, guild=GUILD, roles=[]), level=ACLevel.EVERYONE)
+        assert [4, 6, 7] == list(index.get(GUILD.id).verdicts)
+        assert 3 == index.get(GUILD.id).size
+        assert evictions + 1 == verdict_stats.evictions
+    finally:
+        _cleanup()
+
+
+def test_index_listeners():
+    _cleanup()
+
+    class _Listeners:
+        def __init__(self):
+            self.listeners = {}
+
+        def add_listener(self, func):
+            self.listeners[func.__name__] = func
+
+    bot = _Listeners()
+    index.add_listeners(bot)
+    try:
+        ACLevelMappping.add(GUILD.id, 20, ACLevel.MOD)
+        assert _check(_member(20))
+
+        # The member lost the role
+        asyncio.run(bot.listeners["on_member_update"](_member(20), _member()))
+        with pytest.raises(InsufficientACLevel):
+            _check(_member())
+    finally:
+        _cleanup()
@@ -0,0 +1,193 @@
+import pytest
+
+from pie.acl import index, transfer
+from pie.acl.database import ACDefault, ACLevel, ACLevelMappping, UserOverwrite
+from pie.database import session
+
+GUILD_ID: int = -6
+COMMANDS = {"test", "kept", "changed", "removed", "added"}
+
+
+def _cleanup():
+    for model in index.MODELS:
+        session.query(model).filter_by(guild_id=GUILD_ID).delete()
+        model.invalidate(GUILD_ID)
+    session.commit()
+
+
+def test_transfer_roundtrip():
+    _cleanup()
+    try:
+        ACDefault.add(GUILD_ID, "test", ACLevel.SUBMOD)
+        ACLevelMappping.add(GUILD_ID, 20, ACLevel.MOD)
+        UserOverwrite.add(GUILD_ID, 3, "test", False)
+
+        data = transfer.export_guild(GUILD_ID)
+        assert [{"command": "test", "level": "SUBMOD"}] == data["defaults"]
+        assert [{"user_id": 3, "command": "test", "allow": False}] == data[
+            "user_overwrites"
+        ]
+        assert [] == transfer.diff(GUILD_ID, data, bot_commands=COMMANDS)
+    finally:
+        _cleanup()
+
+
+def test_transfer_diff_apply():
+    _cleanup()
+    try:
+        ACDefault.add(GUILD_ID, "kept", ACLevel.SUBMOD)
+        ACDefault.add(GUILD_ID, "changed", ACLevel.SUBMOD)
+        ACDefault.add(GUILD_ID, "removed", ACLevel.SUBMOD)
+        UserOverwrite.add(GUILD_ID, 3, "test", False)
+
+        data = {
+            "defaults": [
+                {"command": "kept", "level": "SUBMOD"},
+                {"command": "changed", "level": "MOD"},
+                {"command": "added", "level": "EVERYONE"},
+            ],
+            "mappings": [{"role_id": 20, "level": "MEMBER"}],
+        }
+        changes = transfer.diff(GUILD_ID, data, bot_commands=COMMANDS)
+        assert {
+            ("defaults", ("changed",), "change"),
+            ("defaults", ("removed",), "remove"),
+            ("defaults", ("added",), "add"),
+            ("mappings", (20,), "add"),
+        } == {(c.section, c.key, c.action) for c in changes}
+
+        transfer.apply(GUILD_ID, changes)
+        assert {"kept": ACLevel.SUBMOD, "changed": ACLevel.MOD} == {
+            k: v
+            for k, v in index.get(GUILD_ID).defaults.items()
+            if k in ("kept", "changed", "removed")
+        }
+        assert ACLevel.EVERYONE == index.get(GUILD_ID).defaults["added"]
+        assert {20: ACLevel.MEMBER} == index.get(GUILD_ID).mappings
+        # Sections missing from the file are kept
+        assert {(3, "test"): False} == index.get(GUILD_ID).users
+        assert [] == transfer.diff(GUILD_ID, data, bot_commands=COMMANDS)
+    finally:
+        _cleanup()
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        [],
+        {"unknown": []},
+        {"defaults": {}},
+        {"defaults": [{"command": "test"}]},
+        {"defaults": [{"command": "test", "level": "UNKNOWN"}]},
+        {"mappings": [{"role_id": 1, "level": "GUILD_OWNER"}]},
+        {"user_overwrites": [{"user_id": 1, "command": "test", "allow": "yes"}]},
+        {"user_overwrites": [{"user_id": "1", "command": "test", "allow": True}]},
+        {"user_overwrites": [{"user_id": True, "command": "test", "allow": True}]},
+        {"role_overwrites": [{"role_id": 1, "command": 1, "allow": True}]},
+        {"defaults": [{"command": "pumpkin unknown", "level": "MOD"}]},
+        {
+            "defaults": [
+                {"command": "test", "level": "MOD"},
+                {"command": "test", "level": "MOD"},
+            ]
+        },
+    ],
+)
+def test_transfer_invalid(data):
+    with pytest.raises(ValueError):
+        transfer.diff(GUILD_ID, data, bot_commands=COMMANDS)
+
+
+class _Object:
+    def __init__(self, id: int, **kwargs):
+        self.id = id
+        self.name = str(id)
+        self.__dict__.update(kwargs)
+
+
+class _Bot(_Object):
+    def __init__(self, levels: dict):
+        super().__init__(0, owner_ids={2})
+        self.levels = levels
+
+    def get_command(self, name: str):
+        if name not in self.levels:
+            return None
+
+        async def callback(ctx):
+            pass
+
+        callback.__acl_level__ = self.levels[name]
+        return _Object(0, callback=callback)
+
+
+GUILD = _Object(GUILD_ID, owner_id=1)
+BOT = _Bot({"test": ACLevel.EVERYONE, "shutdown": ACLevel.BOT_OWNER})
+
+
+def _verify(data: dict, author_id: int = 1):
+    ctx = _Object(
+        0,
+        guild=GUILD,
+        channel=_Object(10),
+        author=_Object(author_id, guild=GUILD, roles=[]),
+    )
+    changes = transfer.diff(GUILD_ID, data, bot_commands=set(BOT.levels))
+    transfer.verify(BOT, ctx, changes)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        # The guild owner can't allow themselves bot owner commands
+        {"user_overwrites": [{"user_id": 1, "command": "shutdown", "allow": True}]},
+        {"defaults": [{"command": "shutdown", "level": "EVERYONE"}]},
+    ],
+)
+def test_transfer_verify_refused(data):
+    _cleanup()
+    try:
+        with pytest.raises(ValueError):
+            _verify(data)
+        # Bot owner can do it
+        _verify(data, author_id=2)
+    finally:
+        _cleanup()
+
+
+def test_transfer_verify():
+    _cleanup()
+    try:
+        UserOverwrite.add(GUILD_ID, 3, "uninstalled", True)
+        _verify(
+            {
+                "defaults": [{"command": "test", "level": "MOD"}],
+                "mappings": [{"role_id": 20, "level": "MOD"}],
+                # Rows of missing commands can be removed
+                "user_overwrites": [],
+            }
+        )
+        # Member can't map roles to their level or above
+        with pytest.raises(ValueError):
+            _verify({"mappings": [{"role_id": 20, "level": "EVERYONE"}]}, author_id=3)
+    finally:
+        _cleanup()
+
+
+def test_transfer_roundtrip_unloaded_module():
+    _cleanup()
+    try:
+        ACDefault.add(GUILD_ID, "test", ACLevel.SUBMOD)
+        UserOverwrite.add(GUILD_ID, 3, "uninstalled", True)
+        data = transfer.export_guild(GUILD_ID)
+
+        # The module of 'uninstalled' was unloaded after the export
+        _verify(data)
+        assert [] == transfer.diff(GUILD_ID, data, bot_commands=set(BOT.levels))
+
+        # New rows still need the command to be loaded
+        UserOverwrite.remove(GUILD_ID, 3, "uninstalled")
+        with pytest.raises(ValueError, match="Unknown command"):
+            transfer.diff(GUILD_ID, data, bot_commands=set(BOT.levels))
+    finally:
+        _cleanup()
@@ -0,0 +1,68 @@
+import asyncio
+
+from pie.database import session
+from pie.database.cache import GuildSettings
+from pie.spamchannel.database import SpamChannel
+
+
+def _cleanup():
+    session.query(SpamChannel).filter_by(guild_id=-2).delete()
+    SpamChannel.invalidate(-2)
+    session.commit()
+
+
+def test_cache_hits():
+    _cleanup()
+    stats = SpamChannel.cache_stats()
+    hits, misses = stats.hits, stats.misses
+
+    assert SpamChannel.get(-2, 1) is None
+    assert SpamChannel.get_all(-2) == []
+    assert (stats.hits, stats.misses) == (hits + 1, misses + 1)
+    assert stats is GuildSettings.get_cache_stats()["SpamChannel"]
+
+
+def test_cache_invalidation():
+    _cleanup()
+    try:
+        assert SpamChannel.get_all(-2) == []
+        SpamChannel.add(-2, 1)
+        assert [1] == [c.channel_id for c in SpamChannel.get_all(-2)]
+        assert 1 == SpamChannel.get(-2, 1).channel_id
+
+        assert 1 == SpamChannel.remove(-2, 1)
+        assert SpamChannel.get(-2, 1) is None
+    finally:
+        _cleanup()
+
+
+def test_cache_uncommitted():
+    _cleanup()
+
+    async def run():
+        SpamChannel.add(-2, 1)
+        assert SpamChannel.get(-2, 1) is not None
+        # Removed, but not committed until the task finishes
+        session.query(SpamChannel).filter_by(guild_id=-2).delete()
+        SpamChannel.invalidate(-2)
+        assert SpamChannel.get(-2, 1) is None
+        assert [] == await SpamChannel.get_all_async(-2)
+
+    try:
+        asyncio.run(run())
+        assert SpamChannel.get(-2, 1) is None
+    finally:
+        _cleanup()
+
+
+def test_cache_async():
+    _cleanup()
+    SpamChannel.add(-2, 1)
+    try:
+        stats = SpamChannel.cache_stats()
+        hits = stats.hits
+        assert 1 == asyncio.run(SpamChannel.get_async(-2, 1)).channel_id
+        assert 1 == asyncio.run(SpamChannel.get_async(-2, 1)).channel_id
+        assert stats.hits == hits + 1
+    finally:
+        _cleanup()
@@ -0,0 +1,54 @@
+from pie.database import config as config_module
+from pie.database import instrumentation, session_factory
+from pie.database.config import Config
+
+
+def _queries() -> int:
+    return sum(s.count for s in instrumentation.sources.values())
+
+
+def test_config_loaded_once():
+    config = Config.get()
+    before: int = _queries()
+    assert config is Config.get()
+    assert config.language == Config.get().language
+    assert before == _queries()
+
+
+def test_config_save_notifies(monkeypatch):
+    saved = []
+    monkeypatch.setattr(config_module, "_subscribers", [])
+    Config.subscribe(saved.append)
+
+    config = Config.get()
+    original: str = config.prefix
+    try:
+        config.prefix = "?"
+        config.save()
+        assert [config] == saved
+        with session_factory() as session:
+            assert "?" == session.query(Config).one().prefix
+
+        Config.forget()
+        assert "?" == Config.get().prefix
+    finally:
+        config.prefix = original
+        config.save()
+        # Keep the object shared with the imported modules
+        config_module._instance = config
+
+
+def test_config_save_isolates_subscribers(monkeypatch, capsys):
+    saved = []
+
+    def broken(config):
+        raise RuntimeError("broken subscriber")
+
+    monkeypatch.setattr(config_module, "_subscribers", [])
+    Config.subscribe(broken)
+    Config.subscribe(saved.append)
+
+    config = Config.get()
+    config.save()
+    assert [config] == saved
+    assert "broken subscriber" in capsys.readouterr().err
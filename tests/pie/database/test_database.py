@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+
+from pie.database import (
+    Database,
+    _get_async_url,
+    _get_pool_options,
+    database,
+    finish_session,
+    get_read_session,
+    get_session,
+    session,
+)
+from pie.spamchannel.database import SpamChannel
+
+
+def test_async_url():
+    assert "postgresql+asyncpg://u:p@h/db" == str(
+        _get_async_url(make_url("postgresql://u:p@h/db"))
+    )
+    assert "postgresql+asyncpg://u:p@h/db" == str(
+        _get_async_url(make_url("postgresql+psycopg2://u:p@h/db"))
+    )
+    assert "sqlite+aiosqlite:///test.db" == str(
+        _get_async_url(make_url("sqlite:///test.db"))
+    )
+    assert "sqlite+aiosqlite:///test.db" == str(
+        _get_async_url(make_url("sqlite+aiosqlite:///test.db"))
+    )
+
+
+def test_async_url_unsupported():
+    with pytest.raises(ValueError):
+        _get_async_url(make_url("mssql://u:p@h/db"))
+
+
+def test_async_fetch():
+    SpamChannel.add(-1, -1)
+    try:
+        found = asyncio.run(
+            database.fetch_one(select(SpamChannel).filter_by(guild_id=-1))
+        )
+        assert found.channel_id == -1
+        assert [-1] == [
+            c.channel_id for c in asyncio.run(SpamChannel.get_all_async(-1))
+        ]
+    finally:
+        SpamChannel.remove(-1, -1)
+    assert asyncio.run(SpamChannel.get_all_async(-1)) == []
+
+
+def test_task_session():
+    async def get_task_session():
+        assert get_session() is get_session()
+        return get_session()
+
+    async def main():
+        first = await asyncio.create_task(get_task_session())
+        second = await asyncio.create_task(get_task_session())
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first is not second
+    assert first is not get_session()
+    assert get_session() is get_session()
+
+
+def test_task_session_commit():
+    async def add():
+        session.add(SpamChannel(guild_id=-2, channel_id=-2))
+
+    asyncio.run(add())
+    try:
+        assert SpamChannel.get(-2, -2) is not None
+    finally:
+        SpamChannel.remove(-2, -2)
+
+
+def test_finish_session():
+    async def unit():
+        first = get_session()
+        first.add(SpamChannel(guild_id=-3, channel_id=-3))
+        finish_session()
+        # The work was committed, the next access opens a new session
+        assert SpamChannel.get(-3, -3) is not None
+        second = get_session()
+        assert first is not second
+
+        second.add(SpamChannel(guild_id=-3, channel_id=-4))
+        finish_session(failed=True)
+        assert SpamChannel.get(-3, -4) is None
+
+    asyncio.run(unit())
+    try:
+        assert SpamChannel.get(-3, -3) is not None
+    finally:
+        SpamChannel.remove(-3, -3)
+
+
+def test_pool_options(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "5")
+    monkeypatch.setenv("DB_POOL_RECYCLE", "300")
+    assert {"pool_size": 20, "max_overflow": 5, "pool_recycle": 300} == (
+        _get_pool_options(make_url("postgresql://u:p@h/db"))
+    )
+    # SQLite has no pool size
+    assert {"pool_recycle": 300} == _get_pool_options(make_url("sqlite://"))
+
+    monkeypatch.delenv("DB_POOL_SIZE")
+    monkeypatch.delenv("DB_MAX_OVERFLOW")
+    monkeypatch.delenv("DB_POOL_RECYCLE")
+    assert {} == _get_pool_options(make_url("postgresql://u:p@h/db"))
+
+
+def test_read_session_without_replica():
+    assert database.read_db is database.db
+    assert not database.use_replica()
+    assert get_read_session() is get_session()
+
+
+def test_replica_routing(monkeypatch):
+    monkeypatch.setenv("DB_STRING_READ", "sqlite://")
+    monkeypatch.setenv("DB_READ_LAG", "60000")
+    replicated = Database()
+    assert replicated.read_db is not replicated.db
+    assert replicated.use_replica()
+
+    async def write():
+        replicated.mark_written()
+        # The task reads its own writes
+        assert not replicated.use_replica()
+
+    async def read() -> bool:
+        return replicated.use_replica()
+
+    async def run():
+        await asyncio.create_task(write())
+        # Other tasks wait for the replica to catch up
+        assert not await asyncio.create_task(read())
+        replicated.read_lag = 0
+        assert await asyncio.create_task(read())
+
+    asyncio.run(run())
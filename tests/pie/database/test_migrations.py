@@ -0,0 +1,180 @@
+from typing import List
+
+import pytest
+from sqlalchemy import Column, Index, Integer, MetaData, Table, inspect, select
+from sqlalchemy.dialects import postgresql
+
+from pie.database import database, migrations
+from pie.database.migrations import SchemaFingerprint, SchemaVersion
+
+
+class _Table(database.base):
+    __tablename__ = "tests_database_migrations"
+
+    idx = Column(Integer, primary_key=True)
+    value = Column(Integer)
+
+    __table_args__ = (Index("ix_tests_database_migrations_value", value),)
+
+
+def _get_version(scope: str):
+    with database.db.connect() as connection:
+        table = SchemaVersion.__table__
+        row = connection.execute(
+            table.select().where(table.c.scope == scope)
+        ).one_or_none()
+    return getattr(row, "version", None)
+
+
+def _reset(scope: str):
+    with database.db.begin() as connection:
+        table = SchemaVersion.__table__
+        connection.execute(table.delete().where(table.c.scope == scope))
+
+
+def test_migrations_run_once():
+    scope = "tests.run_once"
+    _reset(scope)
+    calls: List[int] = []
+
+    @migrations.register(scope, 1)
+    def first(connection):
+        calls.append(1)
+
+    @migrations.register(scope, 2)
+    def second(connection):
+        calls.append(2)
+
+    migrations.run()
+    assert calls == [1, 2]
+    assert _get_version(scope) == 2
+
+    migrations.run()
+    assert calls == [1, 2]
+
+
+def test_migrations_duplicate():
+    @migrations.register("tests.duplicate", 1)
+    def first(connection):
+        pass
+
+    with pytest.raises(ValueError):
+
+        @migrations.register("tests.duplicate", 1)
+        def second(connection):
+            pass
+
+
+def test_migrations_create_indexes():
+    scope = "tests.indexes"
+    _reset(scope)
+    _Table.__table__.drop(database.db, checkfirst=True)
+    # Create the table without the index, like in older deployments
+    with database.db.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE tests_database_migrations (idx INTEGER PRIMARY KEY, value INTEGER)"
+        )
+
+    migrations.create_indexes(scope, 1, _Table)
+    migrations.run()
+
+    try:
+        indexes = inspect(database.db).get_indexes("tests_database_migrations")
+        assert ["ix_tests_database_migrations_value"] == [i["name"] for i in indexes]
+        assert _get_version(scope) == 1
+    finally:
+        _Table.__table__.drop(database.db)
+
+
+class _Connection:
+    """Connection to PostgreSQL recording the statements."""
+
+    def __init__(self, valid):
+        self.dialect = postgresql.dialect()
+        self.valid = valid
+        self.statements: List[str] = []
+
+    def execute(self, statement, parameters=None):
+        self.statements.append(str(statement))
+        return self
+
+    def scalar(self):
+        return self.valid
+
+
+def test_migrations_invalid_index():
+    index = next(iter(_Table.__table__.indexes))
+
+    connection = _Connection(valid=False)
+    migrations._create_index(connection, index)
+    assert connection.statements[1].startswith("DROP INDEX CONCURRENTLY IF EXISTS")
+    assert connection.statements[2].startswith("CREATE INDEX CONCURRENTLY")
+
+    for valid in (True, None):
+        connection = _Connection(valid=valid)
+        migrations._create_index(connection, index)
+        assert not any(s.startswith("DROP") for s in connection.statements)
+
+
+def test_migrations_fingerprint():
+    metadata = MetaData()
+    table = Table(
+        "tests_fingerprint", metadata, Column("idx", Integer, primary_key=True)
+    )
+    fingerprint = migrations.get_fingerprint(metadata, database.db)
+    assert fingerprint == migrations.get_fingerprint(metadata, database.db)
+
+    Index("ix_tests_fingerprint_idx", table.c.idx)
+    assert fingerprint != migrations.get_fingerprint(metadata, database.db)
+
+
+def _forget_fingerprints():
+    with database.db.begin() as connection:
+        connection.execute(SchemaFingerprint.__table__.delete())
+
+
+def test_migrations_create_all_skipped():
+    _forget_fingerprints()
+    migrations.create_all()
+    _Table.__table__.drop(database.db)
+    try:
+        # The schema has not changed, the tables are not inspected
+        migrations.create_all()
+        assert not inspect(database.db).has_table("tests_database_migrations")
+
+        _forget_fingerprints()
+        migrations.create_all()
+        assert inspect(database.db).has_table("tests_database_migrations")
+    finally:
+        _Table.__table__.drop(database.db, checkfirst=True)
+
+
+def test_migrations_create_all_replaces_fingerprint():
+    table = SchemaFingerprint.__table__
+    _forget_fingerprints()
+    with database.db.begin() as connection:
+        connection.execute(table.insert().values(fingerprint="old"))
+    migrations.create_all()
+
+    fingerprint = migrations.get_fingerprint(database.base.metadata, database.db)
+    with database.db.connect() as connection:
+        stored = connection.execute(select(table.c.fingerprint)).scalars().all()
+    assert [fingerprint] == stored
+
+
+def test_migrations_create_all_race(monkeypatch):
+    _forget_fingerprints()
+    create_all = database.base.metadata.create_all
+
+    def _create_all(*args, **kwargs):
+        create_all(*args, **kwargs)
+        # Another instance stores the fingerprint in the meantime
+        fingerprint = migrations.get_fingerprint(database.base.metadata, database.db)
+        with database.db.begin() as connection:
+            connection.execute(
+                SchemaFingerprint.__table__.insert().values(fingerprint=fingerprint)
+            )
+
+    monkeypatch.setattr(database.base.metadata, "create_all", _create_all)
+    # Losing the race is harmless
+    migrations.create_all()
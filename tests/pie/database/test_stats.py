@@ -0,0 +1,84 @@
+import asyncio
+
+from pie.database import database, session, session_factory
+from pie.database.stats import Instrumentation
+from pie.spamchannel.database import SpamChannel
+
+
+def test_stats_attribution():
+    instrumentation = Instrumentation(slow_threshold=0)
+    engine = database.db.execution_options()
+    instrumentation.attach(engine)
+
+    async def listener():
+        with session_factory(bind=engine) as session:
+            session.query(SpamChannel).filter_by(guild_id=-1).all()
+            session.query(SpamChannel).filter_by(guild_id=-1).all()
+
+    async def command():
+        instrumentation.attribute("command spamchannel list")
+        with session_factory(bind=engine) as session:
+            session.query(SpamChannel).filter_by(guild_id=-1).all()
+
+    async def run():
+        await asyncio.create_task(listener(), name="discord.py: on_message")
+        await asyncio.create_task(command())
+        await asyncio.create_task(command())
+
+    asyncio.run(run())
+
+    event = instrumentation.sources["event on_message"]
+    invoked = instrumentation.sources["command spamchannel list"]
+    assert (1, 2) == (event.invocations, event.count)
+    assert (2, 2) == (invoked.invocations, invoked.count)
+    assert "spamchannels" in invoked.statement
+
+    statements = instrumentation.top_statements(1)
+    assert 1 == len(statements)
+    assert 4 == statements[0].count
+    assert statements[0].total <= event.total + invoked.total
+
+    instrumentation.reset()
+    assert not instrumentation.sources
+
+
+def test_stats_restore():
+    instrumentation = Instrumentation(slow_threshold=0)
+    outer = instrumentation.attribute("outer")
+    inner = instrumentation.attribute("inner")
+    assert "inner" == instrumentation._source.get().name
+    instrumentation.restore(inner)
+    assert "outer" == instrumentation._source.get().name
+    instrumentation.restore(outer)
+    assert instrumentation._source.get() is None
+
+
+def test_stats_global_instance():
+    from pie.database import instrumentation
+
+    before: int = sum(s.count for s in instrumentation.sources.values())
+    session.query(SpamChannel).filter_by(guild_id=-1).all()
+    assert before + 1 == sum(s.count for s in instrumentation.sources.values())
+
+
+def test_stats_slow_query_report(monkeypatch):
+    instrumentation = Instrumentation(slow_threshold=1)
+    reported = []
+
+    async def _log_slow_query(source, statement, duration):
+        await asyncio.sleep(0)
+        reported.append(source)
+        raise ValueError("broken logger")
+
+    monkeypatch.setattr(instrumentation, "_log_slow_query", _log_slow_query)
+
+    async def run():
+        instrumentation._report("command test", "SELECT 1", 2)
+        # The task is referenced until it is done
+        assert 1 == len(instrumentation._reports)
+        await asyncio.gather(*instrumentation._reports, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert ["command test"] == reported
+    assert not instrumentation._reports
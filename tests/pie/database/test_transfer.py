@@ -0,0 +1,148 @@
+import io
+import json
+
+import pytest
+import sqlalchemy
+
+from pie.acl.database import ACDefault, ACLevel
+from pie.database import session, transfer
+from pie.spamchannel.database import SpamChannel
+from pie.storage.database import StorageData
+
+
+def _cleanup(*guild_ids: int):
+    for guild_id in guild_ids:
+        for model in (ACDefault, SpamChannel, StorageData):
+            session.query(model).filter_by(guild_id=guild_id).delete()
+        ACDefault.invalidate(guild_id)
+        SpamChannel.invalidate(guild_id)
+    session.commit()
+
+
+def test_transfer_round_trip():
+    _cleanup(-3, -4)
+    ACDefault.add(-3, "spamchannel add", ACLevel.MOD)
+    SpamChannel.add(-3, 1)
+    StorageData.set("tests", -3, "key", "value")
+
+    try:
+        handle = io.StringIO()
+        counts = transfer.export_guild(-3, handle, batch_size=1)
+        assert 1 == counts["pie_acl_acdefault"]
+        assert 1 == counts["spamchannels"]
+
+        lines = [json.loads(line) for line in handle.getvalue().splitlines()]
+        assert {"guild_id": -3, "command": "spamchannel add", "level": "MOD"} in [
+            line["row"] for line in lines
+        ]
+        # Generated primary keys are not exported
+        assert all("idx" not in line["row"] for line in lines)
+
+        SpamChannel.remove(-3, 1)
+        SpamChannel.add(-3, 2)
+        session.commit()
+        # Load the cache, the import has to drop it
+        assert [2] == [c.channel_id for c in SpamChannel.get_all(-3)]
+
+        # The import replaces the existing rows
+        handle.seek(0)
+        counts = transfer.import_guild(-3, handle, batch_size=2)
+        assert len(lines) == sum(counts.values())
+        assert [1] == [c.channel_id for c in SpamChannel.get_all(-3)]
+        assert ACLevel.MOD == ACDefault.get(-3, "spamchannel add").level
+
+        # The rows can be moved to another guild
+        handle.seek(0)
+        handle = io.StringIO(
+            "".join(line for line in handle if "spamchannels" not in line)
+        )
+        transfer.import_guild(-4, handle)
+        assert ACLevel.MOD == ACDefault.get(-4, "spamchannel add").level
+        assert "value" == StorageData.get("tests", -4, "key").value
+    finally:
+        _cleanup(-3, -4)
+
+
+def test_transfer_unknown_table():
+    _cleanup(-4)
+    handle = io.StringIO(
+        json.dumps({"table": "tests_uninstalled", "row": {"guild_id": -3}}) + "\n"
+    )
+    assert {} == transfer.import_guild(-4, handle)
+
+
+def test_transfer_invalid_file():
+    _cleanup(-4)
+    SpamChannel.add(-4, 1)
+    handle = io.StringIO(
+        json.dumps({"table": "spamchannels", "row": {"guild_id": -3, "channel_id": 2}})
+        + "\n"
+        + "not json\n"
+    )
+    try:
+        with pytest.raises(ValueError, match="Line 2"):
+            transfer.import_guild(-4, handle)
+        # Nothing was deleted
+        assert [1] == [c.channel_id for c in SpamChannel.get_all(-4)]
+    finally:
+        _cleanup(-4)
+
+
+def test_transfer_failed_insert_rolls_back():
+    _cleanup(-4)
+    SpamChannel.add(-4, 1)
+    line = (
+        json.dumps({"table": "spamchannels", "row": {"guild_id": -3, "channel_id": 2}})
+        + "\n"
+    )
+    try:
+        # The duplicate channel violates the unique constraint
+        with pytest.raises(sqlalchemy.exc.IntegrityError):
+            transfer.import_guild(-4, io.StringIO(line * 2), batch_size=1)
+        assert [1] == [c.channel_id for c in SpamChannel.get_all(-4)]
+    finally:
+        _cleanup(-4)
+
+
+@pytest.mark.parametrize(
+    "row,error",
+    [
+        ({"guild_id": -3, "channel_id": 2, "unknown": 1}, "unknown columns: unknown"),
+        ({"channel_id": 2}, "invalid guild_id"),
+        ({"guild_id": "-3", "channel_id": 2}, "invalid guild_id"),
+    ],
+)
+def test_transfer_invalid_row(row, error):
+    _cleanup(-4)
+    SpamChannel.add(-4, 1)
+    handle = io.StringIO(json.dumps({"table": "spamchannels", "row": row}) + "\n")
+    try:
+        with pytest.raises(ValueError, match=error):
+            transfer.import_guild(-4, handle)
+        assert [1] == [c.channel_id for c in SpamChannel.get_all(-4)]
+    finally:
+        _cleanup(-4)
+
+
+def test_transfer_batches(monkeypatch):
+    _cleanup(-4)
+    inserted = []
+    insert = transfer._insert
+
+    def _insert(connection, batch):
+        inserted.append(sum(len(rows) for rows in batch.values()))
+        insert(connection, batch)
+
+    monkeypatch.setattr(transfer, "_insert", _insert)
+    lines = [
+        json.dumps({"table": "spamchannels", "row": {"guild_id": -3, "channel_id": i}})
+        for i in range(5)
+    ]
+    try:
+        counts = transfer.import_guild(-4, io.StringIO("\n".join(lines)), batch_size=2)
+        assert {"spamchannels": 5} == counts
+        # Only one batch is kept in memory
+        assert [2, 2, 1] == inserted
+        assert 5 == len(SpamChannel.get_all(-4))
+    finally:
+        _cleanup(-4)
@@ -0,0 +1,174 @@
+import asyncio
+
+from pie.database import session, session_factory
+from pie.database.write_behind import MISSING, WriteBehind
+from pie.i18n.database import MemberLanguage
+from pie.storage.database import StorageData
+
+
+def _set(queue: WriteBehind, key: str, value: str):
+    data = StorageData(module="tests", guild_id=-1, key=key, value=value, type="str")
+    queue.write(
+        (StorageData.__tablename__, "tests", -1, key),
+        lambda session: session.merge(data),
+        data,
+    )
+
+
+def _stored(key: str):
+    with session_factory() as session:
+        return (
+            session.query(StorageData)
+            .filter_by(module="tests", guild_id=-1, key=key)
+            .one_or_none()
+        )
+
+
+def _cleanup():
+    with session_factory() as session:
+        session.query(StorageData).filter_by(module="tests").delete()
+        session.commit()
+
+
+def test_write_behind_disabled():
+    queue = WriteBehind(session, session_factory, window=0, batch_size=100)
+    try:
+        _set(queue, "disabled", "a")
+        assert MISSING is queue.lookup((StorageData.__tablename__, "tests", -1, "a"))
+        assert "a" == _stored("disabled").value
+    finally:
+        _cleanup()
+
+
+def test_write_behind_window():
+    queue = WriteBehind(session, session_factory, window=0.05, batch_size=100)
+
+    async def run():
+        _set(queue, "window", "a")
+        _set(queue, "window", "b")
+        _set(queue, "other", "c")
+        # Read your own writes
+        pending = queue.lookup((StorageData.__tablename__, "tests", -1, "window"))
+        assert "b" == pending.value
+        assert _stored("window") is None
+
+        await asyncio.sleep(0.1)
+        assert "b" == _stored("window").value
+        assert "c" == _stored("other").value
+
+    try:
+        asyncio.run(run())
+        assert 3 == queue.queued
+        assert 1 == queue.commits
+    finally:
+        _cleanup()
+
+
+def test_write_behind_batch():
+    queue = WriteBehind(session, session_factory, window=60, batch_size=2)
+
+    async def run():
+        _set(queue, "first", "a")
+        assert _stored("first") is None
+        _set(queue, "second", "b")
+        assert "a" == _stored("first").value
+
+    try:
+        asyncio.run(run())
+        assert 1 == queue.commits
+    finally:
+        _cleanup()
+
+
+def test_write_behind_sync():
+    queue = WriteBehind(session, session_factory, window=60, batch_size=100)
+
+    async def run():
+        _set(queue, "sync", "a")
+        queue.sync("unrelated_table")
+        assert _stored("sync") is None
+        queue.sync(StorageData.__tablename__)
+        assert "a" == _stored("sync").value
+        assert 0 == queue.flush()
+
+    try:
+        asyncio.run(run())
+    finally:
+        _cleanup()
+
+
+def _member_write(language: str):
+    preference = MemberLanguage(guild_id=-9, member_id=1, language=language)
+
+    def write(session):
+        row = session.query(MemberLanguage).filter_by(guild_id=-9).one_or_none()
+        if row is None:
+            session.add(preference)
+            return preference
+        row.language = language
+        return row
+
+    return write, preference
+
+
+def _cleanup_members():
+    with session_factory() as session:
+        session.query(MemberLanguage).filter_by(guild_id=-9).delete()
+        session.commit()
+
+
+def test_write_behind_returns_written_row():
+    queue = WriteBehind(session, session_factory, window=0, batch_size=100)
+    try:
+        first = queue.write(("tests", -9), *_member_write("cs"))
+        write, preference = _member_write("sk")
+        written = queue.write(("tests", -9), write, preference)
+        assert written is not preference
+        assert written.idx == first.idx is not None
+        assert "sk" == written.language
+    finally:
+        _cleanup_members()
+
+
+def test_write_behind_fills_identity():
+    queue = WriteBehind(session, session_factory, window=60, batch_size=100)
+
+    async def run():
+        queue.write(("tests", -9), *_member_write("cs"))
+        queue.flush()
+        write, preference = _member_write("sk")
+        pending = queue.write(("tests", -9), write, preference)
+        assert pending is preference and preference.idx is None
+        queue.flush()
+        with session_factory() as session:
+            row = session.query(MemberLanguage).filter_by(guild_id=-9).one()
+            assert preference.idx == row.idx
+            assert "sk" == row.language
+
+    try:
+        asyncio.run(run())
+    finally:
+        _cleanup_members()
+
+
+def test_write_behind_reports_failure():
+    queue = WriteBehind(session, session_factory, window=60, batch_size=100)
+    failures = []
+    queue.on_failure = lambda key, exc: failures.append((key, exc))
+
+    def broken(session):
+        raise ValueError("broken")
+
+    async def run():
+        _set(queue, "kept", "a")
+        queue.write(("tests", "broken"), broken, None)
+        assert 1 == queue.flush()
+
+    try:
+        asyncio.run(run())
+        assert "a" == _stored("kept").value
+        assert 1 == queue.failed
+        assert [("tests", "broken")] == [key for key, _ in failures]
+        assert isinstance(failures[0][1], ValueError)
+    finally:
+        _cleanup()
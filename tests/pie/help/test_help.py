@@ -0,0 +1,81 @@
+import asyncio
+
+from discord.ext import commands
+
+from pie import acl
+from pie.acl import index
+from pie.acl.database import ACLevel
+from pie.help import Help
+
+
+class _Object:
+    def __init__(self, id: int, **kwargs):
+        self.id = id
+        self.name = str(id)
+        self.__dict__.update(kwargs)
+
+
+GUILD = _Object(-10, owner_id=1)
+CHANNEL = _Object(10)
+
+
+class _Bot(_Object):
+    def __init__(self, *cmds: commands.Command):
+        super().__init__(0, owner_ids=set())
+        self.commands = {c.qualified_name: c for c in cmds}
+
+    def get_command(self, name: str):
+        return self.commands.get(name)
+
+    async def can_run(self, ctx) -> bool:
+        return True
+
+
+def _command(name: str, level: ACLevel, *checks) -> commands.Command:
+    async def callback(ctx):
+        pass
+
+    command = commands.Command(acl.acl2(level)(callback), name=name)
+    command.checks.extend(checks)
+    return command
+
+
+def _context(bot: _Bot, guild=GUILD) -> commands.Context:
+    ctx = commands.Context.__new__(commands.Context)
+    ctx.bot = bot
+    ctx.command = None
+    ctx.message = _Object(
+        0,
+        author=_Object(3, guild=GUILD, roles=[]),
+        guild=guild,
+        channel=CHANNEL,
+    )
+    return ctx
+
+
+def _filter(bot: _Bot, *, guild=GUILD, verify_checks=True) -> list:
+    help = Help(verify_checks=verify_checks)
+    help.context = _context(bot, guild)
+    filtered = asyncio.run(help.filter_commands(bot.commands.values(), sort=True))
+    return [c.name for c in filtered]
+
+
+def test_help_filter_commands():
+    disabled = _command("disabled", ACLevel.EVERYONE)
+    disabled.enabled = False
+    bot = _Bot(
+        _command("allowed", ACLevel.EVERYONE),
+        _command("refused", ACLevel.MOD),
+        _command("checked", ACLevel.EVERYONE, lambda ctx: False),
+        disabled,
+    )
+    try:
+        # Other checks still apply to the commands allowed by the ACL
+        assert ["allowed"] == _filter(bot)
+        assert ["allowed", "checked", "disabled", "refused"] == _filter(
+            bot, verify_checks=False
+        )
+        # The checks are not verified in DMs by default
+        assert 4 == len(_filter(bot, guild=None, verify_checks=None))
+    finally:
+        index.invalidate(GUILD.id)
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from pie import i18n
+from pie.i18n import catalogs
+
+
+def _write(directory, content: str):
+    (directory / "po").mkdir(exist_ok=True)
+    pofile = directory / "po" / "cs.popie"
+    pofile.write_text(content)
+    return pofile
+
+
+def test_catalogs_shared(tmp_path):
+    _write(tmp_path, "msgid Hello\nmsgstr Ahoj\n\nmsgid Empty\nmsgstr\n")
+
+    first = i18n.Translator(str(tmp_path))
+    second = i18n.Translator(str(tmp_path / "po" / ".."))
+    assert first.strings is second.strings
+    assert {"cs": {"Hello": "Ahoj"}} == {k: dict(v) for k, v in first.strings.items()}
+
+    with pytest.raises(TypeError):
+        first.strings["cs"]["Hello"] = "Nazdar"
+
+
+def test_catalogs_reloaded(tmp_path):
+    pofile = _write(tmp_path, "msgid Hello\nmsgstr Ahoj\n")
+    assert "Ahoj" == i18n.Translator(str(tmp_path)).strings["cs"]["Hello"]
+
+    # The module was updated and reloaded
+    _write(tmp_path, "msgid Hello\nmsgstr Nazdar\n")
+    os.utime(pofile, ns=(1, 1))
+    assert "Nazdar" == i18n.Translator(str(tmp_path)).strings["cs"]["Hello"]
+
+    # The directory is parsed again after forget(), even if nothing changed
+    translator = i18n.Translator(str(tmp_path))
+    assert translator.strings is i18n.Translator(str(tmp_path)).strings
+    catalogs.forget(str(tmp_path))
+    assert translator.strings is not i18n.Translator(str(tmp_path)).strings
+
+
+def test_catalogs_disk_cache(tmp_path, monkeypatch):
+    pofile = _write(tmp_path, "msgid Hello\nmsgstr Ahoj\n")
+    assert {"Hello": "Ahoj"} == catalogs.load_po_file(pofile)
+    assert (tmp_path / "po" / "__pycache__" / "cs.popie.json").exists()
+
+    parsed = []
+    parse = catalogs.parse_po_file
+    monkeypatch.setattr(
+        catalogs, "parse_po_file", lambda content: parsed.append(1) or parse(content)
+    )
+
+    # Same modification time
+    assert {"Hello": "Ahoj"} == catalogs.load_po_file(pofile)
+    # Same content
+    os.utime(pofile, (1, 1))
+    assert {"Hello": "Ahoj"} == catalogs.load_po_file(pofile)
+    assert [] == parsed
+
+    _write(tmp_path, "msgid Hello\nmsgstr Nazdar\n")
+    os.utime(pofile, (2, 2))
+    assert {"Hello": "Nazdar"} == catalogs.load_po_file(pofile)
+    assert [1] == parsed
+
+    # Same modification time, different size
+    _write(tmp_path, "msgid Hello\nmsgstr Cau\n")
+    os.utime(pofile, (2, 2))
+    assert {"Hello": "Cau"} == catalogs.load_po_file(pofile)
+    assert [1, 1] == parsed
@@ -0,0 +1,86 @@
+from pie import i18n
+from pie.database import session
+from pie.database.config import Config
+from pie.i18n import database
+from pie.i18n.database import GuildLanguage, MemberLanguage
+
+GUILD_ID: int = -7
+
+
+def _cleanup():
+    MemberLanguage.remove(GUILD_ID, 1)
+    session.query(GuildLanguage).filter_by(guild_id=GUILD_ID).delete()
+    session.commit()
+    GuildLanguage.forget(GUILD_ID)
+
+
+def test_language_preferring_guilds():
+    _cleanup()
+    try:
+        assert not database.has_preferences(GUILD_ID)
+        GuildLanguage.add(GUILD_ID, "cs")
+        assert database.has_preferences(GUILD_ID)
+
+        GuildLanguage.forget(GUILD_ID)
+        assert database.has_preferences(GUILD_ID)
+    finally:
+        _cleanup()
+    assert not database.has_preferences(GUILD_ID)
+
+
+def test_language_resolved_once(monkeypatch):
+    _cleanup()
+    translator = i18n.Translator("modules/base")
+    resolved = []
+
+    def resolve(guild_id, user_id):
+        resolved.append((guild_id, user_id))
+        return "cs"
+
+    monkeypatch.setattr(translator, "_resolve_language", resolve)
+
+    tc = i18n.TranslationContext(GUILD_ID, 1)
+    assert "Role" == translator.translate(tc, "Role")
+    assert "Úroveň" == translator.translate(tc, "Level")
+    assert [(GUILD_ID, 1)] == resolved
+    assert "cs" == tc.language
+
+
+def test_language_fast_path():
+    _cleanup()
+    translator = i18n.Translator("modules/base")
+    tc = i18n.TranslationContext(GUILD_ID, 1)
+    assert Config.get().language == translator.get_language_preference(tc)
+
+
+def test_language_changes_apply_instantly():
+    _cleanup()
+    translator = i18n.Translator("modules/base")
+    try:
+        GuildLanguage.add(GUILD_ID, "sk")
+        tc = i18n.TranslationContext(GUILD_ID, 1)
+        assert "sk" == translator.get_language_preference(tc)
+
+        MemberLanguage.add(GUILD_ID, 1, "cs")
+        tc = i18n.TranslationContext(GUILD_ID, 1)
+        assert "cs" == translator.get_language_preference(tc)
+
+        MemberLanguage.remove(GUILD_ID, 1)
+        GuildLanguage.remove(GUILD_ID)
+        tc = i18n.TranslationContext(GUILD_ID, 1)
+        assert Config.get().language == translator.get_language_preference(tc)
+        assert not database.has_preferences(GUILD_ID)
+    finally:
+        _cleanup()
+
+
+def test_language_store_reload():
+    _cleanup()
+    try:
+        MemberLanguage.add(GUILD_ID, 1, "cs")
+        database.store.forget()
+        assert "cs" == database.store.get_member(GUILD_ID, 1)
+        assert database.store.get_guild(GUILD_ID) is None
+        assert database.has_preferences(GUILD_ID)
+    finally:
+        _cleanup()
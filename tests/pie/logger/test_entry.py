@@ -0,0 +1,60 @@
+import asyncio
+
+from pie import logger
+from pie.logger import LogEntry, LogLevel, LogScope, MAIN_DIRECTORY
+
+
+def _capture(monkeypatch) -> list:
+    entries = []
+    monkeypatch.setattr(
+        logger.pipeline, "submit", lambda entry, send: entries.append(entry)
+    )
+    return entries
+
+
+def test_entry_caller(monkeypatch):
+    entries = _capture(monkeypatch)
+    bot_log = logger.Bot.logger(object())
+
+    async def log_something():
+        await bot_log.info(None, None, "Hello.")
+
+    asyncio.run(log_something())
+
+    entry = entries[0]
+    assert "log_something" == entry.function
+    assert entry.caller[0].endswith("test_entry.py")
+    assert entry.stack is None
+    assert "stack" not in entry.dump()
+
+
+def test_entry_stack(monkeypatch):
+    entries = _capture(monkeypatch)
+    bot_log = logger.Bot.logger(object())
+
+    async def log_errors():
+        await bot_log.error(None, None, "Error.")
+        await bot_log.debug(None, None, "Requested.", stack=True)
+
+    asyncio.run(log_errors())
+
+    for entry in entries:
+        assert "log_errors" == entry.stack[-1].name
+        assert entry.lineno == entry.stack[-1].lineno
+        assert entry.dump()["stack"]
+
+
+def test_entry_module():
+    filename: str = f"{MAIN_DIRECTORY}/modules/base/admin/module.py"
+    entry = LogEntry(
+        (filename, 1, "function"), LogScope.BOT, LogLevel.INFO, None, None, "Text."
+    )
+    assert "base.admin" == entry.module
+    assert "/modules/base/admin/module.py" == entry.filename
+    assert not hasattr(entry, "__dict__")
+
+    entry = LogEntry(
+        (MAIN_DIRECTORY, 1, "function"), LogScope.BOT, LogLevel.INFO, None, None, ""
+    )
+    assert entry.module is None
+    assert "__main__" == entry.filename
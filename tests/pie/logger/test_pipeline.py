@@ -0,0 +1,140 @@
+import asyncio
+import datetime
+import json
+import threading
+
+from pie.logger.pipeline import LogFile, LogPipeline
+
+
+class _Entry:
+    def __init__(self, message: str, timestamp: datetime.datetime = None):
+        self.message = message
+        self.timestamp = timestamp or datetime.datetime(2022, 1, 1, 12)
+
+    def format_to_console(self) -> str:
+        return f"console {self.message}"
+
+    def format_to_file(self) -> str:
+        return json.dumps({"message": self.message})
+
+
+def _read(path) -> list:
+    return [json.loads(line)["message"] for line in path.read_text().splitlines()]
+
+
+def test_pipeline_batches(tmp_path, capsys):
+    pipeline = LogPipeline(maxsize=100, batch_size=10, directory=str(tmp_path))
+    sent = []
+
+    async def send(entry):
+        sent.append(entry.message)
+
+    async def run():
+        for i in range(25):
+            pipeline.submit(_Entry(str(i)), send)
+        # Nothing was written yet, the caller did not wait
+        assert 25 == pipeline.depth
+        await pipeline.flush()
+
+    asyncio.run(run())
+    pipeline.close()
+
+    expected = [str(i) for i in range(25)]
+    assert expected == _read(tmp_path / "log_2022-01-01.log")
+    assert expected == sent
+    assert "console 24" in capsys.readouterr().out
+    assert 25 == pipeline.stats.written
+    assert 3 == pipeline.stats.batches
+    assert 25 == pipeline.stats.high_water
+
+
+def test_pipeline_backpressure(tmp_path, capsys):
+    pipeline = LogPipeline(maxsize=5, directory=str(tmp_path))
+
+    async def run():
+        for i in range(8):
+            pipeline.submit(_Entry(str(i)))
+        await pipeline.flush()
+
+    asyncio.run(run())
+    pipeline.close()
+
+    assert 3 == pipeline.stats.dropped
+    assert 5 == pipeline.stats.high_water
+    assert ["3", "4", "5", "6", "7"] == _read(tmp_path / "log_2022-01-01.log")
+    # The report is written at the time of the drop
+    today: str = datetime.date.today().strftime("%Y-%m-%d")
+    assert "3 entries were dropped" in _read(tmp_path / f"log_{today}.log")[0]
+    assert "3 entries were dropped" in capsys.readouterr().out
+
+
+def test_pipeline_sender_failure(tmp_path):
+    pipeline = LogPipeline(maxsize=10, directory=str(tmp_path))
+
+    async def send(entry):
+        raise RuntimeError("Discord is down")
+
+    async def run():
+        pipeline.submit(_Entry("a"), send)
+        pipeline.submit(_Entry("b"), send)
+        await pipeline.flush()
+
+    asyncio.run(run())
+    pipeline.close()
+
+    assert ["a", "b"] == _read(tmp_path / "log_2022-01-01.log")
+    assert 0 == pipeline.stats.sent
+
+
+def test_pipeline_close_writes_pending(tmp_path):
+    pipeline = LogPipeline(maxsize=10, directory=str(tmp_path))
+
+    async def run():
+        pipeline.submit(_Entry("pending"))
+
+    asyncio.run(run())
+    pipeline.close()
+
+    assert ["pending"] == _read(tmp_path / "log_2022-01-01.log")
+
+
+def test_log_file_rotation(tmp_path):
+    log_file = LogFile(str(tmp_path))
+    first = datetime.date(2022, 1, 1)
+    second = datetime.date(2022, 1, 2)
+    log_file.write([(first, '{"message": "a"}'), (second, '{"message": "b"}')])
+    log_file.write([(second, '{"message": "c"}')])
+    log_file.close()
+
+    assert ["a"] == _read(tmp_path / "log_2022-01-01.log")
+    assert ["b", "c"] == _read(tmp_path / "log_2022-01-02.log")
+
+
+def test_pipeline_outbox_limit(tmp_path):
+    pipeline = LogPipeline(maxsize=3, directory=str(tmp_path))
+
+    async def send(entry):
+        pass
+
+    for i in range(5):
+        pipeline._send_later(_Entry(str(i)), send)
+
+    assert ["2", "3", "4"] == [entry.message for entry, _ in pipeline._outbox]
+    assert 2 == pipeline.stats.unsent
+    assert ["Discord outbox was full, 2 entries were not sent."] == (
+        pipeline._take_reports()
+    )
+    assert [] == pipeline._take_reports()
+
+
+def test_pipeline_close_waits_for_write(tmp_path):
+    pipeline = LogPipeline(maxsize=10, directory=str(tmp_path))
+    # A batch is being written by the executor
+    pipeline._lock.acquire()
+    closing = threading.Thread(target=pipeline.close)
+    closing.start()
+    closing.join(timeout=0.05)
+    assert closing.is_alive()
+
+    pipeline._lock.release()
+    closing.join()
@@ -0,0 +1,74 @@
+import asyncio
+
+from pie.database import instrumentation
+from pie.logger.database import LogConf, LogRoute, router
+
+GUILD_ID: int = -8
+
+
+def _queries() -> int:
+    return sum(s.count for s in instrumentation.sources.values())
+
+
+def _cleanup():
+    for module in (None, "tests.router"):
+        LogConf.remove_guild_subscription(guild_id=GUILD_ID, module=module)
+        LogConf.remove_bot_subscription(guild_id=GUILD_ID, module=module)
+
+
+def _channels(confs) -> list:
+    return sorted(c.channel_id for c in confs if c.guild_id == GUILD_ID)
+
+
+def test_router_guild_subscriptions():
+    _cleanup()
+    try:
+        LogConf.add_guild_subscription(guild_id=GUILD_ID, channel_id=1, level=30)
+        LogConf.add_guild_subscription(
+            guild_id=GUILD_ID, channel_id=2, level=10, module="tests.router"
+        )
+
+        def get(level: int, module=None):
+            return _channels(
+                LogConf.get_guild_subscriptions(
+                    level=level, guild_id=GUILD_ID, module=module
+                )
+            )
+
+        assert [] == get(20)
+        assert [1] == get(30)
+        # The module subscription takes precedence
+        assert [2] == get(10, "tests.router")
+        assert [2] == get(40, "tests.router")
+        assert [1] == get(40, "tests.other")
+        assert [] == _channels(
+            LogConf.get_guild_subscriptions(level=50, guild_id=GUILD_ID - 1)
+        )
+    finally:
+        _cleanup()
+    assert [] == _channels(LogConf.get_guild_subscriptions(level=50, guild_id=GUILD_ID))
+
+
+def test_router_bot_subscriptions():
+    _cleanup()
+    try:
+        LogConf.add_bot_subscription(guild_id=GUILD_ID, channel_id=3, level=20)
+
+        async def get(level: int):
+            return _channels(await LogConf.get_bot_subscriptions_async(level=level))
+
+        assert [] == asyncio.run(get(10))
+        assert [3] == asyncio.run(get(20))
+    finally:
+        _cleanup()
+
+
+def test_router_rejection_without_queries():
+    _cleanup()
+    routes = router.get()
+    before: int = _queries()
+    route = routes.route("guild", GUILD_ID, "tests.router")
+    assert LogRoute.NONE == route.minimum
+    assert [] == route.select(50)
+    assert route is routes.route("guild", GUILD_ID, "tests.router")
+    assert before == _queries()
@@ -0,0 +1,91 @@
+import asyncio
+
+from pie.logger.sink import MESSAGE_LIMIT, DiscordSink
+
+
+class _Channel:
+    def __init__(self, id: int):
+        self.id = id
+        self.messages = []
+
+    async def send(self, content: str):
+        self.messages.append(content)
+
+
+def test_sink_coalesces():
+    sink = DiscordSink(interval=0.01)
+    first, second = _Channel(1), _Channel(2)
+
+    async def run():
+        for i in range(10):
+            sink.add(first, f"entry {i}")
+        sink.add(second, "other")
+        await sink.flush()
+
+    asyncio.run(run())
+
+    assert 1 == len(first.messages)
+    assert first.messages[0].startswith("```entry 0\nentry 1")
+    assert ["```other```"] == second.messages
+    assert 11 == sink.stats.entries
+    assert 2 == sink.stats.messages
+
+
+def test_sink_message_limit():
+    sink = DiscordSink(interval=0.01)
+    channel = _Channel(1)
+    entry: str = "x" * 1000
+
+    async def run():
+        for _ in range(4):
+            sink.add(channel, entry)
+        sink.add(channel, "y" * (MESSAGE_LIMIT + 10))
+        await sink.flush()
+
+    asyncio.run(run())
+
+    assert all(len(m) <= 2000 for m in channel.messages)
+    # Two entries don't fit into one message, the long one is split in two
+    assert 6 == len(channel.messages)
+
+
+def test_sink_budget():
+    sink = DiscordSink(budget=1)
+    channel = _Channel(1)
+
+    async def run():
+        for _ in range(3):
+            sink.add(channel, "x" * MESSAGE_LIMIT)
+        # Drive the flushes directly instead of waiting for the loop
+        sink._task.cancel()
+
+        # Each flush may send only one message per channel
+        await sink._send(sink.budget)
+        assert 1 == len(channel.messages)
+        await sink._send(sink.budget)
+        assert 2 == len(channel.messages)
+        assert 1 == len(sink._buffers)
+        await sink._send(sink.budget)
+
+    asyncio.run(run())
+
+    assert 3 == len(channel.messages)
+    # Nothing is waiting for the channel, its buffer is dropped
+    assert {} == sink._buffers
+
+
+def test_sink_suppression():
+    sink = DiscordSink(interval=10, backlog=2)
+    channel = _Channel(1)
+
+    async def run():
+        for _ in range(5):
+            sink.add(channel, "x" * 1500)
+        await sink.flush()
+
+    asyncio.run(run())
+
+    assert 3 == sink.stats.suppressed
+    assert channel.messages[0].startswith("```... 3 log entries were suppressed")
+    assert "too many messages were waiting" in channel.messages[0]
+    assert 2 == len(channel.messages)